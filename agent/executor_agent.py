@@ -1,14 +1,212 @@
 ﻿# agent/executor_agent.py
-from typing import Dict, Any
+"""
+ExecutorAgent runs a PlannerAgent plan as a DAG: every step whose dependencies have
+succeeded is submitted to a bounded thread pool, so independent steps (e.g. the calendar
+and the weather check) run concurrently.
+
+Plan format:
+  {"intent": "...", "steps": [
+      {"id": "check_weather", "action": "check_weather", "args": {"location": "Rajkot"},
+       "depends_on": [], "timeout": 10},
+      ...]}
+Plain strings are accepted as steps ({"id": s, "action": s}, no dependencies).
+
+A handler is called as handler(args, upstream) where upstream maps each dependency id to
+its result. A step's timeout counts from when its handler starts on a worker, not from
+when it was queued for one. A step that fails or exceeds its timeout cancels all of its
+dependents; other branches keep running. Python threads cannot be interrupted, so a timed-out handler keeps
+its worker until it returns and its result is discarded.
+"""
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Union
 from utils.logger import setup_logger
 
 logger = setup_logger("executor_agent", None)
 
+StepHandler = Callable[[Dict[str, Any], Dict[str, Any]], Any]
+
+
 class ExecutorAgent:
-    def __init__(self):
-        logger.info("ExecutorAgent initialized")
+    def __init__(self, handlers: Optional[Dict[str, StepHandler]] = None, max_workers: int = 4,
+                 default_timeout: float = 10.0):
+        self.handlers: Dict[str, StepHandler] = dict(handlers or {})
+        self.max_workers = max(1, int(max_workers))
+        self.default_timeout = float(default_timeout)
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        logger.info("ExecutorAgent initialized (max_workers=%d, default_timeout=%.1fs)", self.max_workers, self.default_timeout)
+
+    def register(self, action: str, handler: StepHandler):
+        self.handlers[action] = handler
+
+    def execute_steps(self, steps: Union[Dict[str, Any], List[Any]]) -> Dict[str, Any]:
+        """
+        Execute a plan (or a bare step list). Returns
+          {"status": "success" | "partial" | "failed", "intent", "duration_ms",
+           "executed": [step ids in completion order],
+           "steps": {id: {"status": "ok" | "failed" | "timeout" | "cancelled", "action",
+                          "result", "error", "duration_ms"}}}
+        Raises ValueError for malformed plans (unknown dependency, cycle, duplicate id).
+        """
+        intent = steps.get("intent") if isinstance(steps, dict) else None
+        nodes = self._normalize(steps.get("steps", []) if isinstance(steps, dict) else steps)
+        order = self._topological_order(nodes)
+        logger.info("ExecutorAgent executing %d steps for intent=%s: %s", len(nodes), intent, order)
+
+        started = time.perf_counter()
+        report: Dict[str, Dict[str, Any]] = {
+            sid: {"status": "pending", "action": node["action"], "depends_on": node["depends_on"]}
+            for sid, node in nodes.items()
+        }
+        remaining = {sid: set(node["depends_on"]) for sid, node in nodes.items()}
+        dependents: Dict[str, List[str]] = {sid: [] for sid in nodes}
+        for sid, node in nodes.items():
+            for dep in node["depends_on"]:
+                dependents[dep].append(sid)
+
+        running: Dict[Future, str] = {}
+        # per running step, resolved when its handler starts; until then it has no deadline
+        starts: Dict[str, Future] = {}
+        deadlines: Dict[str, float] = {}
+        step_started: Dict[str, float] = {}
+        executed: List[str] = []
+
+        def run_step(sid: str, handler: StepHandler, args: Dict[str, Any], upstream: Dict[str, Any]) -> Any:
+            # runs on the worker: the step's clock starts here
+            step_started[sid] = time.perf_counter()
+            deadlines[sid] = step_started[sid] + nodes[sid]["timeout"]
+            starts[sid].set_result(None)
+            return handler(args, upstream)
+
+        def finish(sid: str, status: str, result: Any = None, error: Optional[str] = None):
+            entry = report[sid]
+            entry["status"] = status
+            entry["result"] = result
+            entry["error"] = error
+            if sid in step_started:
+                entry["duration_ms"] = round((time.perf_counter() - step_started[sid]) * 1000.0, 3)
+            if status == "ok":
+                executed.append(sid)
+                for child in dependents[sid]:
+                    remaining[child].discard(sid)
+            else:
+                self._cancel_dependents(sid, dependents, report)
+
+        def submit_ready():
+            for sid in order:
+                if report[sid]["status"] == "pending" and not remaining[sid]:
+                    node = nodes[sid]
+                    handler = self.handlers.get(node["action"])
+                    if handler is None:
+                        finish(sid, "failed", error=f"no handler for action '{node['action']}'")
+                        continue
+                    upstream = {dep: report[dep]["result"] for dep in node["depends_on"]}
+                    report[sid]["status"] = "running"
+                    starts[sid] = Future()
+                    running[self._get_pool().submit(run_step, sid, handler, dict(node["args"]), upstream)] = sid
+
+        submit_ready()
+        while running:
+            now = time.perf_counter()
+            # wake on a step finishing, a step starting (its deadline becomes known) or a deadline
+            waiting_to_start = [start for start in starts.values() if not start.done()]
+            known = [deadlines[sid] for sid in running.values() if sid in deadlines]
+            timeout = max(0.0, min(known) - now) if known else None
+            done, _ = wait(list(running) + waiting_to_start, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future not in running:
+                    continue
+                sid = running.pop(future)
+                try:
+                    finish(sid, "ok", result=future.result())
+                except Exception as e:
+                    logger.error("Step %s failed: %s", sid, e)
+                    finish(sid, "failed", error=f"{type(e).__name__}: {e}")
+            now = time.perf_counter()
+            for future, sid in list(running.items()):
+                if sid in deadlines and now >= deadlines[sid]:
+                    running.pop(future)
+                    future.cancel()
+                    logger.error("Step %s timed out after %.1fs", sid, nodes[sid]["timeout"])
+                    finish(sid, "timeout", error=f"timed out after {nodes[sid]['timeout']}s")
+            submit_ready()
+
+        statuses = [entry["status"] for entry in report.values()]
+        if all(s == "ok" for s in statuses):
+            status = "success"
+        elif any(s == "ok" for s in statuses):
+            status = "partial"
+        else:
+            status = "failed"
+        duration_ms = round((time.perf_counter() - started) * 1000.0, 3)
+        logger.info("ExecutorAgent finished intent=%s status=%s in %.1f ms", intent, status, duration_ms)
+        return {"status": status, "intent": intent, "duration_ms": duration_ms, "executed": executed, "steps": report}
+
+    def close(self):
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            # do not wait for timed-out handlers still holding a worker
+            pool.shutdown(wait=False)
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ura-step")
+        return self._pool
+
+    def _normalize(self, steps: List[Any]) -> Dict[str, Dict[str, Any]]:
+        nodes: Dict[str, Dict[str, Any]] = {}
+        for step in steps:
+            if isinstance(step, str):
+                step = {"id": step, "action": step}
+            if not isinstance(step, dict):
+                raise ValueError(f"Invalid plan step: {step!r}")
+            action = step.get("action") or step.get("id")
+            sid = step.get("id") or action
+            if not sid:
+                raise ValueError(f"Plan step without id/action: {step!r}")
+            if sid in nodes:
+                raise ValueError(f"Duplicate plan step id: {sid}")
+            nodes[sid] = {
+                "action": action,
+                "args": step.get("args") or {},
+                # a dependency listed twice is still one edge (and one indegree count)
+                "depends_on": list(dict.fromkeys(step.get("depends_on") or [])),
+                "timeout": float(step.get("timeout") or self.default_timeout),
+            }
+        for sid, node in nodes.items():
+            unknown = [dep for dep in node["depends_on"] if dep not in nodes]
+            if unknown:
+                raise ValueError(f"Step {sid} depends on unknown steps: {unknown}")
+        return nodes
+
+    def _topological_order(self, nodes: Dict[str, Dict[str, Any]]) -> List[str]:
+        # Kahn's algorithm, keeping plan order among ready steps
+        indegree = {sid: len(node["depends_on"]) for sid, node in nodes.items()}
+        order = []
+        ready = [sid for sid in nodes if indegree[sid] == 0]
+        while ready:
+            sid = ready.pop(0)
+            order.append(sid)
+            for other, node in nodes.items():
+                if sid in node["depends_on"]:
+                    indegree[other] -= 1
+                    if indegree[other] == 0:
+                        ready.append(other)
+        if len(order) != len(nodes):
+            cycle = sorted(set(nodes) - set(order))
+            raise ValueError(f"Plan has a dependency cycle among: {cycle}")
+        return order
 
-    def execute_steps(self, steps: Dict[str, Any]) -> Dict[str, Any]:
-        logger.info("ExecutorAgent executing steps: %s", steps)
-        # For demo, just log and return success
-        return {"status": "success", "executed": steps}
+    def _cancel_dependents(self, failed: str, dependents: Dict[str, List[str]], report: Dict[str, Dict[str, Any]]):
+        stack = list(dependents[failed])
+        while stack:
+            sid = stack.pop()
+            if report[sid]["status"] != "pending":
+                continue
+            report[sid].update({"status": "cancelled", "result": None, "error": f"dependency '{failed}' did not succeed"})
+            stack.extend(dependents[sid])
@@ -1,32 +1,112 @@
 ﻿# agent/orchestrator.py
 import os
-from typing import Any, Dict, Optional
-from utils.logger import setup_logger
-from utils.config_manager import ConfigManager, Settings
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from utils.cache_utils import LRUCache
+from utils.location_utils import normalize_location
+from utils.logger import configure_logging, setup_logger
+from utils.metrics import flatten_numeric, metrics
+from utils.network_utils import ConnectivityMonitor, endpoint_address
+from utils.config_manager import ConfigManager, Settings, diff_settings, diff_weather
+from agent.executor_agent import ExecutorAgent
+from agent.planner_agent import PlannerAgent
+from agent.prefetcher import AccessTracker, Prefetcher
+from agent.snapshot_store import SnapshotStore
 from agent.weather_agent import WeatherAgent
+from agent.weather_report import WeatherReport
+from tools.hourly_forecast import When
+from tools.mcp_weather_tool import RateLimitedError, UpstreamUnavailableError, WeatherToolError
 
 logger = setup_logger("orchestrator", None)
 
+class _Runtime:
+    """
+    Immutable snapshot of what a request runs against (mode + settings + agent).
+    Hot reload swaps the Orchestrator's snapshot in one assignment; a retired snapshot
+    closes its agent once the last in-flight request using it has finished.
+    """
+
+    def __init__(self, mode: str, settings: Settings, weather_agent: WeatherAgent):
+        self.mode = mode
+        self.settings = settings
+        self.weather_agent = weather_agent
+        self._lock = threading.Lock()
+        self._active = 0
+        self._retired = False
+
+    def acquire(self):
+        with self._lock:
+            self._active += 1
+
+    def release(self):
+        with self._lock:
+            self._active -= 1
+            close_now = self._retired and self._active == 0
+        if close_now:
+            self.weather_agent.close()
+
+    def retire(self):
+        with self._lock:
+            self._retired = True
+            close_now = self._active == 0
+        if close_now:
+            self.weather_agent.close()
+
 class Orchestrator:
     """
     Orchestrator: central controller. Loads config via ConfigManager.
     Coordinates agent operations, ensures mode is honored and logs runtime mode.
     """
 
-    def __init__(self, config_path: str, cli_mode: Optional[str] = None):
+    def __init__(self, config_path: str, cli_mode: Optional[str] = None, watch: Optional[bool] = None,
+                 overrides: Optional[Dict[str, Any]] = None):
         # callback when config changes
         def _on_change(settings: Settings):
             try:
                 logger.info("Config reloaded. New mode=%s", settings.mode)
-                # optionally re-init or re-wire agents if necessary
-                self._apply_mode(settings.mode)
+                # rebuild only the components affected by the change
+                self._apply_settings(settings)
             except Exception as e:
                 logger.exception("Error applying new config: %s", e)
 
-        self.config_manager = ConfigManager(config_path, on_change=_on_change)
+        self._stopped = False
+        self._runtime: Optional[_Runtime] = None
+        # guards the runtime swap and in-flight accounting; held only for a few instructions
+        self._swap_lock = threading.Lock()
+        # serializes (re)configuration so two reloads never build agents concurrently
+        self._apply_lock = threading.Lock()
+        # watch=None defers to the config's hot_reload flag; overrides are settings sections
+        # layered over the file (e.g. a bulk worker's share of the rate limit)
+        self.config_manager = ConfigManager(config_path, on_change=_on_change, watch=watch, overrides=overrides)
+        self.planner = PlannerAgent.from_settings(self.config_manager.settings.planner)
+        self.executor = self._build_executor(self.config_manager.settings)
+        self.prefetcher = self._build_prefetcher(self.config_manager.settings)
+        # degraded mode: last successful real-mode report per location, and a demo agent
+        # built on first use, served while the upstream is unreachable
+        connectivity = self.config_manager.settings.connectivity
+        self._last_known_good = LRUCache(int(connectivity.get("last_known_good_max_entries", 1024)))
+        self._fallback_agent: Optional[WeatherAgent] = None
+        self._fallback_lock = threading.Lock()
+        self.monitor: Optional[ConnectivityMonitor] = None
+        # forecast fetch time of the seed last persisted per location (see _remember)
+        self._seeded = LRUCache(int(connectivity.get("last_known_good_max_entries", 1024)))
+        # pre-warm from snapshots runs once, on the first real-mode lookup (see prewarm)
+        self._prewarm_lock = threading.Lock()
+        self._prewarmed = False
         # determine final mode with precedence CLI > ENV > config file
         resolved = self._resolve_mode(cli_mode)
+        self.snapshots = self._build_snapshot_store(self.config_manager.settings, resolved)
         self._apply_mode(resolved)
+        self._rebuild_monitor(resolved, self.config_manager.settings)
+
+    @property
+    def mode(self) -> str:
+        return self._runtime.mode
+
+    @property
+    def weather_agent(self) -> WeatherAgent:
+        return self._runtime.weather_agent
 
     def _resolve_mode(self, cli_mode: Optional[str]) -> str:
         # CLI override
@@ -47,27 +127,493 @@ class Orchestrator:
         return mode
 
     def _apply_mode(self, mode: str):
-        # set current mode
-        self.mode = mode
-        # update logger file handler (recreate with file path)
-        log_path = self.config_manager.settings.logging.get("path")
-        # replace logger with file included
-        setup_logger("ura", log_path, self.config_manager.settings.logging.get("level", "INFO"))
+        # full (re)initialization for the given mode from the current settings
+        settings = self.config_manager.settings
+        with self._apply_lock:
+            self._apply_logging(settings)
+            self._swap_runtime(mode, settings)
+
+    def _apply_settings(self, settings: Settings):
+        """
+        Incremental hot reload: diff against the applied settings and rebuild only what changed.
+        A logging-only change re-configures logging and keeps the weather agent (and its warm
+        caches and connections) untouched.
+        """
+        with self._apply_lock:
+            current = self._runtime
+            changed = diff_settings(current.settings, settings)
+            if not changed:
+                logger.info("Config reload produced no effective change")
+                return
+            if "logging" in changed:
+                self._apply_logging(settings)
+            # a CLI/ENV mode override stays in effect unless the file's mode itself changed
+            mode = settings.mode if "mode" in changed else current.mode
+            if "planner" in changed:
+                # a new planner fingerprint drops plans cached by the old planner config
+                previous_planner, self.planner = self.planner, PlannerAgent.from_settings(settings.planner)
+                previous_planner.close()
+            if "prefetch" in changed:
+                # the access history survives the rebuild; only the refresh policy changes
+                previous_prefetcher = self.prefetcher
+                tracker = previous_prefetcher.tracker if previous_prefetcher is not None else None
+                self.prefetcher = self._build_prefetcher(settings, tracker)
+                if previous_prefetcher is not None:
+                    previous_prefetcher.stop()
+            if "snapshots" in changed or mode != current.mode:
+                previous_snapshots, self.snapshots = self.snapshots, self._build_snapshot_store(settings, mode)
+                if previous_snapshots is not None:
+                    previous_snapshots.close()
+            if "executor" in changed:
+                previous_executor, self.executor = self.executor, self._build_executor(settings)
+                previous_executor.close()
+            if {"connectivity", "mode", "weather"} & changed:
+                self._rebuild_monitor(mode, settings)
+                # the demo fallback is rebuilt on next use with the new weather settings
+                previous_fallback, self._fallback_agent = self._fallback_agent, None
+                if previous_fallback is not None:
+                    previous_fallback.close()
+            if {"mode", "weather"} & changed:
+                weather_changes = diff_weather(current.settings, settings)
+                logger.info("Rebuilding weather agent (mode=%s, weather fields changed=%s)",
+                            mode, sorted(weather_changes))
+                self._swap_runtime(mode, settings)
+            else:
+                # keep the agent, just record the newly applied settings
+                self._swap_runtime(mode, settings, weather_agent=current.weather_agent)
+            logger.info("Config changes applied: %s", sorted(changed))
+
+    def _apply_logging(self, settings: Settings):
+        # file handler, rotation, queue mode and sampling all come from the "logging" section
+        configure_logging(settings.logging)
+
+    def _swap_runtime(self, mode: str, settings: Settings, weather_agent: Optional[WeatherAgent] = None):
+        previous = self._runtime
+        if weather_agent is None:
+            # Initialize agent instances with the appropriate tool configs (built before the swap,
+            # so in-flight requests keep using the old agent until they finish)
+            previous_agent = previous.weather_agent if previous is not None else None
+            weather_agent = WeatherAgent(settings.weather.dict(), mode=mode, previous=previous_agent)
+            logger.info("Orchestrator applied mode=%s and initialized agents", mode)
+        runtime = _Runtime(mode, settings, weather_agent)
+        with self._swap_lock:
+            self._runtime = runtime
+        if previous is not None and previous.weather_agent is not weather_agent:
+            # close the replaced agent (releasing its pooled connections) once it is idle
+            previous.retire()
+
+    def _build_executor(self, settings: Settings) -> ExecutorAgent:
+        cfg = settings.executor
+        executor = ExecutorAgent(
+            max_workers=int(cfg.get("max_workers", 4)),
+            default_timeout=float(cfg.get("step_timeout_seconds", 10.0)),
+        )
+        executor.register("check_calendar", self._step_check_calendar)
+        executor.register("check_weather", self._step_check_weather)
+        executor.register("notify_user", self._step_notify_user)
+        return executor
+
+    def _build_prefetcher(self, settings: Settings, tracker: Optional[AccessTracker] = None) -> Optional[Prefetcher]:
+        cfg = settings.prefetch
+        if not cfg.get("enabled", True):
+            return None
+        if tracker is None:
+            tracker = AccessTracker(
+                half_life_seconds=float(cfg.get("half_life_seconds", 3600)),
+                max_tracked=int(cfg.get("max_tracked", 10000)),
+            )
+        return Prefetcher(
+            self._prefetch_location,
+            top_n=int(cfg.get("top_n", 20)),
+            lead_seconds=float(cfg.get("lead_seconds", 60)),
+            interval_seconds=float(cfg.get("interval_seconds", 15)),
+            max_requests_per_minute=float(cfg.get("max_requests_per_minute", 30)),
+            tracker=tracker,
+        )
+
+    def _prefetch_location(self, location: str, lead_seconds: float) -> bool:
+        # runs on the prefetcher thread against whichever agent is active right now
+        runtime = self._acquire_runtime()
+        try:
+            return runtime.weather_agent.prefetch(location, lead_seconds)
+        finally:
+            runtime.release()
+
+    def _build_snapshot_store(self, settings: Settings, mode: str) -> Optional[SnapshotStore]:
+        # only real-mode results are recorded; demo runs never open the file
+        cfg = settings.snapshots
+        if mode != "real" or not cfg.get("enabled", True) or not cfg.get("path"):
+            return None
+        try:
+            return SnapshotStore(
+                cfg["path"],
+                queue_size=int(cfg.get("queue_size", 10000)),
+                batch_size=int(cfg.get("batch_size", 500)),
+                retention_days=float(cfg.get("retention_days", 30)),
+                max_per_location=int(cfg.get("max_per_location", 1000)),
+                compact_interval_seconds=float(cfg.get("compact_interval_seconds", 3600)),
+            )
+        except Exception as e:
+            # history is a convenience; a broken store must not keep the orchestrator from starting
+            logger.warning("Snapshot store unavailable at %s (%s); not recording snapshots", cfg.get("path"), e)
+            return None
+
+    def prewarm(self):
+        """
+        Pre-warm caches from snapshots, once. Runs on the first real-mode lookup; the
+        service calls it at startup so the first users already hit warm caches. Demo and
+        one-shot runs that never look anything up never open the snapshot store.
+        """
+        if self._prewarmed or self.snapshots is None or self.mode != "real":
+            return
+        with self._prewarm_lock:
+            if self._prewarmed:
+                return
+            self._prewarmed = True
+            self._prewarm(self.config_manager.settings)
+
+    def _prewarm(self, settings: Settings):
+        """
+        Warm restart: for the most looked-up recent locations, load the stored geocoding
+        record and forecast (with its original fetch time) into the weather agent's caches,
+        the latest report into the last known good cache, and the lookup counts into the
+        prefetcher, so hot locations are served and refreshed before users ask for them.
+        """
+        store = self.snapshots
+        cfg = settings.snapshots
+        if store is None or self.mode != "real":
+            return
+        since = time.time() - float(cfg.get("prewarm_max_age_seconds", 86400))
+        try:
+            recent = store.recent_locations(since, int(cfg.get("prewarm_max_locations", 1024)))
+        except Exception as e:
+            logger.warning("Cache pre-warm from snapshots failed: %s", e)
+            return
+        weather_agent = self.weather_agent
+        seeded = 0
+        for key, count, report, seed in reversed(recent):
+            # least looked up first, so LRUs keep the hottest if they are smaller than the list
+            if report is not None:
+                self._last_known_good.set(key, report)
+            if seed is not None:
+                try:
+                    seeded += weather_agent.seed(key, seed)
+                    self._seeded.set(key, seed.get("fetched_at"))
+                except Exception as e:
+                    logger.warning("Could not seed caches for %s from snapshots: %s", key, e)
+            if self.prefetcher is not None:
+                self.prefetcher.record(key, count)
+        if recent:
+            logger.info("Pre-warmed caches with %d locations from snapshots (%d forecasts)", len(recent), seeded)
+
+    def _remember(self, runtime: _Runtime, location: str, result: WeatherReport):
+        # last known good for degraded mode, one snapshot per new observation, and the lookup
+        # count plus (when the cached forecast changed) the payloads that pre-warm a restart
+        report = result.replace(raw=None) if result.raw is not None else result
+        key = normalize_location(location)
+        previous = self._last_known_good.get(key)
+        self._last_known_good.set(key, report)
+        store = self.snapshots
+        if store is None:
+            return
+        if previous is None or previous.to_dict() != report.to_dict():
+            store.append(key, report)
+        seed = runtime.weather_agent.warm_entry(location)
+        if seed is not None and self._seeded.get(key) != seed["fetched_at"]:
+            self._seeded.set(key, seed["fetched_at"])
+        else:
+            seed = None
+        store.record_lookup(key, seed)
+
+    def weather_history(self, location: str, since: Optional[float] = None, until: Optional[float] = None,
+                        limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        Stored snapshots for a location, newest first: [{"fetched_at": epoch, "report": WeatherReport}].
+        since/until bound the fetch time (epoch seconds). Empty when snapshots are disabled.
+        """
+        store = self.snapshots
+        if store is None:
+            return []
+        return [{"fetched_at": ts, "report": report} for ts, report in store.history(location, since, until, limit)]
+
+    def _rebuild_monitor(self, mode: str, settings: Settings):
+        previous, self.monitor = self.monitor, None
+        if previous is not None:
+            previous.stop()
+        cfg = settings.connectivity
+        if mode != "real" or not cfg.get("enabled", True):
+            return
+        targets = {}
+        for name, url in (("forecast", settings.weather.forecast_endpoint), ("geocoding", settings.weather.geocoding_endpoint)):
+            try:
+                targets[name] = endpoint_address(url or "")
+            except ValueError as e:
+                logger.warning("Not monitoring %s endpoint: %s", name, e)
+        if not targets:
+            return
+        monitor = ConnectivityMonitor(
+            targets,
+            interval_seconds=float(cfg.get("interval_seconds", 15)),
+            timeout_seconds=float(cfg.get("timeout_seconds", 2)),
+            failure_threshold=int(cfg.get("failure_threshold", 2)),
+        )
+        monitor.start()
+        self.monitor = monitor
+
+    def _upstream_down(self) -> bool:
+        # every lookup needs the forecast endpoint; geocoding may be served from caches
+        monitor = self.monitor
+        return monitor is not None and not monitor.is_up("forecast")
+
+    def _degraded(self, runtime: _Runtime, location: str, reason: str) -> WeatherReport:
+        """
+        Serve without the upstream: the last known good report (source="last_known_good"),
+        else demo data (source="demo_fallback") if allowed, else raise.
+        """
+        cached = self._last_known_good.get(normalize_location(location))
+        if cached is not None:
+            metrics.inc("degraded_responses_total", source="last_known_good")
+            logger.warning("Upstream unavailable (%s); serving last known good weather for %s from %s",
+                           reason, location, cached.timestamp)
+            return cached.replace(source="last_known_good")
+        if runtime.settings.connectivity.get("fallback_to_demo", True) and runtime.settings.weather.demo_data_path:
+            metrics.inc("degraded_responses_total", source="demo_fallback")
+            logger.warning("Upstream unavailable (%s); serving demo weather for %s", reason, location)
+            return self._get_fallback_agent(runtime.settings).fetch(location).replace(source="demo_fallback")
+        metrics.inc("degraded_responses_total", source="none")
+        raise UpstreamUnavailableError(f"Weather upstream unavailable ({reason}) and no fallback data for '{location}'")
 
-        # Initialize agent instances with the appropriate tool configs
-        weather_cfg = self.config_manager.settings.weather.dict()
-        self.weather_agent = WeatherAgent(weather_cfg, mode=self.mode)
-        logger.info("Orchestrator applied mode=%s and initialized agents", self.mode)
+    def _get_fallback_agent(self, settings: Settings) -> WeatherAgent:
+        if self._fallback_agent is None:
+            with self._fallback_lock:
+                if self._fallback_agent is None:
+                    self._fallback_agent = WeatherAgent(settings.weather.dict(), mode="demo")
+        return self._fallback_agent
 
-    def fetch_weather(self, location: str) -> Dict[str, Any]:
+    def _fetch_or_degrade(self, runtime: _Runtime, location: str, include_raw: bool) -> WeatherReport:
+        if runtime.mode != "real":
+            return runtime.weather_agent.fetch(location, include_raw)
+        self.prewarm()
+        if self._upstream_down():
+            return self._degraded(runtime, location, "connectivity monitor reports it unreachable")
+        try:
+            result = runtime.weather_agent.fetch(location, include_raw)
+        except UpstreamUnavailableError as e:
+            # circuit open: upstream is failing, fail fast onto the fallback
+            return self._degraded(runtime, location, str(e))
+        except RateLimitedError:
+            # our own load, not an outage: surface it rather than serve fallback data
+            raise
+        except WeatherToolError:
+            monitor = self.monitor
+            if monitor is not None:
+                # maybe the network just went away; re-probe now rather than at the next interval
+                monitor.check_now()
+            raise
+        self._remember(runtime, location, result)
+        return result
+
+    async def _afetch_or_degrade(self, runtime: _Runtime, location: str, include_raw: bool) -> WeatherReport:
+        if runtime.mode != "real":
+            return await runtime.weather_agent.afetch(location, include_raw)
+        if not self._prewarmed and self.snapshots is not None:
+            import asyncio
+
+            # pre-warm reads the snapshot store and seeds caches; keep it off the event loop
+            await asyncio.get_running_loop().run_in_executor(None, self.prewarm)
+        if self._upstream_down():
+            return self._degraded(runtime, location, "connectivity monitor reports it unreachable")
+        try:
+            result = await runtime.weather_agent.afetch(location, include_raw)
+        except UpstreamUnavailableError as e:
+            return self._degraded(runtime, location, str(e))
+        except RateLimitedError:
+            raise
+        except WeatherToolError:
+            monitor = self.monitor
+            if monitor is not None:
+                monitor.check_now()
+            raise
+        self._remember(runtime, location, result)
+        return result
+
+    def _record_access(self, location: str):
+        # demo data is served from memory; there is nothing to refresh
+        prefetcher = self.prefetcher
+        if prefetcher is not None and self._runtime.mode == "real":
+            prefetcher.record(location)
+
+    def _acquire_runtime(self) -> _Runtime:
+        with self._swap_lock:
+            runtime = self._runtime
+            runtime.acquire()
+        return runtime
+
+    def fetch_weather(self, location: str, include_raw: bool = False) -> WeatherReport:
         """
         API for other components to get weather. Always logs mode and where data came from.
+        Returns an immutable WeatherReport (usable as a read-only dict); pass include_raw=True
+        to also keep the raw upstream payload.
+        In real mode, while the upstream is unreachable (connectivity monitor, open circuit)
+        this returns at once with the last known good report (source="last_known_good") or
+        demo data (source="demo_fallback") instead of waiting on timeouts. A local rate-limit
+        rejection is raised as RateLimitedError instead.
         """
-        logger.info("Orchestrator.fetch_weather invoked with mode=%s for location=%s", self.mode, location)
-        result = self.weather_agent.fetch(location)
-        logger.info("Orchestrator.fetch_weather result source=%s", result.get("source"))
+        self._record_access(location)
+        runtime = self._acquire_runtime()
+        try:
+            logger.info("Orchestrator.fetch_weather invoked with mode=%s for location=%s", runtime.mode, location)
+            result = self._fetch_or_degrade(runtime, location, include_raw)
+        finally:
+            runtime.release()
+        logger.info("Orchestrator.fetch_weather result source=%s", result.source)
         return result
 
+    async def afetch_weather(self, location: str, include_raw: bool = False) -> WeatherReport:
+        """
+        Async API: many lookups can be awaited concurrently on one event loop
+        (bounded by weather.async_max_concurrency).
+        """
+        self._record_access(location)
+        runtime = self._acquire_runtime()
+        try:
+            logger.info("Orchestrator.afetch_weather invoked with mode=%s for location=%s", runtime.mode, location)
+            result = await self._afetch_or_degrade(runtime, location, include_raw)
+        finally:
+            runtime.release()
+        logger.info("Orchestrator.afetch_weather result source=%s", result.source)
+        return result
+
+    def fetch_weather_at(self, location: str, when: When, include_raw: bool = False) -> WeatherReport:
+        """
+        Weather at a given time inside the forecast horizon (e.g. "today 18:00"); answered
+        from the hourly forecast already fetched for the location, without a new request.
+        """
+        runtime = self._acquire_runtime()
+        try:
+            logger.info("Orchestrator.fetch_weather_at invoked with mode=%s for location=%s at=%s", runtime.mode, location, when)
+            return runtime.weather_agent.fetch_at(location, when, include_raw)
+        finally:
+            runtime.release()
+
+    def fetch_hourly_forecast(self, location: str, hours: int = 24, start: Optional[When] = None) -> List[WeatherReport]:
+        """
+        Hourly reports for the next `hours` hours, from one cached fetch.
+        """
+        runtime = self._acquire_runtime()
+        try:
+            logger.info("Orchestrator.fetch_hourly_forecast invoked with mode=%s for location=%s hours=%d", runtime.mode, location, hours)
+            return runtime.weather_agent.fetch_hourly(location, hours, start)
+        finally:
+            runtime.release()
+
+    def fetch_weather_many(self, locations: List[str], include_raw: bool = False) -> Dict[str, Dict[str, Any]]:
+        """
+        Batch API: weather for many locations in one call.
+        Returns {"results": {location: result}, "errors": {location: message}}.
+        """
+        for location in locations:
+            self._record_access(location)
+        runtime = self._acquire_runtime()
+        try:
+            if runtime.mode == "real":
+                self.prewarm()
+            logger.info("Orchestrator.fetch_weather_many invoked with mode=%s for %d locations", runtime.mode, len(locations))
+            batch = runtime.weather_agent.fetch_many(locations, include_raw)
+        finally:
+            runtime.release()
+        if runtime.mode == "real":
+            for location, result in batch["results"].items():
+                self._remember(runtime, location, result)
+        logger.info("Orchestrator.fetch_weather_many results=%d errors=%d", len(batch["results"]), len(batch["errors"]))
+        return batch
+
+    def handle_intent(self, intent: str) -> Dict[str, Any]:
+        """
+        Plan the intent and execute the plan as a DAG; independent steps run concurrently.
+        Returns the ExecutorAgent result (overall status, per-step status/result/timing).
+        """
+        plan = self.planner.plan_from_intent(intent)
+        return self.executor.execute_steps(plan)
+
+    # step handlers: handler(args, upstream results by step id)
+    def _step_check_calendar(self, args: Dict[str, Any], upstream: Dict[str, Any]) -> Dict[str, Any]:
+        # no calendar backend yet; an empty agenda keeps the plan runnable end to end
+        return {"events": []}
+
+    def _step_check_weather(self, args: Dict[str, Any], upstream: Dict[str, Any]) -> WeatherReport:
+        return self.fetch_weather(args["location"])
+
+    def _step_notify_user(self, args: Dict[str, Any], upstream: Dict[str, Any]) -> Dict[str, Any]:
+        weather = upstream.get("check_weather") or {}
+        events = (upstream.get("check_calendar") or {}).get("events", [])
+        message = "{}: {}, {} °C. {} calendar event(s).".format(
+            weather.get("location"), weather.get("summary"), weather.get("temperature_c"), len(events))
+        logger.info("notify_user: %s", message)
+        return {"message": message}
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """
+        Cache hit/miss and request-coalescing counters of the active weather agent (plus the
+        plan cache under "planner" and the prefetcher under "prefetch"), e.g. to confirm hit
+        rate in production.
+        """
+        stats = self.weather_agent.cache_stats()
+        stats["planner"] = self.planner.cache_stats()
+        stats["last_known_good"] = {"entries": len(self._last_known_good)}
+        if self.snapshots is not None:
+            stats["snapshots"] = self.snapshots.stats()
+        if self.prefetcher is not None:
+            # prefetch_hits: user lookups answered fresh thanks to a background refresh
+            stats["prefetch"] = self.prefetcher.stats()
+            stats["prefetch"]["prefetch_hits"] = stats.get("forecast", {}).get("prefetch_hits", 0)
+        return stats
+
+    def metrics_snapshot(self) -> Dict[str, Any]:
+        """
+        Per-stage latency histograms (p50/p95/p99 estimates, buckets) and counters
+        (attempts, retries, status codes, errors) plus the active agent's cache counters.
+        """
+        snapshot = metrics.snapshot()
+        snapshot["caches"] = self.cache_stats()
+        snapshot["mode"] = self.mode
+        snapshot["connectivity"] = self.connectivity_status()
+        return snapshot
+
+    def connectivity_status(self) -> Dict[str, Any]:
+        """
+        Cached upstream reachability: {"degraded": bool, "targets": {name: status}}.
+        Empty targets when not monitoring (demo mode or disabled).
+        """
+        monitor = self.monitor
+        if monitor is None:
+            return {"degraded": False, "targets": {}}
+        return {"degraded": self._upstream_down(), "targets": monitor.status()}
+
+    def metrics_text(self) -> str:
+        """
+        The same metrics in the Prometheus text exposition format; cache counters are
+        exported as ura_cache_* gauges.
+        """
+        return metrics.render_prometheus(gauges=flatten_numeric(self.cache_stats(), "cache"))
+
     def stop(self):
+        # idempotent: service mode and main() may both stop the orchestrator
+        if self._stopped:
+            return
+        self._stopped = True
+        if self.prefetcher is not None:
+            self.prefetcher.stop()
+        if self.monitor is not None:
+            self.monitor.stop()
+        if self._fallback_agent is not None:
+            self._fallback_agent.close()
+        if self.snapshots is not None:
+            # writes what is still queued
+            self.snapshots.close()
         # stop config manager observer
         self.config_manager.stop()
+        self.executor.close()
+        self.planner.close()
+        with self._apply_lock:
+            self._runtime.retire()
@@ -0,0 +1,62 @@
+﻿# agent/plan_cache.py
+"""
+Two-tier plan cache used by PlannerAgent in front of its planner backend, built on
+utils.tiered_cache.TieredCache:
+  - memory tier: bounded LRU keyed by normalized intent, entries expire after ttl_seconds
+  - disk tier: SQLite file that survives restarts (optional)
+Every entry is tagged with the fingerprint (backend name + version + config) of the planner
+that produced it; rows written by a different planner are dropped when the cache is opened,
+so a planner upgrade or config change never serves an outdated plan.
+"""
+import copy
+import re
+import time
+import unicodedata
+from typing import Any, Dict, Optional
+from utils.tiered_cache import TieredCache
+
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_intent(intent: str) -> str:
+    """
+    Stable cache key for a free-text intent; case-, width-, whitespace- and
+    punctuation-insensitive: "  Weather in PARIS?! " -> "weather in paris".
+    """
+    if intent is None:
+        return ""
+    text = unicodedata.normalize("NFKC", str(intent)).casefold()
+    # punctuation becomes a separator so "rain,tomorrow" and "rain tomorrow" share a key
+    text = "".join(" " if unicodedata.category(ch).startswith("P") else ch for ch in text)
+    return _SPACES.sub(" ", text).strip()
+
+
+class PlanCache:
+    def __init__(self, fingerprint: str, max_entries: int = 1024, ttl_seconds: float = 86400,
+                 path: Optional[str] = None):
+        if ttl_seconds <= 0:
+            raise ValueError("ttl_seconds must be > 0")
+        self.fingerprint = fingerprint
+        self.ttl = float(ttl_seconds)
+        self.path = path
+        self._cache = TieredCache("Plan", "plans", max_entries, path, value_column="plan",
+                                  tag=fingerprint, tag_column="fingerprint")
+
+    def get(self, intent: str) -> Optional[Dict[str, Any]]:
+        """
+        Cached plan for the intent (a private copy), or None.
+        """
+        hit, plan = self._cache.get(normalize_intent(intent))
+        return copy.deepcopy(plan) if hit and plan is not None else None
+
+    def put(self, intent: str, plan: Dict[str, Any]):
+        self._cache.set(normalize_intent(intent), copy.deepcopy(plan), expires_at=time.time() + self.ttl)
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return self._cache.stats()
+
+    def close(self):
+        self._cache.close()
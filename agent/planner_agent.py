@@ -2,17 +2,149 @@
 """
 PlannerAgent stub. In a full implementation, this would call LLM via llm_interface to
 produce a plan from user intent. Provided as a simple synchronous placeholder.
+
+Plans are DAGs: every step has an id, an action, optional args and the ids it depends_on,
+so ExecutorAgent can run independent steps (calendar, weather) concurrently.
+
+The actual planning is done by a PlannerBackend (the deterministic StubPlannerBackend
+for now); PlannerAgent memoizes its plans in a PlanCache keyed by normalized intent.
 """
-from typing import Dict, Any
+import abc
+import copy
+import hashlib
+import json
+import re
+from typing import Any, Dict, Optional
+from agent.plan_cache import PlanCache, normalize_intent
 from utils.logger import setup_logger
+from utils.singleflight import SingleFlight
 
 logger = setup_logger("planner_agent", None)
 
+DEFAULT_LOCATION = "Rajkot"
+
+# "... weather in Paris tomorrow", "... for New York?", "... in Paris and my calendar"
+_LOCATION_PATTERN = re.compile(
+    r"\b(?:in|for|at)\s+([A-Za-z][\w .'-]*?)\s*"
+    r"(?:[?.!,;&+]|\b(?:and|or|but|with|then|plus|today|tomorrow|tonight)\b|$)", re.IGNORECASE)
+
+
+class PlannerBackend(abc.ABC):
+    """
+    Interface for planner implementations (rule-based stub, LLM, ...).
+    name/version and config() identify the plans a backend produces: when any of them
+    changes, previously cached plans are invalidated.
+    """
+
+    name = "base"
+    version = "0"
+
+    def config(self) -> Dict[str, Any]:
+        return {}
+
+    def fingerprint(self) -> str:
+        identity = json.dumps({"name": self.name, "version": self.version, "config": self.config()},
+                              sort_keys=True, default=str)
+        return hashlib.sha256(identity.encode("utf-8")).hexdigest()[:16]
+
+    @abc.abstractmethod
+    def plan(self, intent: str) -> Dict[str, Any]:
+        """
+        Plan for a free-text intent: {"intent": ..., "steps": [...]} (see ExecutorAgent).
+        """
+
+
+class StubPlannerBackend(PlannerBackend):
+    """
+    Local, deterministic planner: same intent, same plan. Used in demo mode and tests.
+    """
+
+    name = "stub"
+    version = "2"
+
+    def __init__(self, default_location: str = DEFAULT_LOCATION):
+        self.default_location = default_location
+
+    def config(self) -> Dict[str, Any]:
+        return {"default_location": self.default_location}
+
+    def plan(self, intent: str) -> Dict[str, Any]:
+        match = _LOCATION_PATTERN.search(intent or "")
+        location = match.group(1).strip() if match else self.default_location
+        return {
+            "intent": intent,
+            "steps": [
+                {"id": "check_calendar", "action": "check_calendar", "depends_on": []},
+                {"id": "check_weather", "action": "check_weather", "args": {"location": location}, "depends_on": []},
+                {"id": "notify_user", "action": "notify_user", "depends_on": ["check_calendar", "check_weather"]},
+            ],
+        }
+
+
+PLANNER_BACKENDS = {"stub": StubPlannerBackend}
+
+
+def build_planner_backend(settings: Dict[str, Any]) -> PlannerBackend:
+    """
+    Backend named by settings["backend"], constructed with the matching planner settings.
+    """
+    name = settings.get("backend", "stub")
+    backend_cls = PLANNER_BACKENDS.get(name)
+    if backend_cls is None:
+        raise ValueError(f"Unknown planner backend '{name}' (available: {sorted(PLANNER_BACKENDS)})")
+    if backend_cls is StubPlannerBackend:
+        return StubPlannerBackend(default_location=settings.get("default_location", DEFAULT_LOCATION))
+    return backend_cls()
+
+
 class PlannerAgent:
-    def __init__(self):
-        logger.info("PlannerAgent initialized")
+    def __init__(self, backend: Optional[PlannerBackend] = None, cache: Optional[PlanCache] = None):
+        self.backend = backend or StubPlannerBackend()
+        self.cache = cache
+        # identical intents planned concurrently trigger a single backend call
+        self._flights = SingleFlight()
+        logger.info("PlannerAgent initialized (backend=%s v%s, cache=%s)", self.backend.name, self.backend.version,
+                    "on" if cache is not None else "off")
+
+    @classmethod
+    def from_settings(cls, settings: Dict[str, Any]) -> "PlannerAgent":
+        backend = build_planner_backend(settings)
+        cache = None
+        if settings.get("cache_enabled", True):
+            cache = PlanCache(
+                backend.fingerprint(),
+                max_entries=int(settings.get("cache_max_entries", 1024)),
+                ttl_seconds=float(settings.get("cache_ttl_seconds", 86400)),
+                path=settings.get("cache_path"),
+            )
+        return cls(backend, cache)
 
     def plan_from_intent(self, intent: str) -> Dict[str, Any]:
-        # Simple stub for the purpose of the Capstone minimal run
         logger.info("PlannerAgent received intent: %s", intent)
-        return {"intent": intent, "steps": ["check_calendar", "check_weather", "notify_user"]}
+        if self.cache is None:
+            return self.backend.plan(intent)
+        plan = self.cache.get(intent)
+        if plan is None:
+            # callers coalesced onto one backend call each get their own copy
+            plan = copy.deepcopy(self._flights.do(normalize_intent(intent), lambda: self._plan_and_store(intent)))
+        else:
+            logger.info("PlannerAgent plan cache hit for intent: %s", intent)
+        # the cached plan may come from an equivalent (differently spelled) intent
+        plan["intent"] = intent
+        return plan
+
+    def _plan_and_store(self, intent: str) -> Dict[str, Any]:
+        plan = self.backend.plan(intent)
+        self.cache.put(intent, plan)
+        return plan
+
+    def cache_stats(self) -> Dict[str, Any]:
+        if self.cache is None:
+            return {}
+        stats = self.cache.stats()
+        stats["coalescing"] = self._flights.stats()
+        return stats
+
+    def close(self):
+        if self.cache is not None:
+            self.cache.close()
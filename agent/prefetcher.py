@@ -0,0 +1,174 @@
+﻿# agent/prefetcher.py
+"""
+Background prefetcher for hot locations, owned by the Orchestrator.
+
+AccessTracker keeps an exponentially decaying lookup count per normalized location
+(half_life_seconds), so "hot" follows recent traffic. Every cycle the Prefetcher asks
+the active weather agent to refresh the top_n hottest locations whose cached forecast
+turns stale within lead_seconds, spending at most max_requests_per_minute refreshes
+(token bucket). The first lookup after the cache boundary is then a fresh hit instead
+of an upstream round-trip; those hits are reported by the forecast cache as prefetch_hits.
+"""
+import heapq
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from utils.location_utils import normalize_location
+from utils.logger import setup_logger
+
+logger = setup_logger("prefetcher", None)
+
+# refresh(location, lead_seconds) -> True if an upstream request was made
+RefreshFn = Callable[[str, float], bool]
+
+
+class AccessTracker:
+    """
+    Decaying per-location lookup counts; record() is a dict update under a lock.
+    """
+
+    def __init__(self, half_life_seconds: float = 3600, max_tracked: int = 10000, clock: Callable[[], float] = time.time):
+        self.decay = math.log(2) / max(1.0, float(half_life_seconds))
+        self.max_tracked = max(1, int(max_tracked))
+        self.clock = clock
+        self._lock = threading.Lock()
+        # key -> (score at last_seen, last_seen, display name as last requested)
+        self._scores: Dict[str, Tuple[float, float, str]] = {}
+
+    def record(self, location: str, count: float = 1.0):
+        key = normalize_location(location)
+        if not key:
+            return
+        now = self.clock()
+        with self._lock:
+            item = self._scores.get(key)
+            score = count if item is None else item[0] * math.exp(-self.decay * (now - item[1])) + count
+            self._scores[key] = (score, now, location)
+            if len(self._scores) > 2 * self.max_tracked:
+                self._prune(now)
+
+    def _score(self, item: Tuple[float, float, str], now: float) -> float:
+        return item[0] * math.exp(-self.decay * (now - item[1]))
+
+    def _prune(self, now: float):
+        # keep the max_tracked hottest entries; amortized over max_tracked records
+        keep = heapq.nlargest(self.max_tracked, self._scores.items(), key=lambda kv: self._score(kv[1], now))
+        self._scores = dict(keep)
+
+    def top(self, n: int) -> List[Tuple[str, float]]:
+        """
+        The n hottest locations as (location, decayed score), hottest first.
+        """
+        now = self.clock()
+        with self._lock:
+            items = list(self._scores.values())
+        hottest = heapq.nlargest(n, items, key=lambda item: self._score(item, now))
+        return [(item[2], round(self._score(item, now), 3)) for item in hottest]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._scores)
+
+
+class Prefetcher:
+    def __init__(self, refresh: RefreshFn, top_n: int = 20, lead_seconds: float = 60,
+                 interval_seconds: float = 15, max_requests_per_minute: float = 30,
+                 tracker: Optional[AccessTracker] = None):
+        self.refresh = refresh
+        self.top_n = max(1, int(top_n))
+        self.lead_seconds = max(0.0, float(lead_seconds))
+        # wake at least twice per lead window so no hot entry slips past its refresh window
+        interval = float(interval_seconds)
+        if self.lead_seconds > 0:
+            interval = min(interval, self.lead_seconds / 2)
+        self.interval = max(0.5, interval)
+        self.rate = max(0.0, float(max_requests_per_minute)) / 60.0
+        self.capacity = max(1.0, float(max_requests_per_minute))
+        self.tracker = tracker or AccessTracker()
+        self._tokens = self.capacity
+        self._refilled_at = time.monotonic()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {"cycles": 0, "refreshes": 0, "refresh_failures": 0, "skipped_fresh": 0, "budget_exhausted": 0}
+
+    def record(self, location: str, count: float = 1.0):
+        """
+        Count a user-facing lookup (or count of them, when seeding from history); starts
+        the background thread on first use.
+        """
+        self.tracker.record(location, count)
+        if self._thread is None:
+            self._start()
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is not None or self._stop.is_set():
+                return
+            self._thread = threading.Thread(target=self._run, name="ura-prefetcher", daemon=True)
+            self._thread.start()
+            logger.info("Prefetcher started (top_n=%d, lead=%.0fs, interval=%.1fs, budget=%.0f/min)",
+                        self.top_n, self.lead_seconds, self.interval, self.capacity)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.exception("Prefetch cycle failed: %s", e)
+
+    def _has_budget(self) -> bool:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+        return self._tokens >= 1.0
+
+    def run_once(self) -> int:
+        """
+        One prefetch cycle over the current top-N locations; returns the refreshes made.
+        A refresh of an entry that is still fresh costs no budget.
+        """
+        refreshed = 0
+        self._count("cycles")
+        for location, _ in self.tracker.top(self.top_n):
+            if self._stop.is_set():
+                break
+            if not self._has_budget():
+                self._count("budget_exhausted")
+                break
+            try:
+                fetched = self.refresh(location, self.lead_seconds)
+            except Exception as e:
+                # a failed refresh still went upstream (with retries), so it spends budget
+                self._tokens -= 1.0
+                self._count("refresh_failures")
+                logger.warning("Prefetch of %s failed: %s", location, e)
+                continue
+            if fetched:
+                self._tokens -= 1.0
+                refreshed += 1
+                self._count("refreshes")
+            else:
+                self._count("skipped_fresh")
+        if refreshed:
+            logger.info("Prefetcher refreshed %d hot locations", refreshed)
+        return refreshed
+
+    def _count(self, name: str):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["tracked"] = len(self.tracker)
+        stats["running"] = self._thread is not None and self._thread.is_alive()
+        return stats
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
@@ -0,0 +1,303 @@
+﻿# agent/snapshot_store.py
+"""
+Append-only local store of fetched weather reports (SQLite), owned by the Orchestrator.
+
+Every new real-mode observation is appended as one row (normalized location, fetch time,
+report JSON); rows are never updated. An index on (location, ts) serves "latest" and
+time-range lookups without scanning. Alongside, a small per-location table counts lookups
+and keeps the latest upstream payloads (geocoding record, forecast and its fetch time),
+which pre-warm the caches on the next start. Writes go through a bounded queue to a single
+writer thread that commits in batches, so request paths never wait on the disk; when the
+queue is full the write is dropped and counted. The database and the writer start on first
+use, so a process that never records or reads a snapshot never opens the file; if the
+file cannot be opened, snapshots are not recorded (logged once) and reads come back empty.
+
+The writer also runs maintenance every compact_interval_seconds:
+  - retention: rows older than retention_days, and all but the newest max_per_location
+    rows of each location, are deleted (lookup counts not updated for retention_days too)
+  - compaction: repeated rows of the same observation (same location and report
+    timestamp, e.g. fetches served from the forecast cache) collapse into the newest one
+"""
+import json
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from agent.weather_report import WeatherReport
+from tools.hourly_forecast import to_plain
+from utils.location_utils import normalize_location
+from utils.logger import setup_logger
+
+logger = setup_logger("snapshot_store", None)
+
+_STOP = object()
+
+
+class SnapshotStore:
+    def __init__(self, path: str, queue_size: int = 10000, batch_size: int = 500,
+                 retention_days: float = 30, max_per_location: int = 1000,
+                 compact_interval_seconds: float = 3600):
+        self.path = path
+        self.batch_size = max(1, int(batch_size))
+        self.retention_seconds = max(0.0, float(retention_days)) * 86400
+        self.max_per_location = max(0, int(max_per_location))
+        self.compact_interval = max(1.0, float(compact_interval_seconds))
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(1, int(queue_size)))
+        self._db_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {"appended": 0, "written": 0, "lookups_written": 0, "dropped": 0, "write_failures": 0,
+                       "compactions": 0, "deleted_retention": 0, "deleted_duplicates": 0}
+        self._db: Optional[sqlite3.Connection] = None
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        # None: not started yet; False: failed to open or closed
+        self._usable: Optional[bool] = None
+
+    def _started(self) -> bool:
+        if self._usable is None:
+            with self._start_lock:
+                if self._usable is None:
+                    try:
+                        self._db = self._open(self.path)
+                    except Exception as e:
+                        # history is a convenience; a broken store must not fail any request
+                        logger.warning("Snapshot store unavailable at %s (%s); not recording snapshots", self.path, e)
+                        self._usable = False
+                        return False
+                    self._thread = threading.Thread(target=self._run, name="ura-snapshots", daemon=True)
+                    self._thread.start()
+                    self._usable = True
+        return self._usable
+
+    def _open(self, path: str) -> sqlite3.Connection:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        # must precede table creation to take effect on a new file
+        db.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS snapshots ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT, location TEXT NOT NULL, ts REAL NOT NULL,"
+            " observed TEXT, source TEXT, report TEXT NOT NULL)"
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS snapshots_location_ts ON snapshots (location, ts)")
+        # seed: JSON of the latest upstream payloads (MCPWeatherTool.warm_entry)
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS lookups ("
+            " location TEXT PRIMARY KEY, lookups INTEGER NOT NULL, last_lookup REAL NOT NULL, seed TEXT)"
+        )
+        logger.info("Snapshot store opened at %s", path)
+        return db
+
+    def _count(self, name: str, n: int = 1):
+        with self._stats_lock:
+            self._stats[name] += n
+
+    def append(self, location: str, report: WeatherReport, ts: Optional[float] = None) -> bool:
+        """
+        Queue one report for writing (never blocks). False if it was dropped.
+        """
+        key = normalize_location(location)
+        if not key:
+            return False
+        item = ("snapshot", key, time.time() if ts is None else ts,
+                report.replace(raw=None) if report.raw is not None else report)
+        if not self._put(item):
+            return False
+        self._count("appended")
+        return True
+
+    def record_lookup(self, location: str, seed: Optional[Dict[str, Any]] = None, ts: Optional[float] = None) -> bool:
+        """
+        Count one lookup of location and, if given, replace its stored seed payloads
+        (serialized on the writer thread). Never blocks; False if it was dropped.
+        """
+        key = normalize_location(location)
+        if not key:
+            return False
+        return self._put(("lookup", key, time.time() if ts is None else ts, seed))
+
+    def _put(self, item: Tuple) -> bool:
+        if not self._started():
+            return False
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self._count("dropped")
+            return False
+        return True
+
+    def _run(self):
+        next_compaction = time.monotonic()
+        while True:
+            timeout = max(0.0, next_compaction - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            if item is not None:
+                batch = [item]
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                stopping = any(entry is _STOP for entry in batch)
+                self._write([entry for entry in batch if entry is not _STOP])
+                for _ in batch:
+                    self._queue.task_done()
+                if stopping:
+                    return
+            if time.monotonic() >= next_compaction:
+                self.compact()
+                next_compaction = time.monotonic() + self.compact_interval
+
+    def _write(self, batch: List[Tuple]):
+        if not batch:
+            return
+        rows = []
+        # lookups of one location within a batch collapse into one upsert: [count, last ts, seed]
+        lookups: Dict[str, List[Any]] = {}
+        try:
+            for kind, key, ts, value in batch:
+                if kind == "snapshot":
+                    rows.append((key, ts, value.timestamp, value.source,
+                                 json.dumps(value.to_dict(), ensure_ascii=False)))
+                    continue
+                pending = lookups.setdefault(key, [0, ts, None])
+                pending[0] += 1
+                pending[1] = max(pending[1], ts)
+                if value is not None:
+                    pending[2] = json.dumps(to_plain(value), ensure_ascii=False)
+            with self._db_lock:
+                self._db.execute("BEGIN")
+                try:
+                    self._db.executemany(
+                        "INSERT INTO snapshots (location, ts, observed, source, report) VALUES (?, ?, ?, ?, ?)", rows)
+                    self._db.executemany(
+                        "INSERT INTO lookups (location, lookups, last_lookup, seed) VALUES (?, ?, ?, ?)"
+                        " ON CONFLICT (location) DO UPDATE SET lookups = lookups + excluded.lookups,"
+                        " last_lookup = MAX(last_lookup, excluded.last_lookup), seed = COALESCE(excluded.seed, seed)",
+                        [(key, n, ts, seed) for key, (n, ts, seed) in lookups.items()])
+                    self._db.execute("COMMIT")
+                except Exception:
+                    self._db.execute("ROLLBACK")
+                    raise
+            self._count("written", len(rows))
+            self._count("lookups_written", len(batch) - len(rows))
+        except Exception as e:
+            self._count("write_failures", len(batch))
+            logger.warning("Failed to write %d weather snapshots and lookups: %s", len(batch), e)
+
+    def compact(self) -> Dict[str, int]:
+        """
+        Apply retention limits and collapse repeated observations; returns rows deleted.
+        """
+        deleted = {"retention": 0, "duplicates": 0}
+        if not self._started():
+            return deleted
+        try:
+            with self._db_lock:
+                if self.retention_seconds > 0:
+                    cutoff = time.time() - self.retention_seconds
+                    deleted["retention"] += self._db.execute("DELETE FROM snapshots WHERE ts < ?", (cutoff,)).rowcount
+                    self._db.execute("DELETE FROM lookups WHERE last_lookup < ?", (cutoff,))
+                if self.max_per_location > 0:
+                    deleted["retention"] += self._db.execute(
+                        "DELETE FROM snapshots WHERE id IN (SELECT id FROM ("
+                        " SELECT id, ROW_NUMBER() OVER (PARTITION BY location ORDER BY ts DESC, id DESC) AS n"
+                        " FROM snapshots) WHERE n > ?)", (self.max_per_location,)).rowcount
+                deleted["duplicates"] = self._db.execute(
+                    "DELETE FROM snapshots WHERE observed IS NOT NULL AND id NOT IN ("
+                    " SELECT MAX(id) FROM snapshots WHERE observed IS NOT NULL GROUP BY location, observed, source)"
+                ).rowcount
+                if deleted["retention"] or deleted["duplicates"]:
+                    # hand the freed pages back to the file system
+                    self._db.execute("PRAGMA incremental_vacuum")
+        except Exception as e:
+            logger.warning("Snapshot compaction failed: %s", e)
+            return deleted
+        self._count("compactions")
+        self._count("deleted_retention", deleted["retention"])
+        self._count("deleted_duplicates", deleted["duplicates"])
+        if deleted["retention"] or deleted["duplicates"]:
+            logger.info("Snapshot compaction deleted %d expired and %d duplicate rows",
+                        deleted["retention"], deleted["duplicates"])
+        return deleted
+
+    def _query(self, sql: str, params: Tuple = ()) -> List[Tuple]:
+        if not self._started():
+            return []
+        with self._db_lock:
+            if self._db is None:
+                return []
+            return self._db.execute(sql, params).fetchall()
+
+    def latest(self, location: str) -> Optional[WeatherReport]:
+        rows = self._query("SELECT report FROM snapshots WHERE location = ? ORDER BY ts DESC LIMIT 1",
+                           (normalize_location(location),))
+        return WeatherReport(**json.loads(rows[0][0])) if rows else None
+
+    def history(self, location: str, since: Optional[float] = None, until: Optional[float] = None,
+                limit: int = 100) -> List[Tuple[float, WeatherReport]]:
+        """
+        (fetch time, report) pairs for one location within [since, until], newest first.
+        """
+        rows = self._query(
+            "SELECT ts, report FROM snapshots WHERE location = ? AND ts >= ? AND ts <= ? ORDER BY ts DESC LIMIT ?",
+            (normalize_location(location), since if since is not None else float("-inf"),
+             until if until is not None else float("inf"), max(1, int(limit))),
+        )
+        return [(ts, WeatherReport(**json.loads(report))) for ts, report in rows]
+
+    def recent_locations(self, since: float, limit: int
+                         ) -> List[Tuple[str, int, Optional[WeatherReport], Optional[Dict[str, Any]]]]:
+        """
+        Locations looked up since `since`, most looked up first, as (normalized location,
+        lookup count, latest report or None, seed payloads or None). Used to pre-warm
+        caches on startup.
+        """
+        rows = self._query(
+            "SELECT location, lookups, seed, (SELECT report FROM snapshots s WHERE s.location = l.location"
+            " ORDER BY ts DESC LIMIT 1) FROM lookups l WHERE last_lookup >= ?"
+            " ORDER BY lookups DESC, last_lookup DESC LIMIT ?",
+            (since, max(1, int(limit))),
+        )
+        return [(location, n, WeatherReport(**json.loads(report)) if report else None,
+                 json.loads(seed) if seed else None) for location, n, seed, report in rows]
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """
+        Wait until everything queued so far is written. False on timeout.
+        """
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["queued"] = self._queue.qsize()
+        return stats
+
+    def close(self, timeout: float = 10.0):
+        """
+        Write what is still queued, then close the database.
+        """
+        with self._start_lock:
+            self._usable = False
+        if self._thread is not None and self._thread.is_alive():
+            try:
+                self._queue.put(_STOP, timeout=timeout)
+                self._thread.join(timeout)
+            except queue.Full:
+                logger.warning("Snapshot writer is stuck; %d queued snapshots not written", self._queue.qsize())
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -1,39 +1,55 @@
 ﻿# agent/weather_agent.py
-from typing import Dict, Any
+import time
+from typing import Dict, Any, List, Optional
+from tools.hourly_forecast import When
 from tools.mcp_weather_tool import MCPWeatherTool, WeatherToolError
+from agent.weather_report import WeatherReport
+from utils.location_utils import normalize_location
 from utils.logger import setup_logger
+from utils.metrics import metrics
+from utils.singleflight import SingleFlight
 
 logger = setup_logger("weather_agent", None)
 
+_REPORT_STAGE = metrics.histogram("tool_stage_seconds", stage="report")
+
 class WeatherAgent:
     """
     WeatherAgent: high-level agent that decides whether to call mock or real tool,
     validate results, and return a stable structure for orchestrator.
     """
 
-    def __init__(self, tool_config: Dict[str, Any], mode: str):
+    def __init__(self, tool_config: Dict[str, Any], mode: str, previous: Optional["WeatherAgent"] = None):
         self.mode = mode.lower()
         self.tool = MCPWeatherTool(tool_config, mode=self.mode)
+        # on hot reload, keep the replaced agent's warm caches/connections where config allows
+        if previous is not None:
+            kept = self.tool.inherit_warm_state(previous.tool)
+            if kept:
+                logger.info("WeatherAgent reused warm state from previous agent: %s", ", ".join(kept))
+        # concurrent fetches of the same normalized location share one upstream call
+        self.coalesce = bool(tool_config.get("coalesce_requests", True))
+        self._flights = SingleFlight()
+        self._fetch_latency = {outcome: metrics.histogram("agent_fetch_seconds", mode=self.mode, outcome=outcome)
+                               for outcome in ("ok", "error")}
         logger.info("WeatherAgent initialized in mode=%s", self.mode)
 
-    def fetch(self, location: str) -> Dict[str, Any]:
+    def fetch(self, location: str, include_raw: bool = False) -> WeatherReport:
         """
         Fetch weather with error handling and normalized output.
+        The raw upstream payload is only kept on the report when include_raw is True.
         """
+        started = time.perf_counter()
+        outcome = "error"
         try:
-            resp = self.tool.get_weather(location)
-            # Normalize response (ensure keys exist)
-            normalized = {
-                "location": resp.get("location") or location,
-                "timestamp": resp.get("timestamp"),
-                "summary": resp.get("weather", {}).get("summary"),
-                "temperature_c": resp.get("weather", {}).get("temperature_c"),
-                "humidity": resp.get("weather", {}).get("humidity"),
-                "wind_kmph": resp.get("weather", {}).get("wind_kmph"),
-                "source": resp.get("source", "unknown"),
-                "raw": resp.get("raw")
-            }
-            logger.info("WeatherAgent.fetch returned source=%s for location=%s", normalized["source"], location)
+            if self.coalesce:
+                resp = self._flights.do(normalize_location(location), lambda: self.tool.get_weather(location))
+            else:
+                resp = self.tool.get_weather(location)
+            with _REPORT_STAGE.time():
+                normalized = WeatherReport.from_tool_response(resp, location, include_raw)
+            logger.info("WeatherAgent.fetch returned source=%s for location=%s", normalized.source, location)
+            outcome = "ok"
             return normalized
         except WeatherToolError as e:
             logger.error("WeatherAgent failed to fetch weather: %s", e)
@@ -42,3 +58,80 @@ class WeatherAgent:
         except Exception as e:
             logger.exception("Unexpected error in WeatherAgent.fetch: %s", e)
             raise
+        finally:
+            self._fetch_latency[outcome].observe(time.perf_counter() - started)
+
+    async def afetch(self, location: str, include_raw: bool = False) -> WeatherReport:
+        """
+        Async counterpart of fetch; same normalized output and error behavior.
+        """
+        try:
+            resp = await self.tool.aget_weather(location)
+            normalized = WeatherReport.from_tool_response(resp, location, include_raw)
+            logger.info("WeatherAgent.afetch returned source=%s for location=%s", normalized.source, location)
+            return normalized
+        except WeatherToolError as e:
+            logger.error("WeatherAgent failed to fetch weather: %s", e)
+            raise
+        except Exception as e:
+            logger.exception("Unexpected error in WeatherAgent.afetch: %s", e)
+            raise
+
+    def fetch_at(self, location: str, when: When, include_raw: bool = False) -> WeatherReport:
+        """
+        Weather for the forecast hour nearest to `when`, from the cached hourly forecast.
+        """
+        try:
+            resp = self.tool.get_weather_at(location, when)
+        except WeatherToolError as e:
+            logger.error("WeatherAgent failed to fetch weather at %s: %s", when, e)
+            raise
+        return WeatherReport.from_tool_response(resp, location, include_raw)
+
+    def fetch_hourly(self, location: str, hours: int = 24, start: Optional[When] = None) -> List[WeatherReport]:
+        """
+        One WeatherReport per hour for the next `hours` hours (from `start`, default now).
+        """
+        try:
+            resp = self.tool.get_hourly_forecast(location, hours, start)
+        except WeatherToolError as e:
+            logger.error("WeatherAgent failed to fetch hourly forecast: %s", e)
+            raise
+        base = {"location": resp.get("location"), "source": resp.get("source", "unknown")}
+        return [WeatherReport.from_tool_response(dict(base, **hour), location) for hour in resp["hours"]]
+
+    def fetch_many(self, locations: List[str], include_raw: bool = False) -> Dict[str, Dict[str, Any]]:
+        """
+        Batch fetch. Returns {"results": {location: normalized}, "errors": {location: message}};
+        a failure for one location never fails the whole batch.
+        """
+        batch = self.tool.get_weather_many(locations)
+        results = {loc: WeatherReport.from_tool_response(resp, loc, include_raw) for loc, resp in batch["results"].items()}
+        errors = dict(batch["errors"])
+        for loc, message in errors.items():
+            logger.error("WeatherAgent failed to fetch weather for %s: %s", loc, message)
+        logger.info("WeatherAgent.fetch_many returned %d results and %d errors", len(results), len(errors))
+        return {"results": results, "errors": errors}
+
+    def prefetch(self, location: str, lead_seconds: float) -> bool:
+        """
+        Background refresh of a hot location's cached forecast (see agent/prefetcher.py).
+        """
+        return self.tool.prefetch(location, lead_seconds)
+
+    def warm_entry(self, location: str) -> Optional[Dict[str, Any]]:
+        """
+        Cached upstream payloads for location, for the orchestrator to persist (MCPWeatherTool.warm_entry).
+        """
+        return self.tool.warm_entry(location)
+
+    def seed(self, location: str, entry: Dict[str, Any]) -> bool:
+        return self.tool.seed(location, entry)
+
+    def cache_stats(self) -> Dict[str, Any]:
+        stats = self.tool.cache_stats()
+        stats["coalescing"] = self._flights.stats()
+        return stats
+
+    def close(self):
+        self.tool.close()
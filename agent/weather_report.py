@@ -0,0 +1,82 @@
+﻿# agent/weather_report.py
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, Optional
+from tools.hourly_forecast import to_plain
+
+
+class WeatherReport(Mapping):
+    """
+    Compact, immutable weather result returned by WeatherAgent / Orchestrator.
+
+    Slotted (no per-instance __dict__) and read-only. It is also a read-only Mapping, so
+    existing callers that use result["summary"] or result.get("source") keep working;
+    to_dict() returns a plain, JSON-serializable dict (raw included, with any columnar
+    hourly block expanded back to Open-Meteo lists).
+    The raw upstream payload is only kept when the caller asked for it (include_raw=True).
+    """
+
+    __slots__ = ("location", "timestamp", "summary", "temperature_c", "humidity", "wind_kmph", "source", "raw")
+
+    def __init__(self, location: Optional[str], timestamp: Optional[str], summary: Optional[str],
+                 temperature_c: Optional[float], humidity: Optional[float], wind_kmph: Optional[float],
+                 source: str = "unknown", raw: Optional[Dict[str, Any]] = None):
+        setter = object.__setattr__
+        setter(self, "location", location)
+        setter(self, "timestamp", timestamp)
+        setter(self, "summary", summary)
+        setter(self, "temperature_c", temperature_c)
+        setter(self, "humidity", humidity)
+        setter(self, "wind_kmph", wind_kmph)
+        setter(self, "source", source)
+        setter(self, "raw", raw)
+
+    @classmethod
+    def from_tool_response(cls, resp: Dict[str, Any], location: str, include_raw: bool = False) -> "WeatherReport":
+        weather = resp.get("weather") or {}
+        return cls(
+            location=resp.get("location") or location,
+            timestamp=resp.get("timestamp"),
+            summary=weather.get("summary"),
+            temperature_c=weather.get("temperature_c"),
+            humidity=weather.get("humidity"),
+            wind_kmph=weather.get("wind_kmph"),
+            source=resp.get("source", "unknown"),
+            raw=resp.get("raw") if include_raw else None,
+        )
+
+    def replace(self, **changes: Any) -> "WeatherReport":
+        values = {name: getattr(self, name) for name in self.__slots__}
+        values.update(changes)
+        return WeatherReport(**values)
+
+    def to_dict(self) -> Dict[str, Any]:
+        values = {name: getattr(self, name) for name in self.__slots__}
+        if values["raw"] is not None:
+            values["raw"] = to_plain(values["raw"])
+        return values
+
+    def __setattr__(self, name: str, value: Any):
+        raise AttributeError("WeatherReport is immutable")
+
+    def __delattr__(self, name: str):
+        raise AttributeError("WeatherReport is immutable")
+
+    def __reduce__(self):
+        # slots + blocked __setattr__ defeat default pickling (needed for process pools)
+        return (WeatherReport, tuple(getattr(self, name) for name in self.__slots__))
+
+    # Mapping interface (dict view for backward compatibility)
+    def __getitem__(self, key: str) -> Any:
+        if key in self.__slots__:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.__slots__)
+
+    def __len__(self) -> int:
+        return len(self.__slots__)
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__ if name != "raw")
+        return f"WeatherReport({fields}{', raw=...' if self.raw is not None else ''})"
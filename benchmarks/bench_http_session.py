@@ -0,0 +1,72 @@
+﻿# benchmarks/bench_http_session.py
+"""
+Per-request latency of MCPWeatherTool._request_with_retries with the pooled keep-alive
+session versus a fresh connection per call (the previous module-level requests.get).
+
+Run from the repository root:
+    python -m benchmarks.bench_http_session --requests 500
+"""
+import argparse
+import statistics
+import time
+from unittest import mock
+
+import requests
+
+from benchmarks.stub_open_meteo import StubOpenMeteoServer
+from tools.mcp_weather_tool import MCPWeatherTool
+
+
+def _timed_calls(tool: MCPWeatherTool, url: str, n: int):
+    samples = []
+    for i in range(n):
+        t0 = time.perf_counter()
+        tool._request_with_retries(url, params={"name": f"city-{i % 50}", "count": 1}, desc="geocoding")
+        samples.append((time.perf_counter() - t0) * 1000.0)
+    return samples
+
+
+def _summary(samples):
+    ordered = sorted(samples)
+    return {
+        "mean_ms": round(statistics.fmean(ordered), 3),
+        "p50_ms": round(ordered[len(ordered) // 2], 3),
+        "p95_ms": round(ordered[int(len(ordered) * 0.95) - 1], 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pooled session vs per-call connection benchmark")
+    parser.add_argument("--requests", type=int, default=300)
+    args = parser.parse_args()
+
+    with StubOpenMeteoServer() as stub:
+        config = {
+            "geocoding_endpoint": stub.geocoding_endpoint,
+            "forecast_endpoint": stub.forecast_endpoint,
+            "geocode_cache_path": None,
+            "timeout_seconds": 5,
+            "max_retries": 1,
+            # the stub has no quota; measure the client, not the shared rate limiter
+            "rate_limit_per_second": 0,
+        }
+        tool = MCPWeatherTool(config, mode="real")
+        # silence per-call info logs so they don't dominate the measurement
+        with mock.patch("tools.mcp_weather_tool.logger.info"):
+            _timed_calls(tool, stub.geocoding_endpoint, 20)  # warm-up
+            pooled = _timed_calls(tool, stub.geocoding_endpoint, args.requests)
+
+            # Baseline: one new connection per request, like the old requests.get call
+            with mock.patch.object(MCPWeatherTool, "_get_session", lambda self: requests):
+                fresh = _timed_calls(tool, stub.geocoding_endpoint, args.requests)
+        tool.close()
+
+    p, f = _summary(pooled), _summary(fresh)
+    print(f"requests per variant : {args.requests}")
+    print(f"new connection/call  : {f}")
+    print(f"pooled keep-alive    : {p}")
+    print(f"mean speed-up        : {f['mean_ms'] / p['mean_ms']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+﻿# benchmarks/bench_offline_geocoder.py
+"""
+Offline gazetteer geocoder: build time, memory and per-lookup latency on a large
+synthetic gazetteer (deterministic pronounceable names, realistic population skew).
+
+Run from the repository root:
+    python -m benchmarks.bench_offline_geocoder --rows 150000
+    python -m benchmarks.bench_offline_geocoder --path /data/geonames-cities.csv
+"""
+import argparse
+import csv
+import gc
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from tools.offline_geocoder import OfflineGeocoder
+
+_SYLLABLES = ["ka", "ri", "to", "ma", "len", "san", "bur", "ville", "do", "ra", "ne", "pol", "vik", "ha",
+              "mon", "ter", "lu", "gra", "stad", "or", "an", "el", "bad", "ko", "sel", "ford", "mar", "ti"]
+
+
+def _write_synthetic(path: str, rows: int, seed: int):
+    rnd = random.Random(seed)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["name", "country", "country_code", "latitude", "longitude", "population"])
+        for _ in range(rows):
+            name = "".join(rnd.choice(_SYLLABLES) for _ in range(rnd.randint(2, 4))).capitalize()
+            code = f"C{rnd.randint(0, 199):03d}"
+            writer.writerow([name, f"Country {code}", code, round(rnd.uniform(-60, 70), 5),
+                             round(rnd.uniform(-180, 180), 5), int(rnd.paretovariate(1.2) * 1000)])
+
+
+def _per_lookup_us(fn, queries):
+    t0 = time.perf_counter()
+    for q in queries:
+        fn(q)
+    return (time.perf_counter() - t0) / len(queries) * 1e6
+
+
+def _typo(rnd: random.Random, name: str) -> str:
+    i = rnd.randrange(1, len(name) - 1)
+    return name[:i] + name[i + 1:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline gazetteer geocoder benchmark")
+    parser.add_argument("--rows", type=int, default=150_000, help="synthetic gazetteer size")
+    parser.add_argument("--path", type=str, default=None, help="benchmark an existing gazetteer CSV instead")
+    parser.add_argument("--queries", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="ura-gazetteer-") as tmp:
+        path = args.path
+        if path is None:
+            path = os.path.join(tmp, "cities.csv")
+            _write_synthetic(path, args.rows, args.seed)
+        size_mb = os.path.getsize(path) / 1024 / 1024
+
+        geocoder = OfflineGeocoder(path)
+        build_ms = geocoder.build_ms
+        t0 = time.perf_counter()
+        geocoder._deletion_index()
+        fuzzy_build_ms = (time.perf_counter() - t0) * 1000.0
+        del geocoder
+
+        # second build under tracemalloc (which slows it down) for the memory figures
+        gc.collect()
+        tracemalloc.start()
+        geocoder = OfflineGeocoder(path)
+        index_bytes, peak = tracemalloc.get_traced_memory()
+        geocoder._deletion_index()
+        fuzzy_bytes = tracemalloc.get_traced_memory()[0] - index_bytes
+        tracemalloc.stop()
+
+        print(f"gazetteer            : {len(geocoder)} places, {size_mb:.1f} MiB CSV")
+        print(f"build time           : {build_ms:8.1f} ms (fuzzy index on first use: {fuzzy_build_ms:.1f} ms)")
+        print(f"index memory         : {index_bytes / 1024 / 1024:8.1f} MiB (peak while building {peak / 1024 / 1024:.1f} MiB)")
+        print(f"fuzzy index memory   : {fuzzy_bytes / 1024 / 1024:8.1f} MiB")
+
+        rnd = random.Random(args.seed)
+        names = [geocoder._names[rnd.randrange(len(geocoder))] for _ in range(args.queries)]
+        misses = [f"Nowhere {i}" for i in range(args.queries)]
+        prefixes = [n[:4] for n in names]
+        fuzzy_count = max(1, args.queries // 20)
+        typos = [_typo(rnd, n) for n in names[:fuzzy_count]]
+
+        print(f"exact lookup (hit)   : {_per_lookup_us(geocoder.lookup, names):8.2f} us")
+        print(f"exact lookup (miss)  : {_per_lookup_us(geocoder.lookup, misses):8.2f} us")
+        print(f"prefix (4 chars)     : {_per_lookup_us(geocoder.prefix, prefixes):8.2f} us")
+        found = sum(1 for q in typos if geocoder.lookup(q, fuzzy=True) is not None)
+        print(f"fuzzy (1 deletion)   : {_per_lookup_us(lambda q: geocoder.lookup(q, fuzzy=True), typos):8.2f} us "
+              f"({found}/{len(typos)} resolved)")
+
+
+if __name__ == "__main__":
+    main()
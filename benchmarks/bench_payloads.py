@@ -0,0 +1,120 @@
+﻿# benchmarks/bench_payloads.py
+"""
+Bytes transferred and JSON decode time per forecast lookup, by fetch profile:
+  - full: current weather + hourly_variables for forecast_days (default config)
+  - lean: current weather + the current hour's humidity (weather.forecast_profile = "lean")
+Each profile's forecast responses are recorded from the local Open-Meteo stub, once
+uncompressed and once with Accept-Encoding: gzip, and the recorded bodies are then
+decoded with every installed JSON backend (utils/json_backend.py).
+
+Run from the repository root:
+    python -m benchmarks.bench_payloads --lookups 200
+    python -m benchmarks.bench_payloads --record benchmarks/results/payloads
+    python -m benchmarks.bench_payloads --payloads benchmarks/results/payloads
+--payloads replays previously recorded bodies (e.g. captured from the real API, one
+<profile>-<n>.json file per response); wire size is then estimated by gzipping locally.
+"""
+import argparse
+import gzip
+import os
+import time
+from collections import defaultdict
+from typing import Dict, List
+from unittest import mock
+
+from benchmarks.stub_open_meteo import StubOpenMeteoServer
+from tools.mcp_weather_tool import MCPWeatherTool, _wire_bytes
+from utils import json_backend
+
+PROFILES = ("full", "lean")
+
+
+def _record(stub: StubOpenMeteoServer, profile: str, lookups: int) -> Dict[str, List]:
+    config = {
+        "geocoding_endpoint": stub.geocoding_endpoint,
+        "forecast_endpoint": stub.forecast_endpoint,
+        "geocode_cache_path": None,
+        "forecast_profile": profile,
+    }
+    tool = MCPWeatherTool(config, mode="real")
+    session = tool._get_session()
+    recorded = {"identity": [], "gzip": [], "bodies": []}
+    for i in range(lookups):
+        params = tool._forecast_params(round(-60 + i * 0.61, 4), round(-170 + i * 1.7, 4))
+        for encoding in ("identity", "gzip"):
+            resp = session.get(stub.forecast_endpoint, params=params, headers={"Accept-Encoding": encoding}, timeout=5)
+            resp.raise_for_status()
+            recorded[encoding].append(_wire_bytes(resp))
+        recorded["bodies"].append(resp.content)
+    tool.close()
+    return recorded
+
+
+def _load(directory: str) -> Dict[str, Dict[str, List]]:
+    by_profile: Dict[str, Dict[str, List]] = defaultdict(lambda: {"identity": [], "gzip": [], "bodies": []})
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".json"):
+            continue
+        with open(os.path.join(directory, name), "rb") as f:
+            body = f.read()
+        recorded = by_profile[name.split("-", 1)[0]]
+        recorded["bodies"].append(body)
+        recorded["identity"].append(len(body))
+        recorded["gzip"].append(len(gzip.compress(body, compresslevel=6)))
+    return dict(by_profile)
+
+
+def _decode_us(bodies: List[bytes], rounds: int) -> float:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for body in bodies:
+            json_backend.loads(body)
+    return (time.perf_counter() - started) / (rounds * len(bodies)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Forecast payload size and decode time per fetch profile")
+    parser.add_argument("--lookups", type=int, default=200, help="responses recorded per profile")
+    parser.add_argument("--rounds", type=int, default=20, help="decode passes over the recorded bodies")
+    parser.add_argument("--record", help="also save the recorded bodies to this directory")
+    parser.add_argument("--payloads", help="replay bodies recorded earlier instead of using the stub")
+    args = parser.parse_args()
+
+    if args.payloads:
+        recordings = _load(args.payloads)
+    else:
+        with StubOpenMeteoServer(compress=True) as stub, mock.patch("tools.mcp_weather_tool.logger.info"):
+            recordings = {profile: _record(stub, profile, args.lookups) for profile in PROFILES}
+        if args.record:
+            os.makedirs(args.record, exist_ok=True)
+            for profile, recorded in recordings.items():
+                for i, body in enumerate(recorded["bodies"]):
+                    with open(os.path.join(args.record, f"{profile}-{i}.json"), "wb") as f:
+                        f.write(body)
+
+    backends = json_backend.available()
+    default = json_backend.backend()
+    print(f"json backends: {', '.join(backends)} (default {default})")
+    header = f"{'profile':8} {'lookups':>7} {'bytes':>8} {'gzip bytes':>10}" + "".join(
+        f" {name + ' us':>10}" for name in backends)
+    print(header)
+    try:
+        for profile, recorded in recordings.items():
+            n = len(recorded["bodies"])
+            if not n:
+                continue
+            row = (f"{profile:8} {n:7d} {sum(recorded['identity']) / n:8.0f}"
+                   f" {sum(recorded['gzip']) / n:10.0f}")
+            for name in backends:
+                json_backend.use(name)
+                _decode_us(recorded["bodies"], 1)  # warm-up
+                row += f" {_decode_us(recorded['bodies'], args.rounds):10.1f}"
+            print(row)
+    finally:
+        json_backend.use(default)
+    print("bytes: uncompressed response body; gzip bytes: on the wire with Accept-Encoding: gzip;"
+          " us: decode time per lookup")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+﻿# benchmarks/bench_report_memory.py
+"""
+Memory held by N weather results: the previous per-result dict (always carrying `raw`)
+versus the slotted WeatherReport with and without the raw payload.
+
+Run from the repository root:
+    python -m benchmarks.bench_report_memory --count 100000
+"""
+import argparse
+import gc
+import json
+import tracemalloc
+
+from agent.weather_report import WeatherReport
+
+# A recorded-style real-mode tool response (geocoding + current_weather forecast)
+_TOOL_RESPONSE = json.dumps({
+    "location": "London, United Kingdom",
+    "timestamp": "2025-12-01T14:00",
+    "weather": {"summary": "Partly cloudy", "temperature_c": 11.2, "humidity": 72, "wind_kmph": 18.4},
+    "raw": {
+        "geocoding": {
+            "id": 2643743, "name": "London", "latitude": 51.50853, "longitude": -0.12574, "elevation": 25.0,
+            "feature_code": "PPLC", "country_code": "GB", "admin1_id": 6269131, "admin2_id": 2648110,
+            "timezone": "Europe/London", "population": 7556900, "country_id": 2635167,
+            "country": "United Kingdom", "admin1": "England", "admin2": "Greater London",
+        },
+        "forecast": {
+            "latitude": 51.5, "longitude": -0.120000124, "generationtime_ms": 0.0420808792114258,
+            "utc_offset_seconds": 0, "timezone": "Europe/London", "timezone_abbreviation": "GMT",
+            "elevation": 23.0,
+            "current_weather_units": {"time": "iso8601", "interval": "seconds", "temperature": "°C",
+                                      "windspeed": "km/h", "winddirection": "°", "is_day": "", "weathercode": "wmo code"},
+            "current_weather": {"time": "2025-12-01T14:00", "interval": 900, "temperature": 11.2,
+                                "windspeed": 18.4, "winddirection": 236, "is_day": 1, "weathercode": 2},
+        },
+    },
+    "source": "real",
+})
+
+
+def _old_dict(resp, location):
+    # representation returned by WeatherAgent.fetch before WeatherReport
+    return {
+        "location": resp.get("location") or location,
+        "timestamp": resp.get("timestamp"),
+        "summary": resp.get("weather", {}).get("summary"),
+        "temperature_c": resp.get("weather", {}).get("temperature_c"),
+        "humidity": resp.get("weather", {}).get("humidity"),
+        "wind_kmph": resp.get("weather", {}).get("wind_kmph"),
+        "source": resp.get("source", "unknown"),
+        "raw": resp.get("raw"),
+    }
+
+
+def _measure(label, count, build):
+    gc.collect()
+    tracemalloc.start()
+    # each upstream response is decoded separately, as in a real batch run
+    kept = [build(json.loads(_TOOL_RESPONSE), f"city-{i}") for i in range(count)]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    gc.collect()
+    print(f"{label:<28}: {current / 1024 / 1024:8.1f} MiB  ({current / count:7.0f} B/result)")
+    return current
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WeatherReport vs dict memory benchmark")
+    parser.add_argument("--count", type=int, default=100_000)
+    args = parser.parse_args()
+
+    print(f"results kept in memory: {args.count}")
+    old = _measure("dict + raw (previous)", args.count, _old_dict)
+    new_raw = _measure("WeatherReport, raw kept", args.count,
+                       lambda r, loc: WeatherReport.from_tool_response(r, loc, include_raw=True))
+    new = _measure("WeatherReport (default)", args.count,
+                   lambda r, loc: WeatherReport.from_tool_response(r, loc))
+    print(f"reduction vs previous     : {old / new:.1f}x (raw kept: {old / new_raw:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
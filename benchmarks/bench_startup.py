@@ -0,0 +1,110 @@
+﻿# benchmarks/bench_startup.py
+"""
+Cold-start benchmark: wall time of fresh interpreter runs and which heavy modules they import.
+
+Measures, each in a new process:
+  - import of agent.orchestrator
+  - a one-shot demo lookup (Orchestrator(watch=False) + fetch_weather + stop)
+  - main.py --mode demo --no-watch end to end
+and reports `python -X importtime` top offenders for the demo run.
+
+Use the thresholds to catch regressions in CI:
+    python -m benchmarks.bench_startup --runs 5 --max-ms 1500 --forbid requests,watchdog
+exits with status 1 if the median one-shot time exceeds --max-ms or a forbidden module is
+imported on the demo path.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_ONE_SHOT = """
+import json, sys
+from agent.orchestrator import Orchestrator
+o = Orchestrator("config/settings.json", cli_mode="demo", watch=False)
+o.fetch_weather("Rajkot")
+o.stop()
+print(json.dumps(sorted(m for m in sys.modules if "." not in m)))
+"""
+
+_SCENARIOS = {
+    "import_orchestrator": [sys.executable, "-c", "import agent.orchestrator"],
+    "one_shot_demo": [sys.executable, "-c", _ONE_SHOT],
+    "main_demo_no_watch": [sys.executable, "main.py", "--mode", "demo", "--no-watch"],
+}
+
+
+def _run(cmd):
+    t0 = time.perf_counter()
+    proc = subprocess.run(cmd, cwd=REPO_ROOT, capture_output=True, text=True)
+    elapsed = (time.perf_counter() - t0) * 1000.0
+    if proc.returncode != 0:
+        raise RuntimeError(f"{cmd} failed ({proc.returncode}): {proc.stderr[-500:]}")
+    return elapsed, proc.stdout
+
+
+def _import_offenders(limit: int):
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", _ONE_SHOT], cwd=REPO_ROOT,
+                          capture_output=True, text=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        try:
+            rows.append((int(cumulative.strip()), name.rstrip()))
+        except ValueError:
+            continue
+    # top-level entries and their direct children (importtime indents nesting by two spaces)
+    shallow = [(us, name.strip()) for us, name in rows if not name.startswith("    ")]
+    return sorted(shallow, reverse=True)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold start / import-time benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, default=None, help="fail if median one-shot demo time exceeds this")
+    parser.add_argument("--forbid", type=str, default="requests,watchdog",
+                        help="comma-separated modules that must not be imported on the demo path")
+    parser.add_argument("--output", type=str, default=None, help="write results as JSON")
+    args = parser.parse_args()
+
+    results = {}
+    loaded = []
+    for name, cmd in _SCENARIOS.items():
+        samples = []
+        for _ in range(args.runs):
+            elapsed, stdout = _run(cmd)
+            samples.append(elapsed)
+            if name == "one_shot_demo":
+                loaded = json.loads(stdout.strip().splitlines()[-1])
+        results[name] = {"median_ms": round(statistics.median(samples), 1), "min_ms": round(min(samples), 1)}
+        print(f"{name:<22}: median {results[name]['median_ms']:7.1f} ms  min {results[name]['min_ms']:7.1f} ms")
+
+    print("\nslowest imports, top two levels (one-shot demo):")
+    for us, name in _import_offenders(8):
+        print(f"  {us / 1000:7.1f} ms  {name}")
+
+    forbidden = [m.strip() for m in args.forbid.split(",") if m.strip()]
+    violations = [m for m in forbidden if m in loaded]
+    results["forbidden_imported"] = violations
+    print(f"\nforbidden modules imported on demo path: {violations or 'none'}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    failed = bool(violations)
+    if args.max_ms is not None and results["one_shot_demo"]["median_ms"] > args.max_ms:
+        print(f"one-shot demo median exceeds {args.max_ms} ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+﻿# benchmarks/run_benchmarks.py
+"""
+Offline end-to-end benchmark suite.
+
+Drives MCPWeatherTool, WeatherAgent and Orchestrator in demo and real mode (real mode
+against the local StubOpenMeteoServer, so no network is needed) at several concurrency
+levels and location counts, and reports p50/p95/p99 latency, throughput and errors.
+
+Every scenario builds a fresh component (cold caches, temp geocoding cache file) and issues
+--requests calls cycling over N distinct locations, so the location count controls the
+cache hit ratio.
+
+Run from the repository root:
+    python -m benchmarks.run_benchmarks --latency-ms 20 --jitter-ms 10 --error-rate 0.01
+    python -m benchmarks.run_benchmarks --layers tool --modes real --concurrency 1,32
+    python -m benchmarks.run_benchmarks --compare benchmarks/results/<older>.json
+
+Results are written as JSON (default benchmarks/results/<timestamp>.json) so runs from
+different releases can be diffed with --compare.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.stub_open_meteo import StubOpenMeteoServer
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_ROOT, "benchmarks", "results")
+DEMO_DATA_PATH = os.path.join(REPO_ROOT, "data", "mock_data", "weather.json")
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    # nearest-rank percentile on an already sorted list
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100.0 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def _tool_config(stub: StubOpenMeteoServer, cache_dir: str) -> Dict[str, Any]:
+    from utils.config_manager import WeatherConfig
+
+    config = WeatherConfig(
+        geocoding_endpoint=stub.geocoding_endpoint,
+        forecast_endpoint=stub.forecast_endpoint,
+        demo_data_path=DEMO_DATA_PATH,
+        timeout_seconds=5,
+        max_retries=2,
+        # the stub has no quota; measure the client, not the shared rate limiter
+        rate_limit_per_second=0,
+    ).dict()
+    config["geocode_cache_path"] = os.path.join(cache_dir, "geocoding.sqlite3")
+    return config
+
+
+class _Layer:
+    """
+    One component under test: build() returns (call, close) for a mode.
+    """
+
+    def __init__(self, name: str, build: Callable[[str, Dict[str, Any], str], Any]):
+        self.name = name
+        self.build = build
+
+
+def _build_tool(mode: str, config: Dict[str, Any], cache_dir: str):
+    from tools.mcp_weather_tool import MCPWeatherTool
+
+    tool = MCPWeatherTool(config, mode=mode)
+    return tool.get_weather, tool.close, tool.cache_stats
+
+
+def _build_agent(mode: str, config: Dict[str, Any], cache_dir: str):
+    from agent.weather_agent import WeatherAgent
+
+    agent = WeatherAgent(config, mode=mode)
+    return agent.fetch, agent.close, agent.cache_stats
+
+
+def _build_orchestrator(mode: str, config: Dict[str, Any], cache_dir: str):
+    from agent.orchestrator import Orchestrator
+
+    settings_path = os.path.join(cache_dir, "settings.json")
+    with open(settings_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "mode": mode,
+            "hot_reload": False,
+            "weather": config,
+            "logging": {"level": "WARNING", "path": None, "queue": False},
+        }, f)
+    orchestrator = Orchestrator(settings_path, cli_mode=mode, watch=False)
+    return orchestrator.fetch_weather, orchestrator.stop, orchestrator.cache_stats
+
+
+LAYERS = {
+    "tool": _Layer("tool", _build_tool),
+    "agent": _Layer("agent", _build_agent),
+    "orchestrator": _Layer("orchestrator", _build_orchestrator),
+}
+
+
+def run_scenario(layer: _Layer, mode: str, concurrency: int, location_count: int, requests_count: int,
+                 stub: StubOpenMeteoServer) -> Dict[str, Any]:
+    locations = [f"Benchmark City {i}" for i in range(location_count)]
+    with tempfile.TemporaryDirectory(prefix="ura-bench-") as cache_dir:
+        call, close, cache_stats = layer.build(mode, _tool_config(stub, cache_dir), cache_dir)
+        upstream_before = sum(stub.stats().values())
+        latencies: List[float] = []
+        errors = 0
+
+        def one(i: int):
+            t0 = time.perf_counter()
+            try:
+                call(locations[i % location_count])
+                ok = True
+            except Exception:
+                ok = False
+            return (time.perf_counter() - t0) * 1000.0, ok
+
+        try:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                for elapsed_ms, ok in pool.map(one, range(requests_count)):
+                    latencies.append(elapsed_ms)
+                    errors += 0 if ok else 1
+            wall = time.perf_counter() - started
+            stats = cache_stats()
+        finally:
+            close()
+
+    latencies.sort()
+    return {
+        "layer": layer.name,
+        "mode": mode,
+        "concurrency": concurrency,
+        "locations": location_count,
+        "requests": requests_count,
+        "errors": errors,
+        "throughput_rps": round(requests_count / wall, 1) if wall > 0 else None,
+        "p50_ms": round(_percentile(latencies, 50), 3),
+        "p95_ms": round(_percentile(latencies, 95), 3),
+        "p99_ms": round(_percentile(latencies, 99), 3),
+        "mean_ms": round(statistics.fmean(latencies), 3),
+        "max_ms": round(latencies[-1], 3),
+        "upstream_requests": sum(stub.stats().values()) - upstream_before if mode == "real" else 0,
+        "cache_stats": stats,
+    }
+
+
+def _scenario_key(row: Dict[str, Any]) -> tuple:
+    return row["layer"], row["mode"], row["concurrency"], row["locations"]
+
+
+def compare(previous_path: str, current: Dict[str, Any]):
+    with open(previous_path, "r", encoding="utf-8") as f:
+        previous = json.load(f)
+    old_rows = {_scenario_key(r): r for r in previous.get("results", [])}
+    print(f"\ncompared with {previous_path} ({previous.get('meta', {}).get('git_revision', '?')}):")
+    print(f"{'scenario':<36} {'p50':>16} {'p99':>16} {'rps':>16}")
+    for row in current["results"]:
+        old = old_rows.get(_scenario_key(row))
+        if old is None:
+            continue
+        label = "{}/{} c={} n={}".format(*_scenario_key(row))
+        cells = []
+        for field in ("p50_ms", "p99_ms", "throughput_rps"):
+            before, after = old.get(field) or 0, row.get(field) or 0
+            change = f"{(after - before) / before * 100:+.0f}%" if before else "n/a"
+            cells.append(f"{after:>9.2f} {change:>6}")
+        print(f"{label:<36} {cells[0]:>16} {cells[1]:>16} {cells[2]:>16}")
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        proc = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True)
+        return proc.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def _str_list(value: str) -> List[str]:
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline latency/throughput benchmark suite")
+    parser.add_argument("--layers", type=_str_list, default=list(LAYERS), help="comma-separated: tool,agent,orchestrator")
+    parser.add_argument("--modes", type=_str_list, default=["demo", "real"])
+    parser.add_argument("--concurrency", type=_int_list, default=[1, 8, 32])
+    parser.add_argument("--locations", type=_int_list, default=[10, 100])
+    parser.add_argument("--requests", type=int, default=200, help="calls per scenario")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="stub base latency per upstream request")
+    parser.add_argument("--jitter-ms", type=float, default=10.0, help="extra uniform random stub latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of stub responses that are 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="fraction of stub responses that are 429")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=str, default=None, help="JSON results path")
+    parser.add_argument("--compare", type=str, default=None, help="previous results JSON to diff against")
+    args = parser.parse_args()
+
+    unknown = [name for name in args.layers if name not in LAYERS]
+    if unknown:
+        parser.error(f"unknown layers: {unknown}")
+    # per-request logs (and injected-failure tracebacks) would dominate the measurement
+    logging.disable(logging.CRITICAL)
+
+    results = []
+    with StubOpenMeteoServer(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                             throttle_rate=args.throttle_rate, seed=args.seed) as stub:
+        for name in args.layers:
+            for mode in args.modes:
+                for concurrency in args.concurrency:
+                    for location_count in args.locations:
+                        row = run_scenario(LAYERS[name], mode, concurrency, location_count, args.requests, stub)
+                        results.append(row)
+                        print(f"{name:<12} {mode:<4} c={concurrency:<3} n={location_count:<4} "
+                              f"p50 {row['p50_ms']:8.2f} ms  p95 {row['p95_ms']:8.2f} ms  p99 {row['p99_ms']:8.2f} ms  "
+                              f"{row['throughput_rps']:8.1f} req/s  errors {row['errors']}  upstream {row['upstream_requests']}")
+
+    report = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "stub": {"latency_ms": args.latency_ms, "jitter_ms": args.jitter_ms, "error_rate": args.error_rate,
+                     "throttle_rate": args.throttle_rate, "seed": args.seed},
+            "requests_per_scenario": args.requests,
+        },
+        "results": results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, default=str)
+    print(f"\nresults written to {output}")
+
+    if args.compare:
+        compare(args.compare, report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,194 @@
+﻿# benchmarks/stub_open_meteo.py
+"""
+Local stub of the Open-Meteo geocoding and forecast endpoints for offline benchmarks.
+Speaks HTTP/1.1 with keep-alive so connection reuse can be measured.
+
+Fault injection (all optional):
+  latency_ms / jitter_ms : per-request delay, uniform in [latency, latency + jitter]
+  error_rate             : fraction of requests answered with 500
+  throttle_rate          : fraction of requests answered with 429 + Retry-After
+With compress=True, bodies are gzipped for clients that send Accept-Encoding: gzip
+(as Open-Meteo does).
+Request counts per endpoint are available via stats() to verify caching/batching.
+"""
+import gzip
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def _geocoding_payload(name: str) -> dict:
+    # deterministic fake coordinates derived from the name
+    h = sum(ord(c) for c in name.lower())
+    return {
+        "results": [{
+            "name": name.title(),
+            "country": "Stubland",
+            "latitude": round((h % 180) - 90 + 0.1234, 4),
+            "longitude": round((h * 7 % 360) - 180 + 0.5678, 4),
+        }]
+    }
+
+
+_HOURLY_SERIES = {
+    "temperature_2m": lambda h: round(8.0 + 4.0 * ((h % 24) - 12) / 12.0, 1),
+    "relativehumidity_2m": lambda h: 60 + h % 24,
+    "windspeed_10m": lambda h: round(10.0 + (h % 7) * 1.5, 1),
+    "weathercode": lambda h: (0, 1, 2, 3, 61)[h % 5],
+}
+
+
+_HOURLY_UNITS = {"time": "iso8601", "temperature_2m": "°C", "relativehumidity_2m": "%",
+                 "windspeed_10m": "km/h", "weathercode": "wmo code"}
+
+
+def _forecast_payload(lat: str, lon: str, hourly: str = "", forecast_days: str = "1",
+                      forecast_hours: str = "") -> dict:
+    # UTC hours starting at today's midnight, so "now" is always inside the horizon;
+    # forecast_hours=N instead returns N hours starting at the current hour
+    now = time.time()
+    current = int(now // 3600 * 3600)
+    if forecast_hours:
+        start, hours = current, range(max(1, int(forecast_hours)))
+    else:
+        start, hours = int(now // 86400 * 86400), range(24 * max(1, int(forecast_days or 1)))
+    first = (start % 86400) // 3600
+    fmt = lambda epoch: time.strftime("%Y-%m-%dT%H:%M", time.gmtime(epoch))
+    payload = {
+        "latitude": float(lat),
+        "longitude": float(lon),
+        "generationtime_ms": 0.0439,
+        "utc_offset_seconds": 0,
+        "timezone": "UTC",
+        "timezone_abbreviation": "UTC",
+        "elevation": 38.0,
+        "current_weather_units": {"time": "iso8601", "interval": "seconds", "temperature": "°C",
+                                  "windspeed": "km/h", "winddirection": "°", "is_day": "", "weathercode": "wmo code"},
+        "current_weather": {"time": fmt(current), "interval": 900, "temperature": 11.2, "windspeed": 18.4,
+                            "winddirection": 240, "is_day": 1, "weathercode": 2},
+    }
+    variables = [v for v in hourly.split(",") if v in _HOURLY_SERIES]
+    if variables:
+        payload["hourly_units"] = {name: _HOURLY_UNITS[name] for name in ["time"] + variables}
+        payload["hourly"] = {"time": [fmt(start + h * 3600) for h in hours]}
+        for name in variables:
+            payload["hourly"][name] = [_HOURLY_SERIES[name](first + h) for h in hours]
+    return payload
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # headers and body are written separately; avoid Nagle/delayed-ACK stalls on reused connections
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+        stub = self.server.stub
+        stub._count(parsed.path)
+        fault = stub._inject()
+        if fault == 500:
+            self._send(500, {"error": True, "reason": "injected failure"})
+            return
+        if fault == 429:
+            self._send(429, {"error": True, "reason": "too many requests"}, {"Retry-After": "1"})
+            return
+        if parsed.path == "/v1/search":
+            body = _geocoding_payload(query.get("name", ""))
+        elif parsed.path == "/v1/forecast":
+            lats = query.get("latitude", "0").split(",")
+            lons = query.get("longitude", "0").split(",")
+            # like Open-Meteo: a list of payloads for multi-coordinate requests
+            body = [_forecast_payload(lat, lon, query.get("hourly", ""), query.get("forecast_days", "1"),
+                                      query.get("forecast_hours", ""))
+                    for lat, lon in zip(lats, lons)]
+            if len(body) == 1:
+                body = body[0]
+        else:
+            self._send(404, {"error": True, "reason": "not found"})
+            return
+        self._send(200, body)
+
+    def _send(self, status: int, body: dict, headers: dict = None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        if self.server.stub.compress and "gzip" in self.headers.get("Accept-Encoding", ""):
+            data = gzip.compress(data, compresslevel=6)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubOpenMeteoServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                 error_rate: float = 0.0, throttle_rate: float = 0.0, seed: int = 0, compress: bool = False):
+        self.latency_ms = latency_ms
+        self.compress = compress
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._requests = {}
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self._thread = None
+
+    def _count(self, path: str):
+        with self._lock:
+            self._requests[path] = self._requests.get(path, 0) + 1
+
+    def _inject(self):
+        with self._lock:
+            delay = self.latency_ms + self._random.random() * self.jitter_ms
+            roll = self._random.random()
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+        if roll < self.error_rate:
+            return 500
+        if roll < self.error_rate + self.throttle_rate:
+            return 429
+        return None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._requests)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def geocoding_endpoint(self) -> str:
+        return self.base_url + "/v1/search"
+
+    @property
+    def forecast_endpoint(self) -> str:
+        return self.base_url + "/v1/forecast"
+
+    def start(self) -> "StubOpenMeteoServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stub-open-meteo", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -15,9 +15,22 @@ def parse_args():
     parser.add_argument("--config", type=str, default=DEFAULT_CONFIG_PATH, help="Path to settings.json")
     parser.add_argument("--mode", type=str, choices=["demo", "real"], help="Override mode (demo/real)")
     parser.add_argument("--location", type=str, default="Rajkot", help="Location for weather query demo")
+    parser.add_argument("--intent", type=str, help="Plan and execute a free-text intent instead of the weather demo")
+    parser.add_argument("--bulk", type=str, help="Bulk mode: file with one location per line ('-' for stdin); writes JSONL")
+    parser.add_argument("--output", type=str, default="-", help="Bulk JSONL output file ('-' for stdout)")
+    parser.add_argument("--processes", type=int, help="Bulk worker processes (default: CPU count; 0 runs in-process)")
+    parser.add_argument("--chunk-size", type=int, default=200, help="Bulk locations per worker task")
+    parser.add_argument("--ordered", action="store_true", help="Bulk output in input order (default: completion order)")
+    parser.add_argument("--checkpoint", type=str, help="Bulk checkpoint file; rerun with the same arguments to resume")
+    parser.add_argument("--no-watch", action="store_true", help="Disable config hot-reload (no file watcher)")
+    parser.add_argument("--serve", action="store_true", help="Run as a long-lived HTTP JSON service")
+    parser.add_argument("--host", type=str, help="Service bind host (overrides server.host)")
+    parser.add_argument("--port", type=int, help="Service port (overrides server.port)")
+    parser.add_argument("--workers", type=int, help="Service worker threads (overrides server.workers)")
+    parser.add_argument("--queue-size", type=int, help="Requests queued beyond busy workers before 503 (overrides server.queue_size)")
     return parser.parse_args()
 
-def pretty_print_weather(data: dict):
+def pretty_print_weather(data):
     print("\n" + "-"*41)
     print(f"           WEATHER REPORT ({data.get('source','').upper()} MODE)")
     print("-"*41)
@@ -35,13 +48,83 @@ def pretty_print_weather(data: dict):
     print("-"*41 + "\n")
 
 
+def print_plan_result(outcome):
+    print(f"\nPlan status: {outcome['status']} ({outcome['duration_ms']:.1f} ms)")
+    for step_id, step in outcome["steps"].items():
+        duration = step.get("duration_ms")
+        timing = f"{duration:8.1f} ms" if duration is not None else " " * 11
+        print(f"  {step_id:<16} {step['status']:<10} {timing}  {step.get('error') or ''}")
+    notify = outcome["steps"].get("notify_user", {}).get("result")
+    if notify:
+        print(f"\n{notify['message']}\n")
+
+
+def run_bulk_job(args) -> int:
+    import json
+    from service.bulk_runner import run_bulk
+
+    summary = run_bulk(
+        args.config,
+        args.bulk,
+        output_path=args.output,
+        mode=args.mode,
+        processes=args.processes,
+        chunk_size=args.chunk_size,
+        ordered=args.ordered,
+        checkpoint_path=args.checkpoint,
+    )
+    # stdout may carry the JSONL stream; the summary goes to stderr
+    print(f"bulk: {summary['written']} written ({summary['ok']} ok, {summary['errors']} errors, "
+          f"{summary['skipped_from_checkpoint']} skipped from checkpoint) in {summary['elapsed_seconds']:.1f}s, "
+          f"{summary['throughput_per_second']} locations/s", file=sys.stderr)
+    for message, count in summary["top_errors"]:
+        print(f"  {count:>7} x {message}", file=sys.stderr)
+    print(json.dumps(summary), file=sys.stderr)
+    return 1 if summary["errors"] else 0
+
+
+def run_service(orchestrator: Orchestrator, args):
+    from service.http_service import serve
+
+    server_cfg = orchestrator.config_manager.settings.server
+    # warm caches from snapshots before the first request rather than during it
+    orchestrator.prewarm()
+    serve(
+        orchestrator,
+        host=args.host or server_cfg.get("host", "127.0.0.1"),
+        port=args.port if args.port is not None else int(server_cfg.get("port", 8080)),
+        workers=args.workers or int(server_cfg.get("workers", 8)),
+        queue_size=args.queue_size if args.queue_size is not None else int(server_cfg.get("queue_size", 64)),
+    )
+
+
 def main():
     args = parse_args()
 
     # Initialize a bootstrap logger so early messages get printed
     bootstrap_logger = setup_logger("ura-bootstrap", None)
+    if args.bulk:
+        # worker processes own their orchestrators; none is needed here
+        try:
+            sys.exit(run_bulk_job(args))
+        except (OSError, ValueError) as e:
+            bootstrap_logger.error("Bulk run failed: %s", e)
+            sys.exit(2)
+
+    orchestrator = None
     try:
-        orchestrator = Orchestrator(config_path=args.config, cli_mode=args.mode)
+        orchestrator = Orchestrator(config_path=args.config, cli_mode=args.mode, watch=False if args.no_watch else None)
+
+        if args.serve:
+            bootstrap_logger.info("Starting URA HTTP service in mode=%s", orchestrator.mode)
+            run_service(orchestrator, args)
+            return
+
+        if args.intent:
+            bootstrap_logger.info("Executing intent in mode=%s: %s", orchestrator.mode, args.intent)
+            outcome = orchestrator.handle_intent(args.intent)
+            print_plan_result(outcome)
+            return
 
         # Demo: fetch weather and print result (this is the program's simple demo loop)
         bootstrap_logger.info("Starting URA main loop in mode=%s", orchestrator.mode)
@@ -54,15 +137,17 @@ def main():
         pretty_print_weather(result)
 
         # Sleep briefly to keep the watcher active for manual edits if user wants to change config
-        bootstrap_logger.info("Main completed. Keeping process alive for 5s to allow config hot-reload demo.")
-        time.sleep(5)
+        if orchestrator.config_manager.watching:
+            bootstrap_logger.info("Main completed. Keeping process alive for 5s to allow config hot-reload demo.")
+            time.sleep(5)
 
     except Exception as e:
         bootstrap_logger.exception("Fatal error in URA: %s", e)
         sys.exit(2)
     finally:
         try:
-            orchestrator.stop()
+            if orchestrator is not None:
+                orchestrator.stop()
         except Exception:
             pass
 
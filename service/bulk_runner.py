@@ -0,0 +1,344 @@
+﻿# service/bulk_runner.py
+"""
+Bulk weather lookups for batch jobs (main.py --bulk).
+
+Locations are streamed from a file or stdin (one per line; blank lines and "#" comments
+are skipped) in chunks of chunk_size. Chunks are sharded across a process pool; each
+worker process owns its own Orchestrator (and so its own MCPWeatherTool, caches and HTTP
+session) and resolves a chunk with fetch_weather_many. The upstream rate limit is split
+evenly between the workers (each worker's config carries its share), and workers stop
+their Orchestrator when the pool shuts them down. Every input line produces one JSON
+line:
+  {"index": 12, "location": "Paris", "ok": true, "result": {...WeatherReport...}}
+  {"index": 13, "location": "Nowhere", "ok": false, "error": "..."}
+written in completion order, or in input order with ordered=True.
+
+Memory stays bounded: at most max_pending chunks are submitted or waiting to be written,
+whatever the input length. With a checkpoint file (requires an output file), progress is
+saved as the completed chunk ids plus the output size at that moment. A restarted run
+truncates the output back to that size and skips the completed chunks, so every input
+line is written exactly once. The checkpoint is removed when the run completes.
+"""
+import json
+import logging
+import os
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from multiprocessing.util import Finalize
+from typing import Any, Dict, IO, Iterator, List, Optional, Set, Tuple
+from utils.logger import setup_logger
+
+logger = setup_logger("bulk_runner", None)
+
+# distinct error messages kept for the summary
+_MAX_ERROR_KINDS = 100
+
+_worker_orchestrator = None
+
+
+def _worker_overrides(config_path: str, workers: int) -> Dict[str, Any]:
+    """
+    Settings layered over the config file in every worker: no prefetching (a one-pass job
+    has no hot locations worth refreshing) and this worker's share of the rate limit.
+    """
+    from utils.config_manager import ConfigManager
+
+    overrides: Dict[str, Any] = {"prefetch": {"enabled": False}}
+    if workers > 1:
+        # the upstream rate limit is per process; split it so the job as a whole honors it.
+        # Every tool the worker builds reads it from config, so none resets the share.
+        weather = ConfigManager(config_path, watch=False).settings.weather
+        overrides["weather"] = {"rate_limit_per_second": weather.rate_limit_per_second / workers,
+                                "rate_limit_burst": max(1, weather.rate_limit_burst // workers)}
+    return overrides
+
+
+def _init_worker(config_path: str, mode: Optional[str], overrides: Optional[Dict[str, Any]] = None,
+                 pooled: bool = False):
+    global _worker_orchestrator
+    from agent.orchestrator import Orchestrator
+
+    if pooled:
+        # per-location INFO logs from N processes would dwarf the results; warnings still show
+        logging.disable(logging.INFO)
+    _worker_orchestrator = Orchestrator(config_path, cli_mode=mode, watch=False, overrides=overrides)
+    if pooled:
+        # pool workers exit without a shutdown hook of their own; stop the orchestrator
+        # (snapshot writer, monitor, sessions) when the worker process finalizes
+        Finalize(None, _stop_worker, exitpriority=10)
+
+
+def _stop_worker():
+    global _worker_orchestrator
+    if _worker_orchestrator is not None:
+        _worker_orchestrator.stop()
+        _worker_orchestrator = None
+
+
+def _process_chunk(chunk_id: int, start: int, locations: List[str]) -> Tuple[int, List[str], int]:
+    """
+    Runs in a worker: resolve one chunk, return (chunk_id, JSON lines, error count).
+    """
+    try:
+        batch = _worker_orchestrator.fetch_weather_many(locations)
+        results, errors = batch["results"], batch["errors"]
+    except Exception as e:
+        results, errors = {}, {location: f"{type(e).__name__}: {e}" for location in locations}
+    lines = []
+    failed = 0
+    for offset, location in enumerate(locations):
+        record: Dict[str, Any] = {"index": start + offset, "location": location}
+        report = results.get(location)
+        if report is not None:
+            record["ok"] = True
+            record["result"] = report.to_dict()
+        else:
+            failed += 1
+            record["ok"] = False
+            record["error"] = errors.get(location, "no result")
+        lines.append(json.dumps(record, ensure_ascii=False, default=str))
+    return chunk_id, lines, failed
+
+
+class _InlineExecutor:
+    """
+    processes=0: run chunks in this process (debugging, tiny inputs).
+    """
+
+    def __init__(self, config_path: str, mode: Optional[str], overrides: Dict[str, Any]):
+        _init_worker(config_path, mode, overrides)
+
+    def submit(self, fn, *args) -> Future:
+        future: Future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def shutdown(self, wait: bool = True, cancel_futures: bool = False):
+        _stop_worker()
+
+
+def read_locations(stream: IO[str]) -> Iterator[str]:
+    for line in stream:
+        location = line.strip()
+        if location and not location.startswith("#"):
+            yield location
+
+
+def _chunks(locations: Iterator[str], chunk_size: int) -> Iterator[Tuple[int, int, List[str]]]:
+    chunk: List[str] = []
+    chunk_id = start = index = 0
+    for location in locations:
+        if not chunk:
+            start = index
+        chunk.append(location)
+        index += 1
+        if len(chunk) >= chunk_size:
+            yield chunk_id, start, chunk
+            chunk_id += 1
+            chunk = []
+    if chunk:
+        yield chunk_id, start, chunk
+
+
+class Checkpoint:
+    """
+    Completed chunks as a low-water mark (every chunk below done_below is done) plus the
+    completed ids above it; at most max_pending ids, since that many chunks are in flight.
+    """
+
+    def __init__(self, path: str, input_name: str, chunk_size: int):
+        self.path = path
+        self.input_name = input_name
+        self.chunk_size = chunk_size
+        self.done_below = 0
+        self.done: Set[int] = set()
+        self.output_bytes = 0
+        self.counts = {"ok": 0, "errors": 0}
+
+    def load(self) -> bool:
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("input") != self.input_name or state.get("chunk_size") != self.chunk_size:
+            raise ValueError(f"Checkpoint {self.path} was written for input={state.get('input')} "
+                             f"chunk_size={state.get('chunk_size')}; remove it or use the same arguments")
+        self.done_below = int(state["done_below"])
+        self.done = set(state.get("done", []))
+        self.output_bytes = int(state["output_bytes"])
+        self.counts = dict(state.get("counts", self.counts))
+        return True
+
+    def is_done(self, chunk_id: int) -> bool:
+        return chunk_id < self.done_below or chunk_id in self.done
+
+    def mark_done(self, chunk_id: int):
+        self.done.add(chunk_id)
+        while self.done_below in self.done:
+            self.done.discard(self.done_below)
+            self.done_below += 1
+
+    def save(self, output_bytes: int):
+        self.output_bytes = output_bytes
+        state = {"input": self.input_name, "chunk_size": self.chunk_size, "done_below": self.done_below,
+                 "done": sorted(self.done), "output_bytes": output_bytes, "counts": self.counts,
+                 "saved_at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+
+def run_bulk(
+    config_path: str,
+    input_path: str,
+    output_path: Optional[str] = None,
+    mode: Optional[str] = None,
+    processes: Optional[int] = None,
+    chunk_size: int = 200,
+    ordered: bool = False,
+    checkpoint_path: Optional[str] = None,
+    checkpoint_interval: float = 2.0,
+    max_pending: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Stream locations from input_path ("-" for stdin) to JSONL at output_path (None or "-"
+    for stdout). Returns the summary dict (also logged to stderr by main.py).
+    """
+    chunk_size = max(1, int(chunk_size))
+    processes = (os.cpu_count() or 1) if processes is None else max(0, int(processes))
+    max_pending = max(1, int(max_pending or 4 * max(1, processes)))
+    to_stdout = output_path in (None, "-")
+    if checkpoint_path and to_stdout:
+        raise ValueError("Checkpoints need an output file (stdout cannot be truncated on resume)")
+
+    checkpoint = None
+    resumed = False
+    if checkpoint_path:
+        checkpoint = Checkpoint(checkpoint_path, os.path.abspath(input_path) if input_path != "-" else "-", chunk_size)
+        resumed = checkpoint.load()
+
+    # binary output: tell() must be a byte offset the checkpoint can truncate back to
+    if to_stdout:
+        out = sys.stdout.buffer
+    elif resumed:
+        out = open(output_path, "r+b")
+        # drop lines written after the last checkpoint; their chunks are redone
+        out.truncate(checkpoint.output_bytes)
+        out.seek(checkpoint.output_bytes)
+    else:
+        out = open(output_path, "wb")
+
+    source = sys.stdin if input_path == "-" else open(input_path, "r", encoding="utf-8-sig")
+    overrides = _worker_overrides(config_path, processes)
+    if processes == 0:
+        executor = _InlineExecutor(config_path, mode, overrides)
+    else:
+        executor = ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                                       initargs=(config_path, mode, overrides, True))
+
+    counts = dict(checkpoint.counts) if resumed else {"ok": 0, "errors": 0}
+    errors_by_kind: Counter = Counter()
+    skipped = 0
+    written = 0
+    started = time.perf_counter()
+    last_saved = time.monotonic()
+    if resumed:
+        logger.info("Resuming bulk run from %s (chunks below %d done, %d more done)",
+                    checkpoint_path, checkpoint.done_below, len(checkpoint.done))
+
+    running: Dict[Future, int] = {}
+    # ordered mode: finished chunks waiting for their predecessors
+    waiting: Dict[int, Tuple[List[str], int]] = {}
+    chunk_order: deque = deque()
+
+    def emit(chunk_id: int, lines: List[str], failed: int):
+        # counted on write, so checkpointed counts match the checkpointed output
+        nonlocal written
+        if lines:
+            out.write(("\n".join(lines) + "\n").encode("utf-8"))
+            written += len(lines)
+        counts["ok"] += len(lines) - failed
+        counts["errors"] += failed
+        if checkpoint is not None:
+            checkpoint.mark_done(chunk_id)
+
+    def collect(future: Future):
+        nonlocal last_saved
+        chunk_id, lines, failed = future.result()
+        if failed:
+            for line in lines:
+                record = json.loads(line)
+                if not record["ok"]:
+                    kind = record["error"][:120]
+                    if kind in errors_by_kind or len(errors_by_kind) < _MAX_ERROR_KINDS:
+                        errors_by_kind[kind] += 1
+        if ordered:
+            waiting[chunk_id] = (lines, failed)
+            while chunk_order and chunk_order[0] in waiting:
+                next_id = chunk_order.popleft()
+                emit(next_id, *waiting.pop(next_id))
+        else:
+            emit(chunk_id, lines, failed)
+        if checkpoint is not None and time.monotonic() - last_saved >= checkpoint_interval:
+            save_checkpoint()
+            last_saved = time.monotonic()
+
+    def save_checkpoint():
+        out.flush()
+        os.fsync(out.fileno())
+        checkpoint.counts = dict(counts)
+        checkpoint.save(out.tell())
+
+    try:
+        for chunk_id, start, locations in _chunks(read_locations(source), chunk_size):
+            if checkpoint is not None and checkpoint.is_done(chunk_id):
+                skipped += len(locations)
+                continue
+            # bounded: in-flight chunks plus chunks buffered for ordering
+            while len(running) + len(waiting) >= max_pending:
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    running.pop(future)
+                    collect(future)
+            running[executor.submit(_process_chunk, chunk_id, start, locations)] = chunk_id
+            chunk_order.append(chunk_id)
+        while running:
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in done:
+                running.pop(future)
+                collect(future)
+        if checkpoint is not None:
+            # finished: a rerun with the same arguments starts over instead of skipping everything
+            out.flush()
+            os.remove(checkpoint_path)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        if source is not sys.stdin:
+            source.close()
+        if to_stdout:
+            out.flush()
+        else:
+            out.close()
+
+    elapsed = time.perf_counter() - started
+    summary = {
+        "written": written,
+        "ok": counts["ok"],
+        "errors": counts["errors"],
+        "skipped_from_checkpoint": skipped,
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_per_second": round(written / elapsed, 1) if elapsed > 0 else None,
+        "processes": processes,
+        "chunk_size": chunk_size,
+        "ordered": ordered,
+        "top_errors": errors_by_kind.most_common(5),
+    }
+    return summary
@@ -0,0 +1,259 @@
+﻿# service/http_service.py
+"""
+Long-running HTTP JSON service around a single Orchestrator (main.py --serve).
+
+Endpoints:
+  GET  /weather?location=<name>[&raw=1] -> Orchestrator.fetch_weather
+  GET  /weather?location=<name>&at=<ISO time> -> Orchestrator.fetch_weather_at
+  GET  /forecast?location=<name>[&hours=24] -> Orchestrator.fetch_hourly_forecast
+  GET  /history?location=<name>[&since=<epoch>&until=<epoch>&limit=100] -> stored snapshots
+  GET  /weather/many?location=a&location=b
+  POST /weather/many  {"locations": [...]}  -> Orchestrator.fetch_weather_many
+  GET  /health                          -> {"status": "ok"|"degraded", "mode": ..., "connectivity": ...}
+  GET  /stats                           -> cache and service counters
+  GET  /metrics[?format=json]           -> per-stage latency metrics (Prometheus text or JSON)
+
+Connections are handed to a bounded worker pool. At most workers + queue_size requests are
+accepted at once; beyond that the accept thread answers 503 with Retry-After (backpressure)
+instead of queueing without bound.
+"""
+import json
+import signal
+import threading
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qs, urlparse
+from tools.mcp_weather_tool import RateLimitedError
+from utils.logger import setup_logger
+
+logger = setup_logger("http_service", None)
+
+MAX_BODY_BYTES = 1024 * 1024
+
+
+class _WeatherHandler(BaseHTTPRequestHandler):
+    server_version = "URA/1.0"
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        query = parse_qs(parsed.query)
+        orchestrator = self.server.orchestrator
+        if parsed.path == "/health":
+            connectivity = orchestrator.connectivity_status()
+            status = "degraded" if connectivity["degraded"] else "ok"
+            self._send_json(200, {"status": status, "mode": orchestrator.mode, "connectivity": connectivity})
+        elif parsed.path == "/stats":
+            self._send_json(200, {"service": self.server.stats(), "caches": orchestrator.cache_stats()})
+        elif parsed.path == "/metrics":
+            if (query.get("format") or [""])[0].lower() == "json":
+                self._send_json(200, orchestrator.metrics_snapshot())
+            else:
+                self._send_text(200, orchestrator.metrics_text(), "text/plain; version=0.0.4; charset=utf-8")
+        elif parsed.path == "/weather":
+            location = (query.get("location") or [""])[0].strip()
+            if not location:
+                self._send_json(400, {"error": "query parameter 'location' is required"})
+                return
+            include_raw = (query.get("raw") or ["0"])[0].lower() in ("1", "true", "yes")
+            at = (query.get("at") or [""])[0].strip()
+            if at:
+                try:
+                    datetime.fromisoformat(at)
+                except ValueError:
+                    self._send_json(400, {"error": "'at' must be an ISO time, e.g. 2025-12-01T18:00"})
+                    return
+                self._call(lambda: orchestrator.fetch_weather_at(location, at, include_raw=include_raw))
+            else:
+                self._call(lambda: orchestrator.fetch_weather(location, include_raw=include_raw))
+        elif parsed.path == "/forecast":
+            location = (query.get("location") or [""])[0].strip()
+            try:
+                hours = int((query.get("hours") or ["24"])[0])
+            except ValueError:
+                hours = -1
+            if not location or not 0 < hours <= 384:
+                self._send_json(400, {"error": "'location' is required and 'hours' must be 1..384"})
+                return
+            self._call(lambda: {"hours": orchestrator.fetch_hourly_forecast(location, hours)})
+        elif parsed.path == "/history":
+            location = (query.get("location") or [""])[0].strip()
+            try:
+                since = float(query["since"][0]) if query.get("since") else None
+                until = float(query["until"][0]) if query.get("until") else None
+                limit = int((query.get("limit") or ["100"])[0])
+            except ValueError:
+                limit = -1
+            if not location or not 0 < limit <= 10000:
+                self._send_json(400, {"error": "'location' is required, 'since'/'until' are epoch seconds and 'limit' must be 1..10000"})
+                return
+            self._call(lambda: {"snapshots": orchestrator.weather_history(location, since, until, limit)})
+        elif parsed.path == "/weather/many":
+            self._many(query.get("location") or [])
+        else:
+            self._send_json(404, {"error": f"unknown path {parsed.path}"})
+
+    def do_POST(self):
+        parsed = urlparse(self.path)
+        if parsed.path != "/weather/many":
+            self._send_json(404, {"error": f"unknown path {parsed.path}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            if length > MAX_BODY_BYTES:
+                self._send_json(413, {"error": "request body too large"})
+                return
+            body = json.loads(self.rfile.read(length) or b"{}")
+            locations = body.get("locations") if isinstance(body, dict) else None
+        except (ValueError, json.JSONDecodeError):
+            self._send_json(400, {"error": "body must be JSON: {\"locations\": [...]}"})
+            return
+        if not isinstance(locations, list) or not all(isinstance(x, str) for x in locations):
+            self._send_json(400, {"error": "body must be JSON: {\"locations\": [...]}"})
+            return
+        self._many(locations)
+
+    def _many(self, locations):
+        locations = [x.strip() for x in locations if x and x.strip()]
+        if not locations:
+            self._send_json(400, {"error": "at least one location is required"})
+            return
+        self._call(lambda: self.server.orchestrator.fetch_weather_many(locations))
+
+    def _call(self, fn):
+        try:
+            self._send_json(200, fn())
+        except RateLimitedError as e:
+            # client-side upstream rate limit: ask the caller to back off rather than report a failure upstream
+            logger.warning("Request %s rate limited: %s", self.path, e)
+            self._send_json(503, {"error": str(e)}, {"Retry-After": "1"})
+        except Exception as e:
+            logger.error("Request %s failed: %s", self.path, e)
+            self._send_json(502, {"error": str(e)})
+
+    def _send_json(self, status: int, body: Any, headers: Optional[Dict[str, str]] = None):
+        data = json.dumps(body, ensure_ascii=False, default=_json_default)
+        self._send_text(status, data, "application/json; charset=utf-8", headers)
+
+    def _send_text(self, status: int, text: str, content_type: str, headers: Optional[Dict[str, str]] = None):
+        data = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+def _json_default(value: Any) -> Any:
+    # WeatherReport and other read-only mappings serialize as plain objects
+    if isinstance(value, Mapping):
+        return dict(value)
+    return str(value)
+
+
+class WeatherHTTPServer(HTTPServer):
+    """
+    HTTPServer that dispatches accepted connections to a bounded ThreadPoolExecutor.
+    """
+
+    def __init__(self, address, orchestrator, workers: int = 8, queue_size: int = 64):
+        super().__init__(address, _WeatherHandler)
+        self.orchestrator = orchestrator
+        self.workers = max(1, int(workers))
+        self.queue_size = max(0, int(queue_size))
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ura-http")
+        self._slots = threading.BoundedSemaphore(self.workers + self.queue_size)
+        self._stats_lock = threading.Lock()
+        self._stats = {"accepted": 0, "rejected": 0, "completed": 0}
+
+    def process_request(self, request, client_address):
+        if not self._slots.acquire(blocking=False):
+            self._count("rejected")
+            self._reject(request)
+            return
+        self._count("accepted")
+        try:
+            self._pool.submit(self._work, request, client_address)
+        except RuntimeError:
+            # pool already shut down
+            self._slots.release()
+            self._reject(request)
+
+    def _work(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self._slots.release()
+            self._count("completed")
+
+    def _reject(self, request):
+        try:
+            body = b'{"error": "server busy, retry later"}'
+            request.sendall(
+                b"HTTP/1.0 503 Service Unavailable\r\nContent-Type: application/json\r\nRetry-After: 1\r\n"
+                b"Content-Length: " + str(len(body)).encode() + b"\r\nConnection: close\r\n\r\n" + body
+            )
+        except OSError:
+            pass
+        finally:
+            self.shutdown_request(request)
+
+    def _count(self, name: str):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["in_flight"] = stats["accepted"] - stats["completed"]
+        stats["workers"] = self.workers
+        stats["queue_size"] = self.queue_size
+        return stats
+
+    def server_close(self):
+        super().server_close()
+        # let queued and running requests finish before the orchestrator is stopped
+        self._pool.shutdown(wait=True)
+
+
+def serve(orchestrator, host: str = "127.0.0.1", port: int = 8080, workers: int = 8, queue_size: int = 64):
+    """
+    Run the service until SIGINT/SIGTERM, then shut down gracefully: stop accepting,
+    drain the worker pool and call Orchestrator.stop().
+    """
+    server = WeatherHTTPServer((host, port), orchestrator, workers=workers, queue_size=queue_size)
+    stopping = threading.Event()
+
+    def _request_stop(signum=None, frame=None):
+        if not stopping.is_set():
+            stopping.set()
+            logger.info("Shutdown requested (signal=%s); draining requests", signum)
+            # shutdown() blocks until serve_forever returns, so it must not run on the serving thread
+            threading.Thread(target=server.shutdown, name="ura-http-shutdown", daemon=True).start()
+
+    previous = {}
+    if threading.current_thread() is threading.main_thread():
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            previous[sig] = signal.signal(sig, _request_stop)
+
+    bound_host, bound_port = server.server_address[:2]
+    logger.info("URA HTTP service listening on http://%s:%s (workers=%d queue=%d mode=%s)",
+                bound_host, bound_port, server.workers, server.queue_size, orchestrator.mode)
+    try:
+        server.serve_forever(poll_interval=0.5)
+    finally:
+        server.server_close()
+        for sig, handler in previous.items():
+            signal.signal(sig, handler)
+        orchestrator.stop()
+        logger.info("URA HTTP service stopped")
@@ -0,0 +1,68 @@
+﻿# tests/conftest.py
+"""
+Shared fixtures. Tests import the packages from the repository root, like main.py.
+"""
+import json
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+@pytest.fixture
+def stub():
+    # local Open-Meteo stand-in, so real-mode paths run offline
+    from benchmarks.stub_open_meteo import StubOpenMeteoServer
+
+    with StubOpenMeteoServer() as server:
+        yield server
+
+
+@pytest.fixture
+def real_config(stub, tmp_path):
+    """
+    WeatherConfig dict for real mode against the stub, with no disk caches and no rate limit.
+    """
+    from utils.config_manager import WeatherConfig
+
+    return WeatherConfig(
+        geocoding_endpoint=stub.geocoding_endpoint,
+        forecast_endpoint=stub.forecast_endpoint,
+        demo_data_path=os.path.join(ROOT, "data", "mock_data", "weather.json"),
+        geocode_cache_path=None,
+        offline_geocoder_path=None,
+        timeout_seconds=5,
+        max_retries=1,
+        rate_limit_per_second=0,
+    ).dict()
+
+
+@pytest.fixture
+def make_orchestrator(tmp_path):
+    """
+    make_orchestrator(weather, **sections): a real-mode Orchestrator from a settings file in
+    tmp_path, with background components off unless a test's sections turn them on.
+    Stopped at teardown.
+    """
+    from agent.orchestrator import Orchestrator
+
+    built = []
+
+    def make(weather, **sections):
+        settings = {"mode": "real", "hot_reload": False, "weather": weather,
+                    "logging": {"level": "WARNING", "path": None, "queue": False},
+                    "planner": {"cache_path": None}, "prefetch": {"enabled": False},
+                    "snapshots": {"enabled": False}, "connectivity": {"enabled": False}}
+        settings.update(sections)
+        path = tmp_path / "settings.json"
+        path.write_text(json.dumps(settings), encoding="utf-8")
+        built.append(Orchestrator(str(path), watch=False))
+        return built[-1]
+
+    yield make
+    for orchestrator in built:
+        orchestrator.stop()
@@ -0,0 +1,107 @@
+﻿# tests/test_bulk_runner.py
+import json
+import logging
+import os
+
+import pytest
+
+from service import bulk_runner
+from utils import resilience
+from conftest import ROOT
+
+
+@pytest.fixture
+def demo_settings(tmp_path):
+    settings = {"mode": "demo", "hot_reload": False,
+                "weather": {"demo_data_path": f"{ROOT}/data/mock_data/weather.json",
+                            "rate_limit_per_second": 8, "rate_limit_burst": 20},
+                "logging": {"level": "WARNING", "path": None, "queue": False},
+                "planner": {"cache_path": None}, "snapshots": {"enabled": False},
+                "connectivity": {"enabled": False}}
+    path = tmp_path / "settings.json"
+    path.write_text(json.dumps(settings), encoding="utf-8")
+    return str(path)
+
+
+def _input(tmp_path, count: int) -> str:
+    path = tmp_path / "locations.txt"
+    path.write_text("# header\n" + "".join(f"City {i}\n\n" for i in range(count)), encoding="utf-8")
+    return str(path)
+
+
+def test_checkpoint_resume_writes_every_line_once(tmp_path, demo_settings, monkeypatch):
+    input_path, output = _input(tmp_path, 10), tmp_path / "out.jsonl"
+    checkpoint = str(tmp_path / "run.checkpoint")
+    process_chunk = bulk_runner._process_chunk
+
+    def crash_on_chunk_3(chunk_id, start, locations):
+        if chunk_id == 3:
+            raise KeyboardInterrupt
+        return process_chunk(chunk_id, start, locations)
+
+    monkeypatch.setattr(bulk_runner, "_process_chunk", crash_on_chunk_3)
+    with pytest.raises(KeyboardInterrupt):
+        bulk_runner.run_bulk(demo_settings, input_path, str(output), processes=0, chunk_size=2,
+                             ordered=True, checkpoint_path=checkpoint, checkpoint_interval=0, max_pending=1)
+    state = json.loads(open(checkpoint, encoding="utf-8").read())
+    assert state["done_below"] == 3
+    # lines written after the last checkpoint are dropped on resume
+    with open(output, "ab") as f:
+        f.write(b'{"index": 6, "partial": tru')
+
+    monkeypatch.setattr(bulk_runner, "_process_chunk", process_chunk)
+    summary = bulk_runner.run_bulk(demo_settings, input_path, str(output), processes=0, chunk_size=2,
+                                   ordered=True, checkpoint_path=checkpoint, checkpoint_interval=0)
+    records = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+    assert [r["index"] for r in records] == list(range(10))
+    assert [r["location"] for r in records] == [f"City {i}" for i in range(10)]
+    assert summary["skipped_from_checkpoint"] == 6 and summary["written"] == 4
+    assert summary["ok"] + summary["errors"] == 10
+    assert not (tmp_path / "run.checkpoint").exists()
+
+
+def test_checkpoint_for_other_arguments_is_refused(tmp_path, demo_settings):
+    input_path, checkpoint = _input(tmp_path, 1), tmp_path / "run.checkpoint"
+    checkpoint.write_text(json.dumps({"input": input_path, "chunk_size": 50, "done_below": 0,
+                                      "output_bytes": 0}), encoding="utf-8")
+    with pytest.raises(ValueError):
+        bulk_runner.run_bulk(demo_settings, input_path, str(tmp_path / "out.jsonl"), processes=0,
+                             chunk_size=2, checkpoint_path=str(checkpoint))
+
+
+def test_inline_run_keeps_logging_enabled(tmp_path, demo_settings):
+    bulk_runner.run_bulk(demo_settings, _input(tmp_path, 3), str(tmp_path / "out.jsonl"), processes=0)
+    assert logging.root.manager.disable == logging.NOTSET
+
+
+def test_worker_rate_limit_share_survives_tool_rebuilds(demo_settings):
+    overrides = bulk_runner._worker_overrides(demo_settings, workers=4)
+    assert overrides["weather"] == {"rate_limit_per_second": 2.0, "rate_limit_burst": 5}
+    bulk_runner._init_worker(demo_settings, None, overrides)
+    try:
+        orchestrator = bulk_runner._worker_orchestrator
+        assert orchestrator.prefetcher is None
+        # every tool built in the worker (fallback agents, reloads) reads the same share
+        orchestrator._apply_mode("demo")
+        assert orchestrator.weather_agent.tool._rate_limiter.rate == 2.0
+        assert resilience._rate_limiter.stats()["burst"] == 5.0
+    finally:
+        bulk_runner._stop_worker()
+        resilience.rate_limiter(0, 1)
+
+
+def test_pool_workers_stop_their_orchestrator(tmp_path, demo_settings, monkeypatch):
+    from agent.orchestrator import Orchestrator
+
+    stop = Orchestrator.stop
+
+    def recording_stop(self):
+        (tmp_path / f"stopped-{os.getpid()}").touch()
+        stop(self)
+
+    # pool workers are forked, so they inherit the patch
+    monkeypatch.setattr(Orchestrator, "stop", recording_stop)
+    summary = bulk_runner.run_bulk(demo_settings, _input(tmp_path, 20), str(tmp_path / "out.jsonl"),
+                                   processes=2, chunk_size=2)
+    assert summary["written"] == 20
+    assert len(list(tmp_path.glob("stopped-*"))) == 2
@@ -0,0 +1,198 @@
+﻿# tests/test_caches.py
+import sqlite3
+import time
+
+from agent.plan_cache import PlanCache, normalize_intent
+from tools.forecast_cache import ForecastCache
+from tools.geocoding_cache import GeocodingCache
+from utils.tiered_cache import TieredCache
+
+_PLAN = {"intent": "weather in paris", "steps": [{"id": "check_weather", "args": {"location": "Paris"}}]}
+
+
+def test_tiered_cache_serves_disk_after_restart_and_caches_none(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = TieredCache("Test", "entries", 8, path)
+    cache.set("a", {"x": 1})
+    cache.set("none", None)
+    cache.close()
+
+    cache = TieredCache("Test", "entries", 8, path)
+    assert cache.get("a") == (True, {"x": 1})
+    assert cache.get("a") == (True, {"x": 1})
+    assert cache.get("none") == (True, None)
+    assert cache.get("missing") == (False, None)
+    stats = cache.stats()
+    assert (stats["disk_hits"], stats["memory_hits"], stats["misses"]) == (2, 1, 1)
+    cache.close()
+
+
+def test_tiered_cache_expiry_in_both_tiers(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = TieredCache("Test", "entries", 8, path)
+    cache.set("old", 1, expires_at=time.time() - 1)
+    cache.set("new", 2, expires_at=time.time() + 60)
+    cache.close()
+    cache = TieredCache("Test", "entries", 8, path)
+    # expired rows are dropped when the table is opened, on first use
+    assert cache.get("new") == (True, 2)
+    assert cache.stats()["invalidated"] == 1
+    cache.set("soon", 3, expires_at=time.time() + 0.05)
+    time.sleep(0.06)
+    assert cache.get("soon") == (False, None)
+    cache.close()
+
+
+def test_tiered_cache_opens_its_file_on_first_use(tmp_path):
+    path = tmp_path / "nested" / "cache.sqlite3"
+    cache = TieredCache("Test", "entries", 8, str(path))
+    assert cache.stats()["disk_enabled"] and not path.exists()
+    assert cache.get("missing") == (False, None)
+    assert path.exists()
+    cache.close()
+
+
+def test_tiered_cache_memory_tier_is_bounded():
+    cache = TieredCache("Test", "entries", 2)
+    for key in "abc":
+        cache.set(key, key)
+    assert cache.get("a") == (False, None)
+    assert cache.stats()["memory_evictions"] == 1 and not cache.stats()["disk_enabled"]
+
+
+def test_broken_disk_file_falls_back_to_memory(tmp_path):
+    path = tmp_path / "broken.sqlite3"
+    path.write_bytes(b"not a database" * 100)
+    cache = GeocodingCache(path=str(path))
+    cache.put("Paris", {"latitude": 48.85})
+    assert cache.get("paris") == (True, {"latitude": 48.85})
+    assert not cache.stats()["disk_enabled"]
+
+
+def test_geocoding_cache_normalizes_keys_and_expires_negatives(tmp_path):
+    cache = GeocodingCache(path=str(tmp_path / "geo.sqlite3"), negative_ttl=0.05)
+    cache.put("  São Paulo ", {"latitude": -23.5})
+    cache.put_negative("Atlantis")
+    assert cache.get("são paulo") == (True, {"latitude": -23.5})
+    assert cache.get("ATLANTIS") == (True, None)
+    time.sleep(0.06)
+    assert cache.get("Atlantis") == (False, None)
+    assert cache.stats()["negative_hits"] == 1
+    cache.close()
+
+
+def test_geocoding_cache_reads_tables_written_before_the_shared_helper(tmp_path):
+    path = str(tmp_path / "geo.sqlite3")
+    db = sqlite3.connect(path)
+    db.execute("CREATE TABLE geocoding (key TEXT PRIMARY KEY, result TEXT, expires_at REAL, stored_at REAL NOT NULL)")
+    db.execute("INSERT INTO geocoding VALUES ('paris', '{\"latitude\": 48.85}', NULL, 0)")
+    db.commit()
+    db.close()
+    cache = GeocodingCache(path=path)
+    assert cache.get("Paris") == (True, {"latitude": 48.85})
+    cache.close()
+
+
+def test_plan_cache_shares_entries_across_spellings_and_copies(tmp_path):
+    cache = PlanCache("fp1", path=str(tmp_path / "plans.sqlite3"))
+    cache.put("Weather in PARIS?!", _PLAN)
+    plan = cache.get("  weather in paris ")
+    assert plan == _PLAN
+    plan["steps"].clear()
+    assert cache.get("weather in paris") == _PLAN
+    assert normalize_intent("rain,tomorrow") == normalize_intent("rain tomorrow")
+    cache.close()
+
+
+def test_plan_cache_drops_plans_of_another_planner_and_expired_ones(tmp_path):
+    path = str(tmp_path / "plans.sqlite3")
+    cache = PlanCache("fp1", ttl_seconds=60, path=path)
+    cache.put("weather in paris", _PLAN)
+    cache.close()
+
+    same = PlanCache("fp1", path=path)
+    assert same.get("weather in paris") == _PLAN
+    same.close()
+    upgraded = PlanCache("fp2", path=path)
+    assert upgraded.get("weather in paris") is None
+    assert upgraded.stats()["invalidated"] == 1
+    upgraded.close()
+
+    short = PlanCache("fp2", ttl_seconds=0.05)
+    short.put("weather in rome", _PLAN)
+    time.sleep(0.06)
+    assert short.get("weather in rome") is None
+
+
+class _Clock:
+    def __init__(self, now: float):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _forecast_cache(clock, **kwargs) -> ForecastCache:
+    return ForecastCache(ttl_seconds=900, max_stale_seconds=3600, clock=clock, **kwargs)
+
+
+def test_forecast_cache_is_fresh_within_its_bucket_then_stale_while_revalidating():
+    clock = _Clock(900 * 100 + 100)
+    cache = _forecast_cache(clock)
+    refreshed = []
+    cache.put(cache.key(48.8566, 2.3522, "UTC"), {"v": 1})
+    # rounded coordinates share the entry
+    assert cache.lookup(48.857, 2.352, "UTC", lambda: {"v": 2}) == {"v": 1}
+    clock.now = 900 * 101  # next bucket: stale, served while one refresh runs
+    assert cache.lookup(48.857, 2.352, "UTC", lambda: refreshed.append(1) or {"v": 2}) == {"v": 1}
+    for _ in range(100):
+        if cache.stats()["refreshes"]:
+            break
+        time.sleep(0.01)
+    assert refreshed == [1] and cache.lookup(48.857, 2.352, "UTC", lambda: {}) == {"v": 2}
+    clock.now += 900 + 3601  # past the stale window
+    assert cache.lookup(48.857, 2.352, "UTC", lambda: {}) is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["stale_hits"], stats["misses"]) == (2, 1, 1)
+
+
+def test_forecast_cache_seeded_with_original_fetch_time_is_stale():
+    clock = _Clock(900 * 100 + 10)
+    cache = _forecast_cache(clock)
+    cache.put(cache.key(1, 2, "UTC"), {"v": 1}, fetched_at=clock.now - 1000)
+    assert cache.fresh_for(1, 2, "UTC") < 0
+    assert cache.peek(1, 2, "UTC") == (clock.now - 1000, {"v": 1})
+    # seeding and peeking are not lookups
+    stats = cache.stats()
+    assert (stats["hits"], stats["stale_hits"], stats["misses"]) == (0, 0, 0)
+    cache.put(cache.key(1, 2, "UTC"), {"v": 1}, fetched_at=clock.now - 4700)
+    assert cache.lookup(1, 2, "UTC", lambda: {}) is None
+
+
+def test_prefetch_is_fresh_for_one_ttl_from_its_fetch_time():
+    clock = _Clock(900 * 100 + 850)  # 50 s before the bucket ends
+    cache = _forecast_cache(clock)
+    cache.put(cache.key(1, 2, "UTC"), {"v": 1}, fetched_at=900 * 100 + 10)
+    assert not cache.prefetch(1, 2, "UTC", lambda: {"v": 2}, lead_seconds=30)
+    assert cache.prefetch(1, 2, "UTC", lambda: {"v": 2}, lead_seconds=60)
+    # carried across the boundary, but only until it is ttl_seconds old
+    clock.now = 900 * 101 + 100
+    assert cache.lookup(1, 2, "UTC", lambda: {}) == {"v": 2}
+    clock.now = 900 * 100 + 850 + 900
+    assert cache.lookup(1, 2, "UTC", lambda: {}) == {"v": 2}
+    assert cache.stats()["stale_hits"] == 1
+
+
+def test_prefetch_hits_count_only_the_first_lookup_it_saved():
+    clock = _Clock(900 * 100 + 850)
+    cache = _forecast_cache(clock)
+    cache.put(cache.key(1, 2, "UTC"), {"v": 1}, fetched_at=900 * 100 + 10)
+    cache.prefetch(1, 2, "UTC", lambda: {"v": 2}, lead_seconds=60)
+    # the replaced entry was still fresh here: not a prefetch hit
+    cache.lookup(1, 2, "UTC", lambda: {})
+    assert cache.stats()["prefetch_hits"] == 0
+    clock.now = 900 * 101 + 1
+    cache.lookup(1, 2, "UTC", lambda: {})
+    cache.lookup(1, 2, "UTC", lambda: {})
+    stats = cache.stats()
+    assert stats["prefetch_hits"] == 1 and stats["hits"] == 3 and stats["prefetches"] == 1
@@ -0,0 +1,70 @@
+﻿# tests/test_config_manager.py
+import json
+import time
+
+from utils.config_manager import ConfigManager, Settings, diff_settings, diff_weather
+
+
+def _write(path, settings):
+    path.write_text(json.dumps(settings), encoding="utf-8")
+
+
+def test_diff_settings_names_changed_sections_and_weather_fields():
+    old = Settings(mode="demo", weather={"timeout_seconds": 8})
+    assert diff_settings(old, Settings(mode="demo", weather={"timeout_seconds": 8})) == set()
+    new = Settings(mode="real", weather={"timeout_seconds": 3}, logging={"level": "DEBUG"})
+    assert diff_settings(old, new) == {"mode", "weather", "logging"}
+    assert diff_weather(old, new) == {"timeout_seconds"}
+
+
+def test_reload_fires_on_change_only_when_the_content_differs(tmp_path):
+    path = tmp_path / "settings.json"
+    _write(path, {"mode": "demo", "weather": {"timeout_seconds": 8}})
+    changes = []
+    manager = ConfigManager(str(path), on_change=changes.append, watch=False)
+    _write(path, {"weather": {"timeout_seconds": 8}, "mode": "demo"})  # same settings, new bytes
+    assert manager.reload() is manager.settings
+    assert changes == []
+    _write(path, {"mode": "demo", "weather": {"timeout_seconds": 3}})
+    manager.reload()
+    assert [settings.weather.timeout_seconds for settings in changes] == [3]
+
+
+def test_overrides_survive_reload(tmp_path):
+    path = tmp_path / "settings.json"
+    _write(path, {"mode": "demo", "weather": {"rate_limit_per_second": 10}})
+    manager = ConfigManager(str(path), watch=False, overrides={"weather": {"rate_limit_per_second": 2},
+                                                               "prefetch": {"enabled": False}})
+    assert manager.settings.weather.rate_limit_per_second == 2
+    assert manager.settings.prefetch["enabled"] is False
+    assert manager.settings.prefetch["top_n"] == Settings.__fields__["prefetch"].default["top_n"]
+    _write(path, {"mode": "demo", "weather": {"rate_limit_per_second": 20, "timeout_seconds": 3}})
+    manager.reload()
+    assert manager.settings.weather.rate_limit_per_second == 2
+    assert manager.settings.weather.timeout_seconds == 3
+
+
+def test_schedule_reload_debounces_a_burst_into_one_reload(tmp_path):
+    path = tmp_path / "settings.json"
+    _write(path, {"mode": "demo", "reload_debounce_seconds": 0.05, "weather": {}})
+    changes = []
+    manager = ConfigManager(str(path), on_change=changes.append, watch=False)
+    for timeout in (3, 4, 5):
+        _write(path, {"mode": "demo", "reload_debounce_seconds": 0.05, "weather": {"timeout_seconds": timeout}})
+        manager.schedule_reload()
+    time.sleep(0.3)
+    assert [settings.weather.timeout_seconds for settings in changes] == [5]
+
+
+def test_orchestrator_rebuilds_only_the_changed_components(tmp_path, make_orchestrator, real_config):
+    orchestrator = make_orchestrator(real_config)
+    planner, executor = orchestrator.planner, orchestrator.executor
+    settings = json.loads((tmp_path / "settings.json").read_text(encoding="utf-8"))
+    settings["logging"]["level"] = "ERROR"
+    _write(tmp_path / "settings.json", settings)
+    orchestrator.config_manager.reload()
+    assert orchestrator.planner is planner and orchestrator.executor is executor
+    settings["planner"]["cache_ttl_seconds"] = 5
+    _write(tmp_path / "settings.json", settings)
+    orchestrator.config_manager.reload()
+    assert orchestrator.planner is not planner and orchestrator.executor is executor
@@ -0,0 +1,25 @@
+﻿# tests/test_degraded_mode.py
+import pytest
+
+from tools.mcp_weather_tool import RateLimitedError, UpstreamUnavailableError
+
+
+def test_rate_limit_rejection_is_an_error_not_fallback(make_orchestrator, real_config, monkeypatch):
+    orchestrator = make_orchestrator(real_config)
+    orchestrator.fetch_weather("London")
+    tool = orchestrator.weather_agent.tool
+    monkeypatch.setattr(tool, "_admit", lambda breaker, desc, **kw: (_ for _ in ()).throw(RateLimitedError("limited")))
+    with pytest.raises(RateLimitedError):
+        orchestrator.fetch_weather("Paris")
+
+
+def test_open_circuit_serves_last_known_good_then_demo(make_orchestrator, real_config, monkeypatch):
+    orchestrator = make_orchestrator(real_config)
+    fresh = orchestrator.fetch_weather("London")
+    assert fresh.source == "real"
+    tool = orchestrator.weather_agent.tool
+    monkeypatch.setattr(tool, "_admit", lambda breaker, desc, **kw: (_ for _ in ()).throw(UpstreamUnavailableError("open")))
+    tool.forecast_cache._entries.clear()
+    cached = orchestrator.fetch_weather("London")
+    assert cached.source == "last_known_good" and cached.temperature_c == fresh.temperature_c
+    assert orchestrator.fetch_weather("Nowhere Else").source == "demo_fallback"
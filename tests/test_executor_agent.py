@@ -0,0 +1,94 @@
+﻿# tests/test_executor_agent.py
+import threading
+import time
+
+import pytest
+
+from agent.executor_agent import ExecutorAgent
+
+
+def _recorder(log, name, result=None, delay=0.0):
+    def handler(args, upstream):
+        log.append(("start", name))
+        time.sleep(delay)
+        log.append(("end", name))
+        return result if result is not None else {"step": name, "upstream": sorted(upstream)}
+    return handler
+
+
+def test_dependents_run_after_their_dependencies_with_upstream_results():
+    log = []
+    executor = ExecutorAgent({name: _recorder(log, name, delay=0.02) for name in ("a", "b", "c")}, max_workers=4)
+    try:
+        result = executor.execute_steps({"intent": "x", "steps": [
+            {"id": "c", "depends_on": ["a", "b"]}, "a", "b"]})
+    finally:
+        executor.close()
+    assert result["status"] == "success"
+    assert result["executed"][-1] == "c"
+    assert log.index(("start", "c")) > max(log.index(("end", "a")), log.index(("end", "b")))
+    assert result["steps"]["c"]["result"]["upstream"] == ["a", "b"]
+
+
+def test_independent_steps_run_concurrently():
+    barrier = threading.Barrier(2, timeout=2)
+    executor = ExecutorAgent({"a": lambda args, up: barrier.wait(), "b": lambda args, up: barrier.wait()})
+    try:
+        assert executor.execute_steps(["a", "b"])["status"] == "success"
+    finally:
+        executor.close()
+
+
+def test_duplicate_dependency_is_not_a_cycle():
+    executor = ExecutorAgent({"a": lambda args, up: 1, "b": lambda args, up: up["a"] + 1})
+    try:
+        result = executor.execute_steps([{"id": "a"}, {"id": "b", "depends_on": ["a", "a"]}])
+    finally:
+        executor.close()
+    assert result["status"] == "success" and result["steps"]["b"]["result"] == 2
+    assert result["steps"]["b"]["depends_on"] == ["a"]
+
+
+@pytest.mark.parametrize("steps, message", [
+    ([{"id": "a", "depends_on": ["b"]}, {"id": "b", "depends_on": ["a"]}], "cycle"),
+    ([{"id": "a", "depends_on": ["missing"]}], "unknown"),
+    (["a", "a"], "Duplicate"),
+])
+def test_malformed_plans_are_rejected(steps, message):
+    with pytest.raises(ValueError, match=message):
+        ExecutorAgent({"a": lambda args, up: None}).execute_steps(steps)
+
+
+def test_failure_and_timeout_cancel_only_their_dependents():
+    def boom(args, upstream):
+        raise RuntimeError("boom")
+
+    executor = ExecutorAgent({"ok": lambda args, up: "fine", "boom": boom,
+                              "slow": lambda args, up: time.sleep(0.5), "after": lambda args, up: "ran"})
+    try:
+        result = executor.execute_steps([
+            "ok", "boom", {"id": "slow", "timeout": 0.05},
+            {"id": "after_boom", "action": "after", "depends_on": ["boom"]},
+            {"id": "after_slow", "action": "after", "depends_on": ["slow"]},
+            {"id": "after_ok", "action": "after", "depends_on": ["ok"]},
+        ])
+    finally:
+        executor.close()
+    statuses = {sid: step["status"] for sid, step in result["steps"].items()}
+    assert statuses == {"ok": "ok", "boom": "failed", "slow": "timeout", "after_boom": "cancelled",
+                        "after_slow": "cancelled", "after_ok": "ok"}
+    assert result["status"] == "partial"
+    assert "RuntimeError: boom" in result["steps"]["boom"]["error"]
+
+
+def test_timeout_counts_from_handler_start_not_submit():
+    # one worker: "second" waits ~0.3 s for a worker, longer than its 0.2 s timeout,
+    # then runs well within it
+    executor = ExecutorAgent({"first": lambda args, up: time.sleep(0.3), "second": lambda args, up: time.sleep(0.05)},
+                             max_workers=1)
+    try:
+        result = executor.execute_steps([{"id": "first", "timeout": 2}, {"id": "second", "timeout": 0.2}])
+    finally:
+        executor.close()
+    assert result["steps"]["second"]["status"] == "ok"
+    assert result["steps"]["second"]["duration_ms"] < 200
@@ -0,0 +1,77 @@
+﻿# tests/test_hourly_forecast.py
+import json
+
+from agent.weather_agent import WeatherAgent
+from tools.hourly_forecast import HourlyForecast, compact_forecast_payload
+from tools.mcp_weather_tool import MCPWeatherTool
+
+_PAYLOAD = {
+    "utc_offset_seconds": 3600,
+    "hourly": {
+        "time": ["2025-12-01T00:00", "2025-12-01T01:00", "2025-12-01T02:00"],
+        "relativehumidity_2m": [50, 51, 52],
+        "temperature_2m": [1.5, None, 2.5],
+    },
+}
+
+
+def _hourly() -> HourlyForecast:
+    return compact_forecast_payload(json.loads(json.dumps(_PAYLOAD)))["hourly"]
+
+
+def test_nearest_rounds_to_closest_hour_in_local_time():
+    hourly = _hourly()
+    assert hourly.nearest("2025-12-01T01:20") == 1
+    assert hourly.nearest("2025-12-01T01:40") == 2
+    # naive times are forecast-local (UTC+1): 00:00 UTC is 01:00 local
+    assert hourly.nearest(hourly.times[0]) == 0
+    assert hourly.value("relativehumidity_2m", hourly.nearest("2025-12-01T00:00")) == 50
+
+
+def test_nearest_outside_horizon_is_none():
+    hourly = _hourly()
+    assert hourly.nearest("2025-11-30T23:29") is None
+    assert hourly.nearest("2025-11-30T23:31") == 0
+    assert hourly.nearest("2025-12-01T02:31") is None
+
+
+def test_columns_round_trip_to_open_meteo_lists():
+    hourly = _hourly()
+    assert hourly.value("temperature_2m", 1) is None
+    assert hourly.to_dict() == _PAYLOAD["hourly"]
+    assert json.loads(json.dumps(hourly.to_dict())) == _PAYLOAD["hourly"]
+
+
+def test_report_with_raw_is_json_serializable(real_config):
+    agent = WeatherAgent(real_config, mode="real")
+    try:
+        report = agent.fetch("Rajkot", include_raw=True)
+    finally:
+        agent.close()
+    data = json.loads(json.dumps(report.to_dict()))
+    hourly = data["raw"]["forecast"]["hourly"]
+    assert isinstance(hourly["time"], list) and len(hourly["time"]) == len(hourly["relativehumidity_2m"])
+
+
+def test_containing_is_the_hour_in_progress():
+    hourly = _hourly()
+    assert hourly.containing("2025-12-01T01:00") == 1
+    assert hourly.containing("2025-12-01T01:45") == 1
+    assert hourly.containing("2025-12-01T02:59") == 2
+    assert hourly.containing("2025-11-30T23:59") is None
+    assert hourly.containing("2025-12-01T03:00") is None
+
+
+def test_lean_profile_humidity_late_in_the_hour(real_config):
+    tool = MCPWeatherTool(dict(real_config, forecast_profile="lean"), mode="real")
+    try:
+        assert tool._forecast_params(51.5, -0.1)["forecast_hours"] == 1
+        payload = compact_forecast_payload({
+            "utc_offset_seconds": 0,
+            "current_weather": {"time": "2025-12-01T10:45", "temperature": 7.0, "windspeed": 10.0},
+            "hourly": {"time": ["2025-12-01T10:00"], "relativehumidity_2m": [81]},
+        })
+        result = tool._build_result("London", {"name": "London"}, payload)
+    finally:
+        tool.close()
+    assert result["weather"]["humidity"] == 81
@@ -0,0 +1,26 @@
+﻿# tests/test_planner_agent.py
+import pytest
+
+from agent.planner_agent import PlannerBackend, StubPlannerBackend
+
+
+@pytest.mark.parametrize("intent, location", [
+    ("What's the weather in Paris tomorrow?", "Paris"),
+    ("weather for New York", "New York"),
+    ("Check the weather in Paris and my calendar", "Paris"),
+    ("weather in San Jose & my meetings", "San Jose"),
+    ("forecast at Rio de Janeiro, please", "Rio de Janeiro"),
+    ("check my calendar", "Rajkot"),
+])
+def test_stub_planner_extracts_location(intent, location):
+    plan = StubPlannerBackend(default_location="Rajkot").plan(intent)
+    weather = next(step for step in plan["steps"] if step["action"] == "check_weather")
+    assert weather["args"]["location"] == location
+
+
+def test_backends_must_implement_plan():
+    class Incomplete(PlannerBackend):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()
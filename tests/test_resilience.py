@@ -0,0 +1,129 @@
+﻿# tests/test_resilience.py
+import asyncio
+import os
+import threading
+
+import pytest
+
+from tools.mcp_weather_tool import MCPWeatherTool, RateLimitedError
+from tools.offline_geocoder import OfflineGeocoder
+from utils.resilience import CircuitBreaker, TokenBucket, rate_limiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_token_bucket_spends_burst_then_queues_and_rejects():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, burst=3, clock=clock)
+    assert [bucket.reserve(0) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.reserve(0) is None
+    # reservations queue behind each other: 0.5 s, then 1.0 s
+    assert bucket.reserve(1.0) == pytest.approx(0.5)
+    assert bucket.reserve(1.0) == pytest.approx(1.0)
+    assert bucket.reserve(1.0) is None
+    clock.now += 1.0
+    assert bucket.reserve(0.5) == pytest.approx(0.5)
+    stats = bucket.stats()
+    assert stats["acquired"] == 6 and stats["rejected"] == 2 and stats["waited"] == 3
+
+
+def test_token_bucket_refills_up_to_burst_and_zero_rate_disables():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=10, burst=2, clock=clock)
+    bucket.reserve(0), bucket.reserve(0)
+    clock.now += 60
+    assert [bucket.reserve(0) for _ in range(3)][:2] == [0.0, 0.0]
+    bucket.configure(0, 2)
+    assert all(bucket.reserve(0) == 0.0 for _ in range(100))
+
+
+def test_circuit_breaker_opens_probes_once_and_closes():
+    clock = FakeClock()
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_seconds=30, clock=clock)
+    breaker.record_failure()
+    assert breaker.allow() and breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+    assert breaker.retry_in() == pytest.approx(30)
+
+    clock.now += 30
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()  # only one probe at a time
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+def test_circuit_breaker_failed_probe_reopens_and_release_frees_probe():
+    clock = FakeClock()
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_seconds=10, clock=clock)
+    breaker.record_failure()
+    clock.now += 10
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and breaker.stats()["opened"] == 2
+    breaker.configure(0, 10)
+    assert breaker.allow()
+
+
+def test_sync_calls_fail_fast_past_max_wait(real_config):
+    tool = MCPWeatherTool(dict(real_config, rate_limit_per_second=0.01, rate_limit_burst=2,
+                               rate_limit_max_wait_seconds=0.5), mode="real")
+    try:
+        tool.get_weather("London")
+        tool.forecast_cache._entries.clear()
+        with pytest.raises(RateLimitedError):
+            tool.get_weather("Paris")
+    finally:
+        tool.close()
+        rate_limiter(0, 1)
+
+
+def test_async_fan_out_waits_for_tokens_instead_of_failing(real_config):
+    locations = [f"City {i}" for i in range(12)]
+    tool = MCPWeatherTool(dict(real_config, rate_limit_per_second=40, rate_limit_burst=2,
+                               rate_limit_max_wait_seconds=0), mode="real")
+
+    async def fan_out():
+        return await asyncio.gather(*(tool.aget_weather(location) for location in locations))
+
+    rejected = tool._rate_limiter.stats()["rejected"]  # the limiter is shared process-wide
+    try:
+        results = asyncio.run(fan_out())
+        assert [r["location"] for r in results] == [f"{location}, Stubland" for location in locations]
+        assert tool._rate_limiter.stats()["rejected"] == rejected
+    finally:
+        tool.close()
+        rate_limiter(0, 1)
+
+
+def test_async_lookups_load_the_gazetteer_off_the_event_loop(real_config, monkeypatch):
+    gazetteer = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                             "data", "gazetteer", "cities.csv")
+    tool = MCPWeatherTool(dict(real_config, offline_geocoder_path=gazetteer, offline_geocoder_fuzzy=True),
+                          mode="real")
+    threads = []
+    for name in ("_load", "build_fuzzy_index"):
+        def record(self, *args, _original=getattr(OfflineGeocoder, name)):
+            threads.append(threading.current_thread())
+            return _original(self, *args)
+        monkeypatch.setattr(OfflineGeocoder, name, record)
+
+    async def fan_out():
+        return await asyncio.gather(*(tool.aget_weather(location) for location in ("Tokio", "Delhi")))
+
+    try:
+        results = asyncio.run(fan_out())
+        assert results[0]["location"].startswith("Tokyo")
+        # both lookups may ask for the one-time load; neither runs it on the loop's thread
+        assert threads and threading.main_thread() not in threads
+    finally:
+        tool.close()
@@ -0,0 +1,78 @@
+﻿# tests/test_singleflight.py
+import threading
+import time
+
+import pytest
+
+from tools.mcp_weather_tool import UpstreamHTTPError
+from utils.singleflight import SingleFlight
+
+
+def _run_coalesced(flight: SingleFlight, fn, waiters: int):
+    # the leader blocks in fn until every waiter has joined the flight
+    outcomes = [None] * (waiters + 1)
+
+    def caller(i):
+        try:
+            outcomes[i] = ("ok", flight.do("key", fn))
+        except BaseException as e:
+            outcomes[i] = ("error", e)
+
+    threads = [threading.Thread(target=caller, args=(i,)) for i in range(waiters + 1)]
+    threads[0].start()
+    while not flight.stats()["in_flight"]:
+        time.sleep(0.001)
+    for thread in threads[1:]:
+        thread.start()
+    return threads, outcomes
+
+
+def test_concurrent_callers_share_one_execution():
+    flight, release, calls = SingleFlight(), threading.Event(), []
+
+    def fn():
+        calls.append(1)
+        release.wait(5)
+        return {"temperature": 7}
+
+    threads, outcomes = _run_coalesced(flight, fn, waiters=3)
+    while flight.stats()["coalesced"] < 3:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert calls == [1]
+    assert all(outcome == ("ok", {"temperature": 7}) for outcome in outcomes)
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_each_waiter_gets_its_own_exception():
+    flight, release = SingleFlight(), threading.Event()
+
+    def fn():
+        release.wait(5)
+        raise UpstreamHTTPError("forecast", 503, retry_after=2.0)
+
+    threads, outcomes = _run_coalesced(flight, fn, waiters=3)
+    while flight.stats()["coalesced"] < 3:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    errors = [error for kind, error in outcomes if kind == "error"]
+    assert len(errors) == 4
+    leader = next(e for e in errors if e.__cause__ is None)
+    copies = [e for e in errors if e is not leader]
+    assert len({id(e) for e in copies}) == 3
+    for copy in copies:
+        assert type(copy) is UpstreamHTTPError
+        assert str(copy) == "forecast status 503" and copy.status == 503 and copy.retry_after == 2.0
+        assert copy.__cause__ is leader
+
+
+def test_failed_call_is_not_cached():
+    flight = SingleFlight()
+    with pytest.raises(ValueError):
+        flight.do("key", lambda: (_ for _ in ()).throw(ValueError("boom")))
+    assert flight.do("key", lambda: 42) == 42
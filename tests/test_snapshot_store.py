@@ -0,0 +1,155 @@
+﻿# tests/test_snapshot_store.py
+import asyncio
+import os
+import threading
+import time
+
+from agent.snapshot_store import SnapshotStore
+from agent.weather_report import WeatherReport
+
+
+def _report(observed: str, temperature: float = 10.0) -> WeatherReport:
+    return WeatherReport(location="Paris, France", timestamp=observed, summary="Clear sky",
+                         temperature_c=temperature, humidity=50, wind_kmph=5.0, source="real")
+
+
+def test_compaction_collapses_repeats_and_applies_retention(tmp_path):
+    store = SnapshotStore(str(tmp_path / "snapshots.sqlite3"), retention_days=1, max_per_location=10)
+    try:
+        now = time.time()
+        for i in range(3):  # the same observation fetched three times
+            store.append("Paris", _report("2025-12-01T10:00"), ts=now - 30 + i)
+        store.append("Paris", _report("2025-12-01T09:45"), ts=now - 600)
+        store.append("Paris", _report("2025-12-01T09:30"), ts=now - 900)
+        store.append("Rome", _report("2025-11-01T10:00"), ts=now - 2 * 86400)
+        assert store.flush()
+        assert store.compact() == {"retention": 1, "duplicates": 2}
+        history = store.history("paris")
+        assert [report.timestamp for _, report in history] == ["2025-12-01T10:00", "2025-12-01T09:45",
+                                                               "2025-12-01T09:30"]
+        assert history[0][0] == now - 28  # the newest of the repeats survives
+        assert store.latest("Rome") is None
+
+        store.max_per_location = 2
+        assert store.compact() == {"retention": 1, "duplicates": 0}
+        assert [report.timestamp for _, report in store.history("paris")] == ["2025-12-01T10:00", "2025-12-01T09:45"]
+        assert store.stats()["deleted_duplicates"] == 2
+    finally:
+        store.close()
+
+
+def test_recent_locations_rank_by_lookups_not_snapshot_rows(tmp_path):
+    store = SnapshotStore(str(tmp_path / "snapshots.sqlite3"))
+    try:
+        store.append("Paris", _report("2025-12-01T10:00"))
+        store.append("Rome", _report("2025-12-01T10:00"))
+        store.append("Rome", _report("2025-12-01T10:15", 11.0))
+        for _ in range(5):
+            store.record_lookup("Paris")
+        store.record_lookup("Rome", seed={"fetched_at": 1.0, "forecast": {"hourly": {"time": []}}})
+        store.record_lookup("Rome")  # no seed: keeps the stored one
+        assert store.flush()
+        ranked = store.recent_locations(time.time() - 60, 10)
+        assert [(location, count) for location, count, _, _ in ranked] == [("paris", 5), ("rome", 2)]
+        assert ranked[1][2].temperature_c == 11.0
+        assert ranked[1][3]["fetched_at"] == 1.0 and ranked[0][3] is None
+    finally:
+        store.close()
+
+
+def test_restart_seeds_forecast_and_geocoding_caches_with_original_fetch_time(tmp_path, make_orchestrator,
+                                                                              real_config):
+    snapshots = {"enabled": True, "path": str(tmp_path / "snapshots.sqlite3")}
+    first = make_orchestrator(real_config, snapshots=snapshots)
+    for _ in range(3):
+        first.fetch_weather("London")
+    first.fetch_weather("Paris")
+    fetched_at = first.weather_agent.tool.forecast_cache.peek(*_coordinates(first, "London"), "UTC")[0]
+    first.stop()
+
+    second = make_orchestrator(real_config, snapshots=snapshots)
+    second.prewarm()
+    tool = second.weather_agent.tool
+    assert tool.forecast_cache.peek(*_coordinates(second, "London"), "UTC")[0] == fetched_at
+    assert tool.geocode_cache.peek("paris") is not None
+    # seeding, and reading the entries back, are not lookups
+    assert _lookups(tool) == (0, 0, 0, 0, 0, 0)
+    assert second.fetch_weather("London").source == "real"
+    stats = tool.cache_stats()
+    assert stats["geocoding"]["misses"] == 0 and stats["forecast"]["misses"] == 0
+    assert second.snapshots.flush()
+    ranked = second.snapshots.recent_locations(0, 10)
+    assert [(location, count) for location, count, _, _ in ranked] == [("london", 4), ("paris", 1)]
+
+
+def test_seed_from_another_forecast_profile_is_ignored(tmp_path, make_orchestrator, real_config):
+    snapshots = {"enabled": True, "path": str(tmp_path / "snapshots.sqlite3")}
+    first = make_orchestrator(real_config, snapshots=snapshots)
+    first.fetch_weather("London")
+    first.stop()
+
+    second = make_orchestrator(dict(real_config, forecast_profile="lean"), snapshots=snapshots)
+    second.prewarm()
+    tool = second.weather_agent.tool
+    assert tool.geocode_cache.peek("london") is not None
+    assert tool.forecast_cache.peek(*_coordinates(second, "London"), "UTC") is None
+
+
+def test_demo_mode_never_opens_the_snapshot_store(tmp_path, make_orchestrator, real_config):
+    path = tmp_path / "snapshots.sqlite3"
+    orchestrator = make_orchestrator(real_config, mode="demo", snapshots={"enabled": True, "path": str(path)})
+    assert orchestrator.snapshots is None
+    orchestrator.fetch_weather("London")
+    orchestrator.stop()
+    assert not path.exists()
+
+
+def test_orchestrator_opens_its_sqlite_files_on_first_use(tmp_path, make_orchestrator, real_config):
+    snapshots = tmp_path / "snapshots.sqlite3"
+    plans = tmp_path / "plans.sqlite3"
+    orchestrator = make_orchestrator(real_config, snapshots={"enabled": True, "path": str(snapshots)},
+                                     planner={"cache_path": str(plans)})
+    assert orchestrator.snapshots is not None and orchestrator.planner.cache is not None
+    assert not snapshots.exists() and not plans.exists()
+    assert orchestrator.fetch_weather("London").source == "real"
+    assert orchestrator.snapshots.flush()
+    assert snapshots.exists() and not plans.exists()
+
+
+def test_persisting_seeds_leaves_lookup_counters_alone(tmp_path, make_orchestrator, real_config):
+    gazetteer = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                             "data", "gazetteer", "cities.csv")
+    orchestrator = make_orchestrator(dict(real_config, offline_geocoder_path=gazetteer),
+                                     snapshots={"enabled": True, "path": str(tmp_path / "snapshots.sqlite3")})
+    for _ in range(3):
+        orchestrator.fetch_weather("Tokyo")
+    tool = orchestrator.weather_agent.tool
+    before = tool.cache_stats()
+    assert before["offline_geocoder"]["exact_hits"] == 3
+    assert tool.warm_entry("Tokyo")["geocoding"]["name"] == "Tokyo"
+    assert tool.cache_stats()["offline_geocoder"] == before["offline_geocoder"]
+    assert _lookups(tool) == (0, 0, 0, 2, 0, 1)
+
+
+def test_async_lookup_prewarms_off_the_event_loop(tmp_path, make_orchestrator, real_config, monkeypatch):
+    snapshots = {"enabled": True, "path": str(tmp_path / "snapshots.sqlite3")}
+    make_orchestrator(real_config, snapshots=snapshots).fetch_weather("London")
+    orchestrator = make_orchestrator(real_config, snapshots=snapshots)
+    threads = []
+    prewarm = orchestrator._prewarm
+    monkeypatch.setattr(orchestrator, "_prewarm",
+                        lambda settings: (threads.append(threading.current_thread()), prewarm(settings)))
+    assert asyncio.run(orchestrator.afetch_weather("London")).source == "real"
+    assert len(threads) == 1 and threads[0] is not threading.main_thread()
+
+
+def _lookups(tool):
+    stats = tool.cache_stats()
+    geocoding, forecast = stats["geocoding"], stats["forecast"]
+    return (geocoding["memory_hits"], geocoding["disk_hits"], geocoding["misses"],
+            forecast["hits"], forecast["stale_hits"], forecast["misses"])
+
+
+def _coordinates(orchestrator, location):
+    geores = orchestrator.weather_agent.tool.geocode_cache.peek(location)
+    return geores["latitude"], geores["longitude"]
@@ -0,0 +1,92 @@
+﻿# tools/demo_data_store.py
+"""
+In-memory mock weather dataset for demo mode.
+
+Loaded once and indexed by normalized location; reloaded only when the file's mtime changes.
+Supported files:
+  - .json  : a single record (the original weather.json), a list of records,
+             or {"locations": [records...]}
+  - .jsonl : one record per line (suits datasets with thousands of cities)
+Unknown locations get the first record, so a single-city file keeps answering every query.
+"""
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from utils import json_backend
+from utils.file_utils import read_json_file
+from utils.location_utils import normalize_location
+from utils.logger import setup_logger
+
+logger = setup_logger("demo_data_store", None)
+
+
+class DemoDataStore:
+    def __init__(self, path: str, check_interval: float = 1.0):
+        self.path = path
+        self.check_interval = float(check_interval)
+        self._lock = threading.Lock()
+        self._index: Dict[str, Dict[str, Any]] = {}
+        self._default: Optional[Dict[str, Any]] = None
+        self._mtime: Optional[float] = None
+        self._next_check = 0.0
+        self.loads = 0
+        self._reload_if_changed(force=True)
+
+    def get(self, location: str) -> Dict[str, Any]:
+        """
+        Return a private copy of the record for location (or the default record).
+        Raises FileNotFoundError if the dataset is missing and KeyError if it is empty.
+        """
+        if time.monotonic() >= self._next_check:
+            self._reload_if_changed()
+        record = self._index.get(normalize_location(location), self._default)
+        if record is None:
+            raise KeyError(f"Demo dataset {self.path} contains no records")
+        return _copy_record(record)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def _reload_if_changed(self, force: bool = False):
+        with self._lock:
+            self._next_check = time.monotonic() + self.check_interval
+            try:
+                mtime = os.stat(self.path).st_mtime
+            except FileNotFoundError:
+                raise FileNotFoundError(f"Expected demo data at {self.path} but not found.")
+            if not force and mtime == self._mtime:
+                return
+            records = self._read_records()
+            index: Dict[str, Dict[str, Any]] = {}
+            for record in records:
+                key = normalize_location(record.get("location", ""))
+                if key and key not in index:
+                    index[key] = record
+            # swap both references at once; readers never see a half-built index
+            self._index, self._default = index, (records[0] if records else None)
+            self._mtime = mtime
+            self.loads += 1
+            logger.info("Loaded %d demo weather records from %s", len(index), self.path)
+
+    def _read_records(self) -> List[Dict[str, Any]]:
+        if self.path.endswith(".jsonl"):
+            records = []
+            with open(self.path, "rb") as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        records.append(json_backend.loads(line))
+            return records
+        data = read_json_file(self.path)
+        if isinstance(data, dict) and isinstance(data.get("locations"), list):
+            return data["locations"]
+        if isinstance(data, list):
+            return data
+        return [data]
+
+
+def _copy_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    # records are shallow (a few scalars plus the "weather" dict), so copying one level deep
+    # is enough to keep callers from mutating the shared index and far cheaper than deepcopy
+    return {k: (v.copy() if isinstance(v, (dict, list)) else v) for k, v in record.items()}
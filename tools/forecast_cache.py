@@ -0,0 +1,184 @@
+﻿# tools/forecast_cache.py
+"""
+TTL forecast cache with stale-while-revalidate, used by MCPWeatherTool in real mode.
+
+Entries are keyed by (rounded lat, rounded lon, timezone) and versioned by a time bucket
+of width ttl_seconds (Open-Meteo updates current weather roughly every 15 minutes, so a
+bucket maps onto one upstream update). An entry from the current bucket is fresh; an older
+entry is stale but is still served immediately while a single background refresh runs,
+as long as it is younger than max_stale_seconds.
+
+The prefetcher (agent/prefetcher.py) refreshes hot entries shortly before their bucket
+ends. A prefetched payload is stamped with its real fetch time and stays fresh for at most
+ttl_seconds from that fetch (into the next bucket, never a full extra bucket). The first
+lookup it answers fresh after the entry it replaced would have turned stale is counted as
+a prefetch_hit.
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+from utils.cache_utils import LRUCache
+from utils.logger import setup_logger
+
+logger = setup_logger("forecast_cache", None)
+
+
+class ForecastCache:
+    def __init__(
+        self,
+        ttl_seconds: float = 900,
+        max_entries: int = 2048,
+        precision: int = 2,
+        max_stale_seconds: float = 3600,
+        clock: Callable[[], float] = time.time,
+    ):
+        if ttl_seconds <= 0:
+            raise ValueError("ttl_seconds must be > 0")
+        self.ttl = float(ttl_seconds)
+        self.precision = int(precision)
+        self.max_stale = float(max_stale_seconds)
+        self.clock = clock
+        self._entries = LRUCache(max_entries, clock=clock)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "refresh_failures": 0,
+                       "prefetches": 0, "prefetch_hits": 0}
+
+    def key(self, latitude: float, longitude: float, timezone: str) -> Tuple[float, float, str]:
+        return (round(float(latitude), self.precision), round(float(longitude), self.precision), timezone)
+
+    def bucket(self, now: Optional[float] = None) -> int:
+        return int((self.clock() if now is None else now) // self.ttl)
+
+    def bucket_end(self, fetched_at: float) -> float:
+        # a regular fetch is fresh until its bucket ends
+        return (self.bucket(fetched_at) + 1) * self.ttl
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def get_or_fetch(self, latitude: float, longitude: float, timezone: str, fetch: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Return the cached forecast payload for these coordinates, calling fetch() on a miss.
+        Stale entries are returned as-is and refreshed in the background.
+        """
+        payload = self.lookup(latitude, longitude, timezone, fetch)
+        if payload is not None:
+            return payload
+        payload = fetch()
+        self.put(self.key(latitude, longitude, timezone), payload)
+        return payload
+
+    def lookup(self, latitude: float, longitude: float, timezone: str, refresh: Callable[[], Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        Return a fresh or stale-but-usable payload, or None on a miss (the caller fetches and put()s).
+        A stale hit schedules refresh() in the background.
+        """
+        key = self.key(latitude, longitude, timezone)
+        now = self.clock()
+        entry = self._entries.get(key)
+        if entry is not None:
+            fresh_until, fetched_at, payload, saves_after = entry
+            if now < fresh_until:
+                self._count("hits")
+                if saves_after is not None and now >= saves_after:
+                    self._count_prefetch_hit(key, entry)
+                return payload
+            if now - fetched_at <= self.max_stale:
+                self._count("stale_hits")
+                self._refresh_in_background(key, refresh)
+                return payload
+
+        self._count("misses")
+        return None
+
+    def put(self, key: Tuple[float, float, str], payload: Dict[str, Any], fetched_at: Optional[float] = None,
+            fresh_until: Optional[float] = None, saves_after: Optional[float] = None):
+        """
+        Store a payload fetched at fetched_at (default now); it is fresh until fresh_until
+        (default: the end of its bucket). saves_after marks a prefetched entry: the first
+        fresh hit at or after that time is counted as a prefetch_hit.
+        """
+        fetched_at = self.clock() if fetched_at is None else fetched_at
+        fresh_until = self.bucket_end(fetched_at) if fresh_until is None else fresh_until
+        # entries older than the stale window are dropped by the LRU on next access
+        self._entries.set(key, (fresh_until, fetched_at, payload, saves_after),
+                          expires_at=max(fresh_until, fetched_at + self.max_stale))
+
+    def _count_prefetch_hit(self, key: Tuple[float, float, str], entry: Tuple):
+        # only the first lookup the prefetch turned from stale/miss into a fresh hit counts
+        with self._lock:
+            current = self._entries.get(key)
+            if current is not entry:
+                return
+            fresh_until, fetched_at, payload, _ = entry
+            self._entries.set(key, (fresh_until, fetched_at, payload, None),
+                              expires_at=max(fresh_until, fetched_at + self.max_stale))
+            self._stats["prefetch_hits"] += 1
+
+    def peek(self, latitude: float, longitude: float, timezone: str) -> Optional[Tuple[float, Dict[str, Any]]]:
+        """
+        (fetched_at, payload) of the cached entry, or None. Does not count as a lookup.
+        """
+        entry = self._entries.get(self.key(latitude, longitude, timezone))
+        return None if entry is None else (entry[1], entry[2])
+
+    def fresh_for(self, latitude: float, longitude: float, timezone: str) -> Optional[float]:
+        """
+        Seconds until the cached entry turns stale (<= 0 if it already is), or None if absent.
+        Does not count as a lookup.
+        """
+        entry = self._entries.get(self.key(latitude, longitude, timezone))
+        if entry is None:
+            return None
+        return entry[0] - self.clock()
+
+    def prefetch(self, latitude: float, longitude: float, timezone: str, fetch: Callable[[], Dict[str, Any]],
+                 lead_seconds: float) -> bool:
+        """
+        Refresh the entry if it is missing or turns stale within lead_seconds. The refresh is
+        fresh for ttl_seconds from its fetch, so the first lookups after the bucket boundary
+        are fresh hits without serving anything older than a regular fetch could be.
+        Returns True if fetch() was called.
+        """
+        key = self.key(latitude, longitude, timezone)
+        previous = self._entries.get(key)
+        if previous is not None and previous[0] - self.clock() > lead_seconds:
+            return False
+        now = self.clock()
+        payload = fetch()
+        # lookups from here on would have been misses or stale hits without this refresh
+        saves_after = now if previous is None else previous[0]
+        self.put(key, payload, fetched_at=now, fresh_until=now + self.ttl,
+                 saves_after=saves_after)
+        self._count("prefetches")
+        return True
+
+    def _refresh_in_background(self, key: Tuple[float, float, str], fetch: Callable[[], Dict[str, Any]]):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def _run():
+            try:
+                self.put(key, fetch())
+                self._count("refreshes")
+            except Exception as e:
+                self._count("refresh_failures")
+                logger.warning("Background forecast refresh failed for %s: %s", key, e)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=_run, name=f"forecast-refresh-{key[0]},{key[1]}", daemon=True).start()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["refreshing"] = len(self._refreshing)
+        lookups = stats["hits"] + stats["stale_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["hits"] + stats["stale_hits"]) / lookups, 4) if lookups else 0.0
+        stats["entries"] = len(self._entries)
+        return stats
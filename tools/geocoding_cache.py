@@ -0,0 +1,55 @@
+﻿# tools/geocoding_cache.py
+"""
+Two-tier geocoding cache used by MCPWeatherTool in real mode, built on
+utils.tiered_cache.TieredCache:
+  - memory tier: bounded LRU keyed by normalized location name
+  - disk tier: SQLite file that survives restarts (optional)
+Negative results ("no results" from the geocoder) are cached as None with their own TTL;
+positive results never expire because a city's coordinates do not change.
+"""
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+from utils.location_utils import normalize_location
+from utils.tiered_cache import TieredCache
+
+
+class GeocodingCache:
+    def __init__(self, max_entries: int = 1024, path: Optional[str] = None, negative_ttl: float = 3600):
+        self.negative_ttl = float(negative_ttl)
+        self.path = path
+        self._cache = TieredCache("Geocoding", "geocoding", max_entries, path, value_column="result")
+        self._stats_lock = threading.Lock()
+        self._negative_hits = 0
+
+    def get(self, location: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """
+        Returns (hit, result). On a hit, result is the cached geocoding record,
+        or None when a negative ("no results") answer is cached.
+        """
+        hit, result = self._cache.get(normalize_location(location))
+        if hit and result is None:
+            with self._stats_lock:
+                self._negative_hits += 1
+        return hit, result
+
+    def peek(self, location: str) -> Optional[Dict[str, Any]]:
+        """
+        The geocoding record held in memory for location, or None; not counted as a lookup.
+        """
+        return self._cache.peek(normalize_location(location))[1]
+
+    def put(self, location: str, result: Dict[str, Any]):
+        self._cache.set(normalize_location(location), result)
+
+    def put_negative(self, location: str):
+        self._cache.set(normalize_location(location), None, expires_at=time.time() + self.negative_ttl)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self._cache.stats()
+        with self._stats_lock:
+            stats["negative_hits"] = self._negative_hits
+        return stats
+
+    def close(self):
+        self._cache.close()
@@ -0,0 +1,191 @@
+﻿# tools/hourly_forecast.py
+"""
+Compact columnar store for the "hourly" block of an Open-Meteo forecast payload.
+
+Times are kept as epoch seconds in an array("q") and every variable as an array("q")
+(all-integer columns such as humidity or weathercode) or an array("d") (missing values
+as NaN), instead of lists of Python strings/floats. Any instant inside the
+forecast horizon maps to the nearest hour with one bisect, so the current hour, the next N
+hours or "18:00 today" are answered from a single fetch.
+
+HourlyForecast is also a read-only Mapping that yields the original Open-Meteo lists
+({"time": [...], "relativehumidity_2m": [...]}), so raw payloads keep their shape;
+to_dict() / to_plain() give JSON-native copies for serialization.
+"""
+import math
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Mapping
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Union
+
+_TIME_FORMAT = "%Y-%m-%dT%H:%M"
+
+When = Union[datetime, str, int, float]
+
+
+class HourlyForecast(Mapping):
+    __slots__ = ("utc_offset", "times", "columns")
+
+    def __init__(self, times: Sequence[int], columns: Dict[str, Sequence[float]], utc_offset: int = 0):
+        self.utc_offset = int(utc_offset)
+        self.times = times if isinstance(times, array) else array("q", times)
+        self.columns = {name: (values if isinstance(values, array) else _column(values))
+                        for name, values in columns.items()}
+
+    @classmethod
+    def from_payload(cls, hourly: Dict[str, Any], utc_offset: int = 0) -> "HourlyForecast":
+        """
+        Build from an Open-Meteo "hourly" dict; times are local ISO strings shifted by utc_offset.
+        """
+        offset = timedelta(seconds=int(utc_offset or 0))
+        times = array("q", (int((datetime.strptime(t, _TIME_FORMAT).replace(tzinfo=timezone.utc) - offset).timestamp())
+                            for t in hourly.get("time") or []))
+        columns = {}
+        for name, values in hourly.items():
+            if name == "time" or not isinstance(values, list) or len(values) != len(times):
+                continue
+            columns[name] = _column(values)
+        return cls(times, columns, utc_offset)
+
+    def to_epoch(self, when: When) -> float:
+        """
+        Epoch seconds for a datetime (naive = forecast-local time), epoch number or local ISO string.
+        """
+        if isinstance(when, (int, float)):
+            return float(when)
+        if isinstance(when, str):
+            when = datetime.fromisoformat(when)
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone(timedelta(seconds=self.utc_offset)))
+        return when.timestamp()
+
+    def format_time(self, epoch: int) -> str:
+        return datetime.fromtimestamp(epoch + self.utc_offset, tz=timezone.utc).strftime(_TIME_FORMAT)
+
+    def nearest(self, when: When) -> Optional[int]:
+        """
+        Index of the hour nearest to when, or None outside the horizon (more than half a
+        step before the first or after the last hour).
+        """
+        times = self.times
+        if not times:
+            return None
+        epoch = self.to_epoch(when)
+        position = bisect_left(times, epoch)
+        if position == 0:
+            index = 0
+        elif position == len(times):
+            index = len(times) - 1
+        else:
+            index = position if times[position] - epoch < epoch - times[position - 1] else position - 1
+        step = (times[-1] - times[0]) / (len(times) - 1) if len(times) > 1 else 3600
+        if abs(times[index] - epoch) > step / 2:
+            return None
+        return index
+
+    def containing(self, when: When) -> Optional[int]:
+        """
+        Index of the hour that contains when (the last hour starting at or before it), or
+        None outside the horizon. Use it for readings that belong to the hour in progress,
+        e.g. a current-weather time of 10:45 against a forecast starting at 10:00.
+        """
+        times = self.times
+        if not times:
+            return None
+        epoch = self.to_epoch(when)
+        index = bisect_right(times, epoch) - 1
+        step = (times[-1] - times[0]) / (len(times) - 1) if len(times) > 1 else 3600
+        if index < 0 or epoch >= times[index] + step:
+            return None
+        return index
+
+    def nearest_many(self, whens: Sequence[When]) -> List[Optional[int]]:
+        return [self.nearest(when) for when in whens]
+
+    def value(self, name: str, index: int) -> Optional[float]:
+        column = self.columns.get(name)
+        if column is None or index is None:
+            return None
+        v = column[index]
+        return None if v != v else v
+
+    def row(self, index: int) -> Dict[str, Any]:
+        values = {name: self.value(name, index) for name in self.columns}
+        values["time"] = self.format_time(self.times[index])
+        return values
+
+    def window(self, start: When, hours: int) -> List[Dict[str, Any]]:
+        """
+        Up to `hours` consecutive rows starting at the hour nearest to start.
+        """
+        index = self.nearest(start)
+        if index is None:
+            return []
+        return [self.row(i) for i in range(index, min(index + max(0, int(hours)), len(self.times)))]
+
+    # Mapping interface: the Open-Meteo list form, materialized on access
+    def __getitem__(self, key: str) -> List[Any]:
+        if key == "time":
+            return [self.format_time(t) for t in self.times]
+        column = self.columns[key]
+        if column.typecode == "q":
+            return column.tolist()
+        return [None if v != v else v for v in column]
+
+    def __iter__(self) -> Iterator[str]:
+        yield "time"
+        yield from self.columns
+
+    def to_dict(self) -> Dict[str, List[Any]]:
+        """
+        The Open-Meteo "hourly" dict as plain lists (JSON-serializable).
+        """
+        return {name: self[name] for name in self}
+
+    def __len__(self) -> int:
+        return 1 + len(self.columns)
+
+    def __reduce__(self):
+        return (HourlyForecast, (self.times, self.columns, self.utc_offset))
+
+    def __repr__(self) -> str:
+        span = f"{self.format_time(self.times[0])}..{self.format_time(self.times[-1])}" if self.times else "empty"
+        return f"HourlyForecast({len(self.times)} hours {span}, variables={sorted(self.columns)})"
+
+
+def _column(values: Sequence[Any]) -> array:
+    # integer columns stay integers (JSON output unchanged); NaN marks missing floats
+    if all(type(v) is int for v in values):
+        return array("q", values)
+    return array("d", (math.nan if v is None else float(v) for v in values))
+
+
+def to_plain(value: Any) -> Any:
+    """
+    JSON-native copy of a payload that may contain HourlyForecast blocks (or other
+    read-only mappings): mappings become dicts, tuples lists, nested values recursively.
+    """
+    if isinstance(value, HourlyForecast):
+        return value.to_dict()
+    if isinstance(value, Mapping):
+        return {key: to_plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_plain(item) for item in value]
+    return value
+
+
+def compact_forecast_payload(payload: Any) -> Any:
+    """
+    Replace the "hourly" block of one forecast payload (or a list of them, as returned for
+    multi-coordinate requests) with an HourlyForecast, in place.
+    """
+    if isinstance(payload, list):
+        for item in payload:
+            compact_forecast_payload(item)
+        return payload
+    if isinstance(payload, dict):
+        hourly = payload.get("hourly")
+        if isinstance(hourly, dict) and hourly.get("time"):
+            payload["hourly"] = HourlyForecast.from_payload(hourly, payload.get("utc_offset_seconds", 0))
+    return payload
@@ -1,45 +1,162 @@
 ﻿# tools/mcp_weather_tool.py
+import json
+import math
+import threading
 import time
-import requests
-from typing import Dict, Any, Optional
-from utils.file_utils import read_json_file
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import TYPE_CHECKING, Dict, Any, List, Optional, Tuple
+from utils import json_backend
 from utils.logger import setup_logger
+from utils.metrics import metrics
+from utils.resilience import CircuitBreaker, backoff_seconds, circuit_breaker, rate_limiter
+from tools.demo_data_store import DemoDataStore
+from tools.hourly_forecast import HourlyForecast, When, compact_forecast_payload
+
+# requests/urllib3, asyncio and the SQLite-backed caches are imported on first use so that
+# demo mode and one-shot runs don't pay for the HTTP stack at startup
+if TYPE_CHECKING:
+    import asyncio
+    import requests
+    from tools.offline_geocoder import OfflineGeocoder
 
 logger = setup_logger("mcp_weather_tool", None)
 
+_DEFAULT_HOURLY_VARIABLES = ["temperature_2m", "relativehumidity_2m", "windspeed_10m", "weathercode"]
+
+# per-stage latency of real-mode lookups, bound once (see utils/metrics.py)
+_GEOCODE_STAGE = metrics.histogram("tool_stage_seconds", stage="geocode")
+_FORECAST_STAGE = metrics.histogram("tool_stage_seconds", stage="forecast")
+_NORMALIZE_STAGE = metrics.histogram("tool_stage_seconds", stage="normalize")
+
 class WeatherToolError(Exception):
     pass
 
+class UpstreamHTTPError(WeatherToolError):
+    """
+    Non-200 upstream response; retry_after is the Retry-After header in seconds, if any.
+    """
+
+    def __init__(self, desc: str, status: int, retry_after: Optional[float] = None):
+        super().__init__(f"{desc} status {status}")
+        self.status = status
+        self.retry_after = retry_after
+
+class UpstreamUnavailableError(WeatherToolError):
+    """
+    Call rejected locally without reaching upstream because it is known to be failing
+    (circuit open). Callers may serve fallback data.
+    """
+
+class RateLimitedError(WeatherToolError):
+    """
+    Sync call rejected locally because the shared rate limit would need a longer wait than
+    rate_limit_max_wait_seconds. Upstream is healthy; this is load, not an outage.
+    """
+
 class MCPWeatherTool:
     """
     Unified weather tool:
-      - demo: reads mock JSON
+      - demo: serves mock JSON/JSONL records from an in-memory index
       - real: uses Open-Meteo geocoding + forecast (no API key required)
     """
 
+    # Warm state a rebuilt tool may take over from its predecessor on hot reload,
+    # as long as the config keys it depends on are unchanged.
+    _WARM_STATE_KEYS = {
+        "geocode_cache": ("geocode_cache_size", "geocode_cache_path", "geocode_negative_ttl_seconds"),
+        "forecast_cache": ("forecast_cache_ttl_seconds", "forecast_cache_max_entries",
+                           "forecast_cache_precision", "forecast_cache_max_stale_seconds",
+                           "timezone", "forecast_profile", "forecast_hourly", "hourly_variables", "forecast_days"),
+        "_demo_store": ("demo_data_path", "demo_reload_check_seconds"),
+        "_session": ("http_pool_size",),
+        "_offline_geocoder": ("offline_geocoder_path",),
+    }
+
     def __init__(self, config: Dict[str, Any], mode: str):
         self.mode = mode.lower()
         self.config = config
+        # attributes shared with a successor tool; close() leaves them open
+        self._handed_off = set()
         if self.mode not in ("demo", "real"):
             raise WeatherToolError(f"Unsupported mode: {mode}")
 
         self.timeout = int(config.get("timeout_seconds", 8))
         self.max_retries = int(config.get("max_retries", 2))
+        # retries: jittered exponential backoff; Retry-After is honored up to retry_after_max
+        self.backoff_base = float(config.get("retry_backoff_base_seconds", 0.25))
+        self.backoff_max = float(config.get("retry_backoff_max_seconds", 4.0))
+        self.retry_after_max = float(config.get("retry_after_max_seconds", 10.0))
+        # process-wide limits shared with every other tool instance (utils/resilience.py)
+        self.rate_limit_max_wait = float(config.get("rate_limit_max_wait_seconds", 8.0))
+        self._rate_limiter = rate_limiter(float(config.get("rate_limit_per_second", 10.0)),
+                                          float(config.get("rate_limit_burst", 20)))
+        self.circuit_failure_threshold = int(config.get("circuit_failure_threshold", 5))
+        self.circuit_reset_seconds = float(config.get("circuit_reset_seconds", 30.0))
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self.http_pool_size = int(config.get("http_pool_size", 10))
+        # coordinates per multi-location forecast request in get_weather_many
+        self.forecast_batch_size = max(1, int(config.get("forecast_batch_size", 50)))
+        # keep-alive session, created lazily on first real request and shared by all threads
+        self._session: Optional["requests.Session"] = None
+        self._lazy_lock = threading.Lock()
+        # async path: max lookups in flight per event loop, and the threads that run blocking HTTP I/O
+        self.async_max_concurrency = max(1, int(config.get("async_max_concurrency", 100)))
+        self._async_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+        self._io_executor: Optional[ThreadPoolExecutor] = None
 
         # Demo path validation
         self.demo_data_path = config.get("demo_data_path")
         if self.mode == "demo":
             if not self.demo_data_path:
                 raise WeatherToolError("demo_data_path must be set for demo mode")
+        self.demo_reload_check_seconds = float(config.get("demo_reload_check_seconds", 1.0))
+        self._demo_store: Optional[DemoDataStore] = None
 
         # Real endpoints configuration (Open-Meteo)
         if self.mode == "real":
+            from tools.geocoding_cache import GeocodingCache
+            from tools.forecast_cache import ForecastCache
+
             self.geocode_endpoint = config.get("geocoding_endpoint")
             self.forecast_endpoint = config.get("forecast_endpoint")
             self.timezone = config.get("timezone", "UTC")
             self.units = config.get("units", "metric")
+            # hourly mode: one fetch carries forecast_days of hourly variables, so later questions
+            # about other hours ("at 18:00", "next 6 hours") are answered from the cached payload
+            self.forecast_hourly = bool(config.get("forecast_hourly", True))
+            # "lean": only what a current-weather report maps (current_weather plus the current
+            # hour's humidity); no hourly block, so fetch_at / hourly forecasts are unavailable
+            self.forecast_profile = str(config.get("forecast_profile", "full")).lower()
+            if self.forecast_profile not in ("full", "lean"):
+                raise WeatherToolError(f"Unsupported forecast_profile: {self.forecast_profile} (full or lean)")
+            if self.forecast_profile == "lean":
+                self.forecast_hourly = False
+            self.hourly_variables = list(config.get("hourly_variables") or _DEFAULT_HOURLY_VARIABLES)
+            if "relativehumidity_2m" not in self.hourly_variables:
+                self.hourly_variables.append("relativehumidity_2m")
+            self.forecast_days = max(1, int(config.get("forecast_days", 2)))
             if not self.geocode_endpoint or not self.forecast_endpoint:
                 raise WeatherToolError("Missing Open-Meteo endpoints in config for real mode")
+            self.geocode_cache = GeocodingCache(
+                max_entries=int(config.get("geocode_cache_size", 1024)),
+                path=config.get("geocode_cache_path"),
+                negative_ttl=float(config.get("geocode_negative_ttl_seconds", 3600)),
+            )
+            self.forecast_cache = ForecastCache(
+                ttl_seconds=float(config.get("forecast_cache_ttl_seconds", 900)),
+                max_entries=int(config.get("forecast_cache_max_entries", 2048)),
+                precision=int(config.get("forecast_cache_precision", 2)),
+                max_stale_seconds=float(config.get("forecast_cache_max_stale_seconds", 3600)),
+            )
+            # local gazetteer consulted before the geocoding API; loaded on first lookup
+            self.offline_geocoder_path = config.get("offline_geocoder_path")
+            self.offline_geocoder_fuzzy = bool(config.get("offline_geocoder_fuzzy", False))
+            self._offline_geocoder: Optional["OfflineGeocoder"] = None
+            self._offline_geocoder_failed = False
+            # set once the async path has loaded the gazetteer off the event loop
+            self._offline_geocoder_ready = False
 
     def get_weather(self, location: str) -> Dict[str, Any]:
         if self.mode == "demo":
@@ -48,63 +165,374 @@ class MCPWeatherTool:
             return self._get_real_weather(location)
 
     def _get_demo_weather(self, location: str) -> Dict[str, Any]:
-        data = read_json_file(self.demo_data_path)
+        data = self._get_demo_store().get(location)
         data["queried_location"] = location
         data["source"] = "mock"
         logger.info("Returning mock weather data for location=%s", location)
         return data
 
+    def _get_demo_store(self) -> DemoDataStore:
+        # loaded on first use so a missing file still surfaces from get_weather, as before
+        if self._demo_store is None:
+            with self._lazy_lock:
+                if self._demo_store is None:
+                    self._demo_store = DemoDataStore(self.demo_data_path, check_interval=self.demo_reload_check_seconds)
+        return self._demo_store
+
     def _get_real_weather(self, location: str) -> Dict[str, Any]:
         """
         Steps:
           1) Geocode city -> lat/lon via Open-Meteo geocoding API
-          2) Call forecast endpoint with current_weather=true
+          2) Call forecast endpoint with current_weather=true (+ hourly variables)
           3) Normalize and return structured result
         """
-        # 1) Geocoding
-        geocode_params = {"name": location, "count": 1}
-        geocode_resp = self._request_with_retries(self.geocode_endpoint, params=geocode_params, desc="geocoding")
-        # Validate geocoding response
-        if not geocode_resp or "results" not in geocode_resp or not geocode_resp["results"]:
-            raise WeatherToolError(f"Geocoding failed for location '{location}' - no results")
+        geores, forecast_resp = self._resolve_forecast(location)
 
-        geores = geocode_resp["results"][0]
+        # 3) Normalize
+        with _NORMALIZE_STAGE.time():
+            structured = self._build_result(location, geores, forecast_resp)
+        logger.info("Open-Meteo returned weather for %s (lat=%s lon=%s)",
+                    geores.get("name") or location, geores.get("latitude"), geores.get("longitude"))
+        return structured
+
+    def _resolve_forecast(self, location: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        # 1) Geocoding (served from cache when this name was resolved before)
+        with _GEOCODE_STAGE.time():
+            geores = self._geocode(location)
         latitude = geores.get("latitude")
         longitude = geores.get("longitude")
+
+        if latitude is None or longitude is None:
+            raise WeatherToolError(f"Geocoding response missing coordinates for '{location}'")
+
+        # 2) Forecast, served from the TTL cache when fresh or stale-but-usable
+        def fetch():
+            return self._request_with_retries(
+                self.forecast_endpoint, params=self._forecast_params(latitude, longitude), desc="forecast"
+            )
+
+        with _FORECAST_STAGE.time():
+            forecast_resp = self.forecast_cache.get_or_fetch(latitude, longitude, self.timezone, fetch)
+        return geores, forecast_resp
+
+    def prefetch(self, location: str, lead_seconds: float) -> bool:
+        """
+        Refresh the cached forecast for location if it is missing or turns stale within
+        lead_seconds (background prefetcher). Returns True if an upstream request was made;
+        always False in demo mode, where there is nothing to refresh.
+        """
+        if self.mode != "real":
+            return False
+        geores = self._geocode(location)
+        latitude, longitude = geores.get("latitude"), geores.get("longitude")
+        if latitude is None or longitude is None:
+            raise WeatherToolError(f"Geocoding response missing coordinates for '{location}'")
+
+        def fetch():
+            return self._request_with_retries(
+                self.forecast_endpoint, params=self._forecast_params(latitude, longitude), desc="forecast"
+            )
+
+        return self.forecast_cache.prefetch(latitude, longitude, self.timezone, fetch, lead_seconds)
+
+    def _forecast_signature(self) -> str:
+        # what a cached forecast payload depends on besides its coordinates
+        params = {k: v for k, v in self._forecast_params(0.0, 0.0).items() if k not in ("latitude", "longitude")}
+        return json.dumps(params, sort_keys=True)
+
+    def warm_entry(self, location: str) -> Optional[Dict[str, Any]]:
+        """
+        The cached geocoding record and forecast payload for location, with the payload's
+        fetch time, for persisting across restarts (see seed(); hourly_forecast.to_plain
+        makes it JSON-serializable). None in demo mode or when either is not cached.
+        Does not count as a cache lookup.
+        """
+        if self.mode != "real":
+            return None
+        geores = self.geocode_cache.peek(location)
+        if geores is None:
+            offline = self._get_offline_geocoder()
+            geores = offline.peek(location, fuzzy=self.offline_geocoder_fuzzy) if offline is not None else None
+        if geores is None or geores.get("latitude") is None or geores.get("longitude") is None:
+            return None
+        cached = self.forecast_cache.peek(geores["latitude"], geores["longitude"], self.timezone)
+        if cached is None:
+            return None
+        fetched_at, payload = cached
+        return {"geocoding": geores, "fetched_at": fetched_at, "forecast": payload,
+                "signature": self._forecast_signature()}
+
+    def seed(self, location: str, entry: Dict[str, Any]) -> bool:
+        """
+        Load a warm_entry() persisted by an earlier run into the geocoding and forecast
+        caches, keeping the forecast's original fetch time (so it is fresh, stale or
+        dropped exactly as if it had never left the cache). Entries already cached win;
+        a forecast fetched with other parameters (profile, hourly variables, timezone) is
+        ignored. Returns True if the forecast was seeded.
+        """
+        if self.mode != "real":
+            return False
+        geores = entry.get("geocoding") or {}
+        latitude, longitude = geores.get("latitude"), geores.get("longitude")
+        if latitude is None or longitude is None:
+            return False
+        if self.geocode_cache.peek(location) is None:
+            self.geocode_cache.put(location, geores)
+        if entry.get("signature") != self._forecast_signature() or not entry.get("forecast"):
+            return False
+        if self.forecast_cache.peek(latitude, longitude, self.timezone) is not None:
+            return False
+        self.forecast_cache.put(self.forecast_cache.key(latitude, longitude, self.timezone),
+                                compact_forecast_payload(entry["forecast"]),
+                                fetched_at=float(entry["fetched_at"]))
+        return True
+
+    def get_weather_at(self, location: str, when: When) -> Dict[str, Any]:
+        """
+        Weather for the forecast hour nearest to `when` (datetime, epoch seconds or ISO string;
+        naive times are local to the configured timezone), answered from the cached hourly
+        forecast without another request. Same shape as get_weather.
+        Demo data has no time dimension, so demo mode returns the mock record for any time.
+        """
+        if self.mode == "demo":
+            return self._get_demo_weather(location)
+        geores, forecast_resp = self._resolve_forecast(location)
+        hourly = self._hourly(location, forecast_resp)
+        index = hourly.nearest(when)
+        if index is None:
+            raise WeatherToolError(f"{when} is outside the forecast horizon for {location}")
+        result = self._hourly_result(hourly, index)
+        result.update({
+            "location": self._display_name(location, geores),
+            "raw": {"geocoding": geores, "forecast": forecast_resp},
+            "source": "real",
+        })
+        return result
+
+    def get_hourly_forecast(self, location: str, hours: int = 24, start: Optional[When] = None) -> Dict[str, Any]:
+        """
+        The next `hours` hourly entries from `start` (default: now) out of one cached fetch.
+        Returns {"location", "hours": [{"timestamp", "weather"}, ...], "source"}.
+        """
+        if self.mode == "demo":
+            data = self._get_demo_weather(location)
+            return {"location": data.get("location") or location,
+                    "hours": [{"timestamp": data.get("timestamp"), "weather": data.get("weather")}],
+                    "source": "mock"}
+        geores, forecast_resp = self._resolve_forecast(location)
+        hourly = self._hourly(location, forecast_resp)
+        index = hourly.nearest(time.time() if start is None else start)
+        if index is None:
+            raise WeatherToolError(f"{start or 'now'} is outside the forecast horizon for {location}")
+        last = min(index + max(0, int(hours)), len(hourly.times))
+        return {
+            "location": self._display_name(location, geores),
+            "hours": [self._hourly_result(hourly, i) for i in range(index, last)],
+            "source": "real",
+        }
+
+    def _hourly(self, location: str, forecast_resp: Dict[str, Any]) -> HourlyForecast:
+        hourly = forecast_resp.get("hourly") if forecast_resp else None
+        if not isinstance(hourly, HourlyForecast) or not self.forecast_hourly:
+            raise WeatherToolError(f"No hourly forecast for {location} "
+                                   "(needs weather.forecast_hourly and forecast_profile \"full\")")
+        return hourly
+
+    def _hourly_result(self, hourly: HourlyForecast, index: int) -> Dict[str, Any]:
+        code = hourly.value("weathercode", index)
+        return {
+            "timestamp": hourly.format_time(hourly.times[index]),
+            "weather": {
+                "summary": self._map_weathercode_to_summary(int(code) if code is not None else None),
+                "temperature_c": hourly.value("temperature_2m", index),
+                "humidity": hourly.value("relativehumidity_2m", index),
+                "wind_kmph": hourly.value("windspeed_10m", index),
+            },
+        }
+
+    def _display_name(self, location: str, geores: Dict[str, Any]) -> str:
         resolved_name = geores.get("name") or location
         country = geores.get("country")
+        return f"{resolved_name}, {country}" if country else resolved_name
 
+    def get_weather_many(self, locations: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Batch lookup. Returns {"results": {location: result}, "errors": {location: message}},
+        keyed by the location strings as given (duplicates are looked up once).
+        Real mode geocodes only cache misses and groups forecast misses into
+        multi-coordinate Open-Meteo requests of up to forecast_batch_size locations.
+        """
+        unique = list(dict.fromkeys(locations))
+        if self.mode == "demo":
+            results, errors = {}, {}
+            for location in unique:
+                try:
+                    results[location] = self._get_demo_weather(location)
+                except Exception as e:
+                    errors[location] = str(e)
+            return {"results": results, "errors": errors}
+        return self._get_real_weather_many(unique)
+
+    async def aget_weather(self, location: str) -> Dict[str, Any]:
+        """
+        Async counterpart of get_weather. At most async_max_concurrency lookups run per
+        event loop; rate-limit waits and retry backoff use asyncio.sleep instead of blocking
+        the loop.
+        """
+        async with self._async_semaphore():
+            if self.mode == "demo":
+                return self._get_demo_weather(location)
+            return await self._aget_real_weather(location)
+
+    def _async_semaphore(self) -> "asyncio.Semaphore":
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        semaphore = self._async_semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._async_semaphores.setdefault(loop, asyncio.Semaphore(self.async_max_concurrency))
+        return semaphore
+
+    async def _aget_real_weather(self, location: str) -> Dict[str, Any]:
+        if not self._offline_geocoder_ready:
+            import asyncio
+
+            # loading the gazetteer (and building its fuzzy index) is one-time but slow;
+            # do it on an I/O thread so concurrent lookups on the loop are not stalled
+            await asyncio.get_running_loop().run_in_executor(self._get_io_executor(), self._prepare_offline_geocoder)
+        geores = self._geocode_from_cache(location)
+        if geores is None:
+            geocode_resp = await self._arequest_with_retries(self.geocode_endpoint, params=self._geocode_params(location), desc="geocoding")
+            geores = self._geocode_from_response(location, geocode_resp)
+        latitude = geores.get("latitude")
+        longitude = geores.get("longitude")
         if latitude is None or longitude is None:
             raise WeatherToolError(f"Geocoding response missing coordinates for '{location}'")
 
-        # 2) Forecast (current weather)
-        forecast_params = {
+        params = self._forecast_params(latitude, longitude)
+        # stale hits are refreshed on a background thread with the blocking client
+        refresh = partial(self._request_with_retries, self.forecast_endpoint, params=params, desc="forecast")
+        forecast_resp = self.forecast_cache.lookup(latitude, longitude, self.timezone, refresh)
+        if forecast_resp is None:
+            forecast_resp = await self._arequest_with_retries(self.forecast_endpoint, params=params, desc="forecast")
+            self.forecast_cache.put(self.forecast_cache.key(latitude, longitude, self.timezone), forecast_resp)
+
+        structured = self._build_result(location, geores, forecast_resp)
+        logger.info("Open-Meteo returned weather for %s (lat=%s lon=%s)", geores.get("name") or location, latitude, longitude)
+        return structured
+
+    def _get_real_weather_many(self, locations: List[str]) -> Dict[str, Dict[str, Any]]:
+        results: Dict[str, Any] = {}
+        errors: Dict[str, str] = {}
+
+        # 1) Geocode (cache first) and split forecast cache hits from misses
+        resolved: Dict[str, Dict[str, Any]] = {}
+        pending: Dict[Tuple[float, float, str], List[str]] = {}
+        coords: Dict[Tuple[float, float, str], Tuple[float, float]] = {}
+        for location in locations:
+            try:
+                geores = self._geocode(location)
+                latitude, longitude = geores.get("latitude"), geores.get("longitude")
+                if latitude is None or longitude is None:
+                    raise WeatherToolError(f"Geocoding response missing coordinates for '{location}'")
+            except Exception as e:
+                errors[location] = str(e)
+                continue
+            resolved[location] = geores
+            refresh = lambda lat=latitude, lon=longitude: self._request_with_retries(
+                self.forecast_endpoint, params=self._forecast_params(lat, lon), desc="forecast"
+            )
+            cached = self.forecast_cache.lookup(latitude, longitude, self.timezone, refresh)
+            if cached is not None:
+                self._collect_result(location, geores, cached, results, errors)
+                continue
+            key = self.forecast_cache.key(latitude, longitude, self.timezone)
+            pending.setdefault(key, []).append(location)
+            coords.setdefault(key, (latitude, longitude))
+
+        # 2) Fetch forecast misses in multi-coordinate batches
+        keys = list(pending)
+        for start in range(0, len(keys), self.forecast_batch_size):
+            chunk = keys[start:start + self.forecast_batch_size]
+            try:
+                payloads = self._fetch_forecast_batch([coords[k] for k in chunk])
+            except Exception as e:
+                for key in chunk:
+                    for location in pending[key]:
+                        errors[location] = str(e)
+                continue
+            for key, payload in zip(chunk, payloads):
+                self.forecast_cache.put(key, payload)
+                for location in pending[key]:
+                    self._collect_result(location, resolved[location], payload, results, errors)
+
+        logger.info("Open-Meteo batch returned %d results and %d errors for %d locations",
+                    len(results), len(errors), len(locations))
+        return {"results": results, "errors": errors}
+
+    def _fetch_forecast_batch(self, coords: List[Tuple[float, float]]) -> List[Dict[str, Any]]:
+        params = self._forecast_params(
+            ",".join(str(lat) for lat, _ in coords),
+            ",".join(str(lon) for _, lon in coords),
+        )
+        payload = self._request_with_retries(self.forecast_endpoint, params=params, desc="forecast-batch")
+        # Open-Meteo answers a single coordinate with an object and several with a list
+        payloads = payload if isinstance(payload, list) else [payload]
+        if len(payloads) != len(coords):
+            raise WeatherToolError(
+                f"forecast-batch returned {len(payloads)} payloads for {len(coords)} coordinates"
+            )
+        return payloads
+
+    def _collect_result(self, location: str, geores: Dict[str, Any], forecast_resp: Dict[str, Any],
+                        results: Dict[str, Any], errors: Dict[str, str]):
+        try:
+            results[location] = self._build_result(location, geores, forecast_resp)
+        except Exception as e:
+            errors[location] = str(e)
+
+    def _forecast_params(self, latitude: Any, longitude: Any) -> Dict[str, Any]:
+        # humidity is not part of current_weather, so it always comes from the hourly block
+        params = {
             "latitude": latitude,
             "longitude": longitude,
             "current_weather": "true",
             "timezone": self.timezone
         }
-        forecast_resp = self._request_with_retries(self.forecast_endpoint, params=forecast_params, desc="forecast")
+        if self.forecast_profile == "lean":
+            # one hourly value, starting at the current hour
+            params.update(hourly="relativehumidity_2m", forecast_hours=1)
+        elif self.forecast_hourly:
+            params.update(hourly=",".join(self.hourly_variables), forecast_days=self.forecast_days)
+        else:
+            params.update(hourly="relativehumidity_2m", forecast_days=1)
+        return params
+
+    def _build_result(self, location: str, geores: Dict[str, Any], forecast_resp: Dict[str, Any]) -> Dict[str, Any]:
         if not forecast_resp or "current_weather" not in forecast_resp:
             raise WeatherToolError(f"Forecast API returned unexpected payload for {location}")
 
         cw = forecast_resp["current_weather"]
-        # Try to extract humidity if hourly relative humidity is available; otherwise leave None
+        # humidity of the hour containing the current-weather time (not the first hour of the
+        # day); the lean profile fetches only that hour, so a nearest-hour match past :30 misses it
         humidity = None
         try:
             hourly = forecast_resp.get("hourly")
-            if isinstance(hourly, dict):
+            if isinstance(hourly, HourlyForecast) and cw.get("time"):
+                humidity = hourly.value("relativehumidity_2m", hourly.containing(cw["time"]))
+            elif isinstance(hourly, dict):
                 rh = hourly.get("relativehumidity_2m")
-                # if list-like and same length as time, pick the first (closest hour)
-                if isinstance(rh, list) and len(rh) > 0:
-                    humidity = rh[0]
+                times = hourly.get("time") or []
+                hour = (cw.get("time") or "")[:13] + ":00"
+                if isinstance(rh, list) and hour in times:
+                    humidity = rh[times.index(hour)]
                 elif isinstance(rh, (int, float)):
                     humidity = rh
         except Exception:
             humidity = None
 
-        structured = {
-            "location": f"{resolved_name}, {country}" if country else resolved_name,
+        return {
+            "location": self._display_name(location, geores),
             "timestamp": cw.get("time"),
             "weather": {
                 "summary": self._map_weathercode_to_summary(cw.get("weathercode")),
@@ -118,26 +546,284 @@ class MCPWeatherTool:
             },
             "source": "real"
         }
-        logger.info("Open-Meteo returned weather for %s (lat=%s lon=%s)", resolved_name, latitude, longitude)
-        return structured
+
+    def _geocode(self, location: str) -> Dict[str, Any]:
+        geores = self._geocode_from_cache(location)
+        if geores is not None:
+            return geores
+        geocode_resp = self._request_with_retries(self.geocode_endpoint, params=self._geocode_params(location), desc="geocoding")
+        return self._geocode_from_response(location, geocode_resp)
+
+    def _geocode_params(self, location: str) -> Dict[str, Any]:
+        return {"name": location, "count": 1}
+
+    def _geocode_from_cache(self, location: str) -> Optional[Dict[str, Any]]:
+        # offline gazetteer first, then previously resolved (or known-unknown) names
+        offline = self._get_offline_geocoder()
+        if offline is not None:
+            geores = offline.lookup(location, fuzzy=self.offline_geocoder_fuzzy)
+            if geores is not None:
+                return geores
+        hit, geores = self.geocode_cache.get(location)
+        if hit and geores is None:
+            raise WeatherToolError(f"Geocoding failed for location '{location}' - no results (cached)")
+        return geores
+
+    def _geocode_from_response(self, location: str, geocode_resp: Dict[str, Any]) -> Dict[str, Any]:
+        # Validate geocoding response
+        if not geocode_resp or "results" not in geocode_resp or not geocode_resp["results"]:
+            self.geocode_cache.put_negative(location)
+            raise WeatherToolError(f"Geocoding failed for location '{location}' - no results")
+
+        geores = geocode_resp["results"][0]
+        if geores.get("latitude") is not None and geores.get("longitude") is not None:
+            self.geocode_cache.put(location, geores)
+        return geores
+
+    def _prepare_offline_geocoder(self):
+        offline = self._get_offline_geocoder()
+        if offline is not None and self.offline_geocoder_fuzzy:
+            offline.build_fuzzy_index()
+        self._offline_geocoder_ready = True
+
+    def _get_offline_geocoder(self) -> Optional["OfflineGeocoder"]:
+        if self._offline_geocoder is None and self.offline_geocoder_path and not self._offline_geocoder_failed:
+            with self._lazy_lock:
+                if self._offline_geocoder is None and not self._offline_geocoder_failed:
+                    from tools.offline_geocoder import OfflineGeocoder
+
+                    try:
+                        self._offline_geocoder = OfflineGeocoder(self.offline_geocoder_path)
+                    except Exception as e:
+                        # a missing or malformed gazetteer only costs the network round-trip
+                        logger.warning("Offline gazetteer %s unavailable (%s); using the geocoding API only",
+                                       self.offline_geocoder_path, e)
+                        self._offline_geocoder_failed = True
+        return self._offline_geocoder
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """
+        Hit/miss counters for the tool's caches (empty in demo mode).
+        """
+        stats: Dict[str, Any] = {}
+        if self.mode == "real":
+            stats["geocoding"] = self.geocode_cache.stats()
+            stats["forecast"] = self.forecast_cache.stats()
+            if self._offline_geocoder is not None:
+                stats["offline_geocoder"] = self._offline_geocoder.stats()
+            stats["upstream"] = {
+                "rate_limiter": self._rate_limiter.stats(),
+                "circuits": {desc: breaker.stats() for desc, breaker in (
+                    ("geocoding", self._breaker(self.geocode_endpoint)),
+                    ("forecast", self._breaker(self.forecast_endpoint)))},
+            }
+        return stats
+
+    def _get_session(self) -> "requests.Session":
+        session = self._session
+        if session is None:
+            with self._lazy_lock:
+                if self._session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+
+                    session = requests.Session()
+                    # ask for gzip explicitly rather than relying on the library default;
+                    # forecast JSON with hourly blocks compresses several times
+                    session.headers["Accept-Encoding"] = "gzip, deflate"
+                    # one pool per host; pool_maxsize bounds the keep-alive connections reused across threads
+                    adapter = HTTPAdapter(pool_connections=self.http_pool_size, pool_maxsize=self.http_pool_size)
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    self._session = session
+                session = self._session
+        return session
+
+    def inherit_warm_state(self, previous: "MCPWeatherTool") -> List[str]:
+        """
+        Reuse caches, demo data and the pooled session of the tool being replaced when
+        their config is unchanged. Returns the names of the reused components.
+        """
+        if previous is None or previous.mode != self.mode:
+            return []
+        kept = []
+        for attr, keys in self._WARM_STATE_KEYS.items():
+            inherited = getattr(previous, attr, None)
+            if inherited is None or any(previous.config.get(k) != self.config.get(k) for k in keys):
+                continue
+            current = getattr(self, attr, None)
+            if current is not None and current is not inherited and hasattr(current, "close"):
+                current.close()
+            setattr(self, attr, inherited)
+            previous._handed_off.add(attr)
+            kept.append(attr)
+        return kept
+
+    def close(self):
+        """
+        Release pooled connections and cache handles. Safe to call more than once.
+        Components handed to a successor via inherit_warm_state stay open.
+        """
+        with self._lazy_lock:
+            session, self._session = self._session, None
+            executor, self._io_executor = self._io_executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+        if session is not None and "_session" not in self._handed_off:
+            session.close()
+        if self.mode == "real" and "geocode_cache" not in self._handed_off:
+            self.geocode_cache.close()
 
     def _request_with_retries(self, url: str, params: Optional[Dict[str, Any]] = None, desc: str = "request") -> Dict[str, Any]:
+        breaker = self._breaker(url)
+        last_exc = None
+        for attempt in range(1, self.max_retries + 1):
+            wait = self._admit(breaker, desc)
+            if wait:
+                time.sleep(wait)
+            self._count_attempt(desc, attempt)
+            try:
+                logger.info("Calling %s (attempt %d) url=%s params=%s", desc, attempt, url, params)
+                with metrics.timer("http_request_seconds", endpoint=desc):
+                    resp = self._get_session().get(url, params=params, timeout=self.timeout)
+                payload = self._parse_response(resp, desc)
+            except Exception as e:
+                last_exc = e
+                delay = self._after_failure(breaker, desc, attempt, e)
+                if delay is None:
+                    break
+                with metrics.timer("http_backoff_seconds", endpoint=desc):
+                    time.sleep(delay)
+                continue
+            breaker.record_success()
+            return payload
+        metrics.inc("http_failures_total", endpoint=desc)
+        raise WeatherToolError(f"All attempts for {desc} failed: {last_exc}") from last_exc
+
+    async def _arequest_with_retries(self, url: str, params: Optional[Dict[str, Any]] = None, desc: str = "request") -> Dict[str, Any]:
+        """
+        Non-blocking variant of _request_with_retries: the HTTP call runs on the tool's I/O
+        threads (sharing the pooled session) and backoff awaits instead of sleeping.
+        """
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        breaker = self._breaker(url)
         last_exc = None
         for attempt in range(1, self.max_retries + 1):
+            # awaiting a token costs no thread, and async_max_concurrency already bounds
+            # how many lookups queue for one, so the async path waits instead of failing fast
+            wait = self._admit(breaker, desc, max_wait=math.inf)
+            if wait:
+                await asyncio.sleep(wait)
+            self._count_attempt(desc, attempt)
             try:
                 logger.info("Calling %s (attempt %d) url=%s params=%s", desc, attempt, url, params)
-                resp = requests.get(url, params=params, timeout=self.timeout)
-                if resp.status_code != 200:
-                    logger.warning("%s responded with status %s: %s", desc, resp.status_code, resp.text)
-                    raise WeatherToolError(f"{desc} status {resp.status_code}")
-                payload = resp.json()
-                return payload
+                call = partial(self._get_session().get, url, params=params, timeout=self.timeout)
+                with metrics.timer("http_request_seconds", endpoint=desc):
+                    resp = await loop.run_in_executor(self._get_io_executor(), call)
+                payload = self._parse_response(resp, desc)
             except Exception as e:
-                logger.exception("Error during %s attempt %d: %s", desc, attempt, e)
                 last_exc = e
-                # exponential-ish backoff
-                time.sleep(min(1 + attempt * 0.5, 5))
-        raise WeatherToolError(f"All attempts for {desc} failed: {last_exc}")
+                delay = self._after_failure(breaker, desc, attempt, e)
+                if delay is None:
+                    break
+                with metrics.timer("http_backoff_seconds", endpoint=desc):
+                    await asyncio.sleep(delay)
+                continue
+            breaker.record_success()
+            return payload
+        metrics.inc("http_failures_total", endpoint=desc)
+        raise WeatherToolError(f"All attempts for {desc} failed: {last_exc}") from last_exc
+
+    def _breaker(self, url: str) -> CircuitBreaker:
+        breaker = self._breakers.get(url)
+        if breaker is None:
+            # keyed by URL: "forecast" and "forecast-batch" share the forecast endpoint's breaker
+            breaker = self._breakers[url] = circuit_breaker(url, self.circuit_failure_threshold, self.circuit_reset_seconds)
+        return breaker
+
+    def _admit(self, breaker: CircuitBreaker, desc: str, max_wait: Optional[float] = None) -> float:
+        """
+        Gate before every attempt (retries included): fail fast while the endpoint's circuit
+        is open, then take a rate-limit token. Returns the seconds to wait for the token;
+        raises RateLimitedError if that exceeds max_wait (default rate_limit_max_wait).
+        """
+        max_wait = self.rate_limit_max_wait if max_wait is None else max_wait
+        if not breaker.allow():
+            metrics.inc("http_rejected_total", endpoint=desc, reason="circuit_open")
+            raise UpstreamUnavailableError(f"{desc} circuit open; upstream failing, retry in {breaker.retry_in():.0f}s")
+        wait = self._rate_limiter.reserve(max_wait)
+        if wait is None:
+            # hand back a half-open probe slot, or the breaker would wait for a call that never ran
+            breaker.release()
+            metrics.inc("http_rejected_total", endpoint=desc, reason="rate_limited")
+            raise RateLimitedError(f"{desc} rate limited locally (wait > {max_wait}s)")
+        if wait:
+            metrics.observe("http_rate_limit_wait_seconds", wait, endpoint=desc)
+        return wait
+
+    def _after_failure(self, breaker: CircuitBreaker, desc: str, attempt: int, error: Exception) -> Optional[float]:
+        """
+        Classify a failed attempt. Returns the backoff before the next attempt, or None when
+        the call should not be retried: a 4xx other than 408/429, no attempts left, or a
+        Retry-After beyond retry_after_max.
+        """
+        metrics.inc("http_errors_total", endpoint=desc, error=type(error).__name__)
+        retry_after = None
+        if isinstance(error, UpstreamHTTPError):
+            # the response itself was already logged by _parse_response
+            logger.warning("Error during %s attempt %d: %s", desc, attempt, error)
+            retryable = error.status in (408, 429) or error.status >= 500
+            retry_after = error.retry_after
+            if error.status >= 500:
+                breaker.record_failure()
+            else:
+                # upstream answered; 4xx says nothing about its health
+                breaker.record_success()
+        else:
+            # connection errors, timeouts, undecodable bodies
+            logger.exception("Error during %s attempt %d: %s", desc, attempt, error)
+            retryable = True
+            breaker.record_failure()
+
+        if not retryable or attempt >= self.max_retries:
+            return None
+        delay = backoff_seconds(attempt, self.backoff_base, self.backoff_max)
+        if retry_after is not None:
+            if retry_after > self.retry_after_max:
+                logger.warning("%s asked to retry after %.0fs (limit %.0fs); giving up", desc, retry_after, self.retry_after_max)
+                return None
+            delay = max(delay, retry_after)
+        return delay
+
+    def _count_attempt(self, desc: str, attempt: int):
+        metrics.inc("http_attempts_total", endpoint=desc)
+        if attempt > 1:
+            metrics.inc("http_retries_total", endpoint=desc)
+
+    def _parse_response(self, resp: "requests.Response", desc: str) -> Dict[str, Any]:
+        metrics.inc("http_responses_total", endpoint=desc, status=resp.status_code)
+        if resp.status_code != 200:
+            # bodies can be large error pages; a prefix is enough to diagnose
+            logger.warning("%s responded with status %s: %.200s", desc, resp.status_code, resp.text)
+            raise UpstreamHTTPError(desc, resp.status_code, _retry_after_seconds(resp.headers.get("Retry-After")))
+        # bytes on the wire (compressed size when the body was gzipped)
+        metrics.inc("http_response_bytes_total", _wire_bytes(resp), endpoint=desc)
+        with metrics.timer("http_decode_seconds", endpoint=desc):
+            payload = json_backend.loads(resp.content)
+            if desc.startswith("forecast"):
+                # hourly lists -> typed arrays before the payload is cached
+                payload = compact_forecast_payload(payload)
+            return payload
+
+    def _get_io_executor(self) -> ThreadPoolExecutor:
+        if self._io_executor is None:
+            with self._lazy_lock:
+                if self._io_executor is None:
+                    # one thread per pooled connection so every in-flight request reuses a keep-alive socket
+                    self._io_executor = ThreadPoolExecutor(max_workers=self.http_pool_size, thread_name_prefix="weather-io")
+        return self._io_executor
 
     def _map_weathercode_to_summary(self, code: Optional[int]) -> str:
         """
@@ -180,3 +866,30 @@ class MCPWeatherTool:
             return mapping.get(int(code), f"Weather code {code}")
         except Exception:
             return "Unknown"
+
+
+def _wire_bytes(resp: "requests.Response") -> int:
+    length = resp.headers.get("Content-Length")
+    if length and length.isdigit():
+        return int(length)
+    # chunked: urllib3 counts the raw bytes it read
+    try:
+        return int(resp.raw.tell())
+    except Exception:
+        return len(resp.content)
+
+
+def _retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    # Retry-After is either delta-seconds or an HTTP date
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        from email.utils import parsedate_to_datetime
+
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
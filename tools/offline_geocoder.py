@@ -0,0 +1,306 @@
+﻿# tools/offline_geocoder.py
+"""
+Offline geocoder over a local city gazetteer (CSV: name, country, country_code, latitude,
+longitude, population). MCPWeatherTool consults it before the Open-Meteo geocoding API.
+
+The index is columnar and read-only after loading:
+  - normalized names sorted once (ties ordered by population), so exact and prefix lookups
+    are a bisect over a plain list
+  - coordinates/populations in typed arrays, countries interned
+  - fuzzy (typo-tolerant) lookup uses a deletion index (every name plus its one-character
+    deletions, hashed into one sorted int64 array, built on first fuzzy lookup); candidates
+    sharing a deletion variant with the query are verified with a bounded edit distance
+    (insert/delete/substitute/transpose)
+Results are ranked by population, like the Open-Meteo geocoder.
+"""
+import csv
+import heapq
+import threading
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Tuple
+from utils.location_utils import normalize_location
+from utils.logger import setup_logger
+
+logger = setup_logger("offline_geocoder", None)
+
+# deletion index entries pack (variant hash << _ROW_BITS) | row id into one int64
+_ROW_BITS = 23
+_ROW_MASK = (1 << _ROW_BITS) - 1
+_HASH_MASK = (1 << (63 - _ROW_BITS)) - 1
+
+_COLUMN_ALIASES = {
+    "name": ("name", "city", "asciiname"),
+    "country": ("country", "country_name"),
+    "country_code": ("country_code", "countrycode", "cc"),
+    "latitude": ("latitude", "lat"),
+    "longitude": ("longitude", "lon", "lng"),
+    "population": ("population", "pop"),
+}
+
+
+def gazetteer_key(name: str) -> str:
+    """
+    Index key: normalize_location() plus accent folding, so "Sao Paulo" finds "São Paulo".
+    """
+    if name.isascii():
+        # fast path for the bulk of gazetteer rows
+        return " ".join(name.lower().split())
+    text = unicodedata.normalize("NFKD", normalize_location(name))
+    return "".join(ch for ch in text if not unicodedata.combining(ch))
+
+
+class OfflineGeocoder:
+    def __init__(self, path: str):
+        self.path = path
+        self._stats_lock = threading.Lock()
+        self._stats = {"exact_hits": 0, "prefix_hits": 0, "fuzzy_hits": 0, "misses": 0}
+        started = time.perf_counter()
+        self._load(path)
+        self.build_ms = (time.perf_counter() - started) * 1000.0
+        logger.info("Offline gazetteer loaded from %s: %d places in %.1f ms (%d rows skipped)",
+                    path, len(self._keys), self.build_ms, self.skipped_rows)
+
+    def _load(self, path: str):
+        rows: List[Tuple[str, int, str, int, float, float]] = []
+        countries: Dict[Tuple[str, str], int] = {}
+        self.skipped_rows = 0
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            reader = csv.reader(f)
+            header = [h.strip().lower() for h in next(reader, [])]
+            columns = {}
+            for field, aliases in _COLUMN_ALIASES.items():
+                columns[field] = next((header.index(a) for a in aliases if a in header), None)
+            for required in ("name", "latitude", "longitude"):
+                if columns[required] is None:
+                    raise ValueError(f"gazetteer {path} has no '{required}' column")
+
+            def cell(row, field, default=""):
+                index = columns[field]
+                return row[index].strip() if index is not None and index < len(row) else default
+
+            for row in reader:
+                try:
+                    name = cell(row, "name")
+                    latitude = float(cell(row, "latitude"))
+                    longitude = float(cell(row, "longitude"))
+                    population = int(float(cell(row, "population", "0") or 0))
+                except (ValueError, IndexError):
+                    self.skipped_rows += 1
+                    continue
+                key = gazetteer_key(name)
+                if not key:
+                    self.skipped_rows += 1
+                    continue
+                country = (cell(row, "country"), cell(row, "country_code").upper())
+                country_index = countries.setdefault(country, len(countries))
+                # population negated so a plain sort puts the most populous place first per name
+                rows.append((key, -population, name, country_index, latitude, longitude))
+        rows.sort()
+
+        self._keys: List[str] = [r[0] for r in rows]
+        self._names: List[str] = [r[2] for r in rows]
+        self._population = array("q", (-r[1] for r in rows))
+        self._country = array("I", (r[3] for r in rows))
+        self._lat = array("d", (r[4] for r in rows))
+        self._lon = array("d", (r[5] for r in rows))
+        self._countries: List[Tuple[str, str]] = [None] * len(countries)
+        for country, index in countries.items():
+            self._countries[index] = country
+        self._country_keys = [(gazetteer_key(n), c.casefold()) for n, c in self._countries]
+        self._deletions: Optional[array] = None
+        self._deletions_lock = threading.Lock()
+
+    def build_fuzzy_index(self):
+        """
+        Build the fuzzy index now rather than on the first fuzzy lookup (e.g. on a worker
+        thread, before lookups run on an event loop).
+        """
+        self._deletion_index()
+
+    def _deletion_index(self) -> array:
+        if self._deletions is None:
+            with self._deletions_lock:
+                if self._deletions is None:
+                    if len(self._keys) > _ROW_MASK:
+                        raise ValueError(f"fuzzy index supports at most {_ROW_MASK} places")
+                    started = time.perf_counter()
+                    self._deletions = array("q", sorted(self._deletion_entries()))
+                    logger.info("Offline gazetteer fuzzy index built: %d entries in %.1f ms",
+                                len(self._deletions), (time.perf_counter() - started) * 1000.0)
+        return self._deletions
+
+    def _deletion_entries(self):
+        # one entry per distinct variant of each distinct name (the most populous row per name)
+        previous = None
+        for index, key in enumerate(self._keys):
+            if key == previous:
+                continue
+            previous = key
+            for variant in _deletions(key):
+                yield ((hash(variant) & _HASH_MASK) << _ROW_BITS) | index
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def lookup(self, query: str, fuzzy: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Best match for a free-text location: exact name first, then (when fuzzy is True)
+        the closest name within a small edit distance. "Name, Country" or "Name, CC"
+        restricts matches to that country. Returns None on a miss.
+        """
+        match, outcome = self._match(query, fuzzy)
+        self._count(outcome)
+        return match
+
+    def peek(self, query: str, fuzzy: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Like lookup(), without counting a hit or miss.
+        """
+        return self._match(query, fuzzy)[0]
+
+    def _match(self, query: str, fuzzy: bool) -> Tuple[Optional[Dict[str, Any]], str]:
+        results = self.exact(query, limit=1)
+        if results:
+            return results[0], "exact_hits"
+        if fuzzy:
+            results = self.fuzzy(query, limit=1)
+            if results:
+                return results[0], "fuzzy_hits"
+        return None, "misses"
+
+    def exact(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
+        key, country = self._parse(query)
+        lo = bisect_left(self._keys, key)
+        hi = lo
+        while hi < len(self._keys) and self._keys[hi] == key:
+            hi += 1
+        # rows sharing a name are already ordered by population
+        return self._collect(range(lo, hi), country, limit)
+
+    def prefix(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """
+        Places whose name starts with the query (autocomplete), most populous first.
+        """
+        key, country = self._parse(query)
+        if not key:
+            return []
+        lo = bisect_left(self._keys, key)
+        hi = bisect_left(self._keys, key + "\U0010ffff", lo)
+        ranked = heapq.nlargest(limit if country is None else hi - lo, range(lo, hi), key=self._population.__getitem__)
+        results = self._collect(ranked, country, limit)
+        if results:
+            self._count("prefix_hits")
+        return results
+
+    def fuzzy(self, query: str, limit: int = 5, max_distance: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Typo-tolerant lookup ranked by (edit distance, -population). max_distance defaults
+        to 1 for names up to 5 characters and 2 for longer ones.
+        """
+        key, country = self._parse(query)
+        if not key:
+            return []
+        if max_distance is None:
+            max_distance = 1 if len(key) <= 5 else 2
+        entries = self._deletion_index()
+        variants = _deletions(key)
+        if max_distance > 1:
+            # two deletions on the query side reach names two characters shorter
+            variants = {v2 for v in variants for v2 in _deletions(v)}
+        seen = set()
+        scored = []
+        for variant in variants:
+            prefix = (hash(variant) & _HASH_MASK) << _ROW_BITS
+            position = bisect_left(entries, prefix)
+            while position < len(entries) and entries[position] >> _ROW_BITS == prefix >> _ROW_BITS:
+                index = entries[position] & _ROW_MASK
+                position += 1
+                if index in seen:
+                    continue
+                seen.add(index)
+                distance = _bounded_distance(key, self._keys[index], max_distance)
+                if distance <= max_distance:
+                    scored.append((distance, -self._population[index], index))
+        scored.sort()
+        return self._collect((index for _, _, index in scored), country, limit)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = sum(stats.values())
+        stats["hit_rate"] = round((lookups - stats["misses"]) / lookups, 4) if lookups else None
+        stats["places"] = len(self._keys)
+        stats["build_ms"] = round(self.build_ms, 1)
+        return stats
+
+    def _count(self, name: str):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def _parse(self, query: str) -> Tuple[str, Optional[str]]:
+        # "Paris, FR" / "London, England, United Kingdom" -> name key + country filter (last part)
+        parts = str(query or "").split(",")
+        country = parts[-1] if len(parts) > 1 and parts[-1].strip() else None
+        return gazetteer_key(parts[0]), gazetteer_key(country) if country else None
+
+    def _collect(self, indices, country: Optional[str], limit: int) -> List[Dict[str, Any]]:
+        results = []
+        for index in indices:
+            if len(results) >= limit:
+                break
+            if country is not None and country not in self._country_keys[self._country[index]]:
+                continue
+            results.append(self._record(index))
+        return results
+
+    def _record(self, index: int) -> Dict[str, Any]:
+        country, country_code = self._countries[self._country[index]]
+        return {
+            "name": self._names[index],
+            "latitude": self._lat[index],
+            "longitude": self._lon[index],
+            "country": country or None,
+            "country_code": country_code or None,
+            "population": self._population[index],
+            "source": "gazetteer",
+        }
+
+
+def _deletions(key: str) -> set:
+    # the key itself plus every single-character deletion
+    variants = {key}
+    for i in range(len(key)):
+        variants.add(key[:i] + key[i + 1:])
+    return variants
+
+
+def _bounded_distance(a: str, b: str, limit: int) -> int:
+    """
+    Optimal string alignment distance (Levenshtein + adjacent transpositions), giving up
+    with limit + 1 as soon as every cell of a row exceeds limit.
+    """
+    if a == b:
+        return 0
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        ca = a[i - 1]
+        for j in range(1, len(b) + 1):
+            cost = 0 if ca == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if previous2 is not None and j > 1 and ca == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, previous2[j - 2] + 1)
+            current[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[len(b)]
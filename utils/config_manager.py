@@ -2,10 +2,8 @@
 import os
 import json
 import threading
-from typing import Dict, Any, Callable, Optional
+from typing import Dict, Any, Callable, List, Optional, Set
 from pydantic import BaseModel, Field, validator
-from watchdog.observers import Observer
-from watchdog.events import FileSystemEventHandler
 from pathlib import Path
 
 # Allowed modes
@@ -28,15 +26,94 @@ class WeatherConfig(BaseModel):
     geocoding_endpoint: Optional[str] = None
     forecast_endpoint: Optional[str] = None
 
+    timezone: str = "UTC"
+    units: str = "metric"
+
     # Common
     demo_data_path: Optional[str] = None
+    # demo data (.json or .jsonl) is kept in memory; its mtime is re-checked at most this often
+    demo_reload_check_seconds: float = 1.0
     timeout_seconds: int = 8
+    # attempts per upstream call; only timeouts, connection errors, 408/429 and 5xx are retried,
+    # after a jittered exponential backoff (a Retry-After up to retry_after_max_seconds wins)
     max_retries: int = 2
+    retry_backoff_base_seconds: float = 0.25
+    retry_backoff_max_seconds: float = 4.0
+    retry_after_max_seconds: float = 10.0
+    # process-wide upstream rate limit shared by all tools and threads (0 disables it);
+    # a sync call that would wait longer than rate_limit_max_wait_seconds for a token fails
+    # fast (async calls always wait). burst + rate * max_wait >= async_max_concurrency, so
+    # a full async fan-out and a sync burst of the same size are both admitted
+    rate_limit_per_second: float = 10.0
+    rate_limit_burst: int = 20
+    rate_limit_max_wait_seconds: float = 8.0
+    # per-endpoint circuit breaker: open after this many consecutive failures (0 disables it),
+    # fail fast while open, probe again after circuit_reset_seconds
+    circuit_failure_threshold: int = 5
+    circuit_reset_seconds: float = 30.0
+    # keep-alive connections kept per host by the tool's pooled HTTP session
+    http_pool_size: int = 10
+    # coordinates per multi-location forecast request (Orchestrator.fetch_weather_many)
+    forecast_batch_size: int = 50
+    # lookups in flight per event loop on the async path (Orchestrator.afetch_weather)
+    async_max_concurrency: int = 100
+    # share one upstream fetch between concurrent lookups of the same location
+    coalesce_requests: bool = True
+
+    # Geocoding cache (real mode): in-memory LRU + optional on-disk tier
+    geocode_cache_size: int = 1024
+    geocode_cache_path: Optional[str] = "data/cache/geocoding.sqlite3"
+    geocode_negative_ttl_seconds: int = 3600
+    # offline gazetteer (CSV) tried before the geocoding API; null disables it.
+    # Fuzzy (typo-tolerant) matching is off by default: a small gazetteer could map an
+    # unlisted town to a similarly spelled city
+    offline_geocoder_path: Optional[str] = "data/gazetteer/cities.csv"
+    offline_geocoder_fuzzy: bool = False
+
+    # Forecast cache (real mode): entries are fresh within one TTL bucket, then served stale
+    # (with a background refresh) for up to forecast_cache_max_stale_seconds
+    forecast_cache_ttl_seconds: int = 900
+    forecast_cache_max_entries: int = 2048
+    forecast_cache_precision: int = 2
+    forecast_cache_max_stale_seconds: int = 3600
+    # fetch hourly variables for forecast_days with every forecast and keep them as typed
+    # arrays, so "weather at 18:00" / "next N hours" need no further requests
+    forecast_hourly: bool = True
+    hourly_variables: List[str] = ["temperature_2m", "relativehumidity_2m", "windspeed_10m", "weathercode"]
+    forecast_days: int = 2
+    # "full" (above) or "lean": request only current weather and the current hour's humidity
+    forecast_profile: str = "full"
 
 class Settings(BaseModel):
     mode: str = Field("demo", description="Execution mode: demo or real")
     weather: WeatherConfig
+    # see utils.logger.configure_logging for the supported keys (queue, rotation, sampling, ...)
     logging: Dict[str, Any] = {"level": "INFO", "path": "logs/app.log"}
+    # HTTP service mode (main.py --serve)
+    server: Dict[str, Any] = {"host": "127.0.0.1", "port": 8080, "workers": 8, "queue_size": 64}
+    # plan execution (Orchestrator.handle_intent): worker threads and default per-step timeout
+    executor: Dict[str, Any] = {"max_workers": 4, "step_timeout_seconds": 10.0}
+    # planner backend and its plan cache (see agent.planner_agent.PlannerAgent.from_settings)
+    planner: Dict[str, Any] = {"backend": "stub", "default_location": "Rajkot", "cache_enabled": True,
+                               "cache_max_entries": 1024, "cache_ttl_seconds": 86400,
+                               "cache_path": "data/cache/plans.sqlite3"}
+    # real mode: background upstream reachability probes; while the forecast endpoint is down,
+    # fetch_weather serves the last known good report, else demo data (fallback_to_demo)
+    connectivity: Dict[str, Any] = {"enabled": True, "interval_seconds": 15, "timeout_seconds": 2,
+                                    "failure_threshold": 2, "fallback_to_demo": True,
+                                    "last_known_good_max_entries": 1024}
+    # append-only history of real-mode results (agent.snapshot_store); also pre-warms caches on startup
+    snapshots: Dict[str, Any] = {"enabled": True, "path": "data/cache/snapshots.sqlite3", "queue_size": 10000,
+                                 "batch_size": 500, "retention_days": 30, "max_per_location": 1000,
+                                 "compact_interval_seconds": 3600, "prewarm_max_locations": 1024,
+                                 "prewarm_max_age_seconds": 86400}
+    # background refresh of hot locations (see agent.prefetcher.Prefetcher)
+    prefetch: Dict[str, Any] = {"enabled": True, "top_n": 20, "lead_seconds": 60, "interval_seconds": 15,
+                                "max_requests_per_minute": 30, "half_life_seconds": 3600, "max_tracked": 10000}
+    # watch the config file for hot reload (main.py --no-watch turns this off)
+    hot_reload: bool = True
+    # file events arriving within this window are coalesced into a single reload
+    reload_debounce_seconds: float = 0.5
 
     @validator("mode")
     def mode_must_be_valid(cls, v):
@@ -47,16 +124,37 @@ class Settings(BaseModel):
             raise ValueError(f"mode must be one of {ALLOWED_MODES}")
         return vv
 
+def diff_settings(old: Settings, new: Settings) -> Set[str]:
+    """
+    Names of the top-level settings sections that differ (e.g. {"logging"}).
+    """
+    o, n = old.dict(), new.dict()
+    return {key for key in set(o) | set(n) if o.get(key) != n.get(key)}
+
+def diff_weather(old: Settings, new: Settings) -> Set[str]:
+    """
+    Names of the weather config fields that differ.
+    """
+    o, n = old.weather.dict(), new.weather.dict()
+    return {key for key in set(o) | set(n) if o.get(key) != n.get(key)}
+
 class ConfigManager:
-    def __init__(self, path: str, on_change: Optional[Callable[[Settings], None]] = None):
+    def __init__(self, path: str, on_change: Optional[Callable[[Settings], None]] = None,
+                 watch: Optional[bool] = None, overrides: Optional[Dict[str, Any]] = None):
         self.path = path
         self.on_change = on_change
+        # merged over the file on every load (dict sections key by key), so they survive reloads
+        self.overrides = overrides or {}
         self._lock = threading.RLock()
         # load settings (tolerate BOM)
         self.settings: Settings = self._load()
-        self._observer: Optional[Observer] = None
-        # Start watcher for hot-reload
-        self._start_watcher()
+        self._observer = None
+        self._debounce_timer: Optional[threading.Timer] = None
+        self._debounce_lock = threading.Lock()
+        # Start watcher for hot-reload (explicit argument wins over the config flag)
+        self.watching = self.settings.hot_reload if watch is None else bool(watch)
+        if self.watching:
+            self._start_watcher()
 
     def _load(self) -> Settings:
         """
@@ -68,11 +166,27 @@ class ConfigManager:
             raise FileNotFoundError(f"Config file not found at {self.path}")
         with p.open("r", encoding="utf-8-sig") as f:
             raw = json.load(f)
+        for key, value in self.overrides.items():
+            if isinstance(value, dict):
+                section = raw.get(key)
+                if section is None:
+                    # a section missing from the file keeps its defaults under the override
+                    default = Settings.__fields__[key].default
+                    section = default if isinstance(default, dict) else {}
+                raw[key] = {**section, **value}
+            else:
+                raw[key] = value
         return Settings(**raw)
 
     def reload(self) -> Settings:
+        """
+        Reload from disk. on_change only fires when the parsed settings actually differ,
+        so editor saves that leave the content unchanged are no-ops.
+        """
         with self._lock:
             new_settings = self._load()
+            if not diff_settings(self.settings, new_settings):
+                return self.settings
             self.settings = new_settings
             if self.on_change:
                 try:
@@ -82,22 +196,51 @@ class ConfigManager:
                     pass
             return new_settings
 
+    def schedule_reload(self):
+        """
+        Debounced reload: restart the timer on every event so a burst of writes
+        (editors often emit several per save) results in one reload after it settles.
+        """
+        delay = float(self.settings.reload_debounce_seconds)
+        with self._debounce_lock:
+            if self._debounce_timer is not None:
+                self._debounce_timer.cancel()
+            timer = threading.Timer(delay, self._debounced_reload)
+            timer.daemon = True
+            self._debounce_timer = timer
+            timer.start()
+
+    def _debounced_reload(self):
+        with self._debounce_lock:
+            self._debounce_timer = None
+        try:
+            self.reload()
+        except Exception:
+            # half-written file or invalid config; the next event will retry
+            pass
+
     def _start_watcher(self):
+        # watchdog is only needed (and imported) when hot reload is enabled
+        from watchdog.observers import Observer
+        from watchdog.events import FileSystemEventHandler
+
         # Watch the config file's parent directory and reload on modifications of that exact file
         class _Handler(FileSystemEventHandler):
             def __init__(self, outer):
                 self.outer = outer
-            def on_modified(self, event):
+            def _maybe_reload(self, path):
                 try:
-                    src = Path(event.src_path).resolve()
-                    target = Path(self.outer.path).resolve()
-                    if src == target:
-                        try:
-                            self.outer.reload()
-                        except Exception:
-                            pass
+                    if Path(path).resolve() == Path(self.outer.path).resolve():
+                        self.outer.schedule_reload()
                 except Exception:
                     pass
+            def on_modified(self, event):
+                self._maybe_reload(event.src_path)
+            def on_created(self, event):
+                self._maybe_reload(event.src_path)
+            def on_moved(self, event):
+                # editors that save via rename-over-original
+                self._maybe_reload(event.dest_path)
 
         observer = Observer()
         handler = _Handler(self)
@@ -108,6 +251,10 @@ class ConfigManager:
         self._observer = observer
 
     def stop(self):
+        with self._debounce_lock:
+            if self._debounce_timer is not None:
+                self._debounce_timer.cancel()
+                self._debounce_timer = None
         if self._observer:
             self._observer.stop()
             self._observer.join()
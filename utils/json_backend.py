@@ -0,0 +1,69 @@
+﻿# utils/json_backend.py
+"""
+JSON decoding behind one small interface, so hot paths (upstream responses, demo data)
+use the fastest parser available:
+  - "orjson" when the package is installed (several times faster on forecast payloads)
+  - "json" (stdlib) otherwise
+The backend is picked on import; use("json") / use("orjson") switches it explicitly
+(e.g. to compare them in benchmarks). Both accept str or bytes; a UTF-8 BOM is stripped.
+"""
+import codecs
+import json
+from typing import Any, Callable, Dict, List, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_BOM = codecs.BOM_UTF8
+
+
+def _stdlib_loads(data: Union[bytes, str]) -> Any:
+    # json.loads detects UTF-8/16/32 in bytes itself
+    return json.loads(data)
+
+
+def _orjson_loads(data: Union[bytes, str]) -> Any:
+    return orjson.loads(data)
+
+
+_BACKENDS: Dict[str, Callable[[Union[bytes, str]], Any]] = {"json": _stdlib_loads}
+if orjson is not None:
+    _BACKENDS["orjson"] = _orjson_loads
+
+_name = "orjson" if orjson is not None else "json"
+_loads = _BACKENDS[_name]
+
+
+def available() -> List[str]:
+    return sorted(_BACKENDS)
+
+
+def backend() -> str:
+    return _name
+
+
+def use(name: str) -> str:
+    """
+    Switch the process-wide backend ("auto" picks the fastest installed one).
+    Raises ValueError for a backend that is not installed.
+    """
+    global _name, _loads
+    if name == "auto":
+        name = "orjson" if orjson is not None else "json"
+    if name not in _BACKENDS:
+        raise ValueError(f"JSON backend '{name}' is not available (installed: {', '.join(available())})")
+    _name = name
+    _loads = _BACKENDS[name]
+    return name
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        data = bytes(data)
+        if data.startswith(_BOM):
+            data = data[len(_BOM):]
+    elif data.startswith("\ufeff"):
+        data = data[1:]
+    return _loads(data)
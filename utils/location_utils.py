@@ -0,0 +1,13 @@
+﻿# utils/location_utils.py
+import unicodedata
+
+
+def normalize_location(name: str) -> str:
+    """
+    Normalize a free-text location name into a stable cache/index key.
+    Case-, width- and whitespace-insensitive: "  New   YORK " -> "new york".
+    """
+    if name is None:
+        return ""
+    text = unicodedata.normalize("NFKC", str(name))
+    return " ".join(text.casefold().split())
@@ -1,33 +1,204 @@
 ﻿# utils/logger.py
+import atexit
 import logging
+import logging.handlers
 import os
-from typing import Optional
+import queue
+import threading
+from typing import Any, Dict, Optional
 
-def setup_logger(name: str = "ura", log_file: Optional[str] = None, level: str = "INFO"):
+_FORMAT = "%(asctime)s | %(levelname)s | %(name)s | %(message)s"
+_DATEFMT = "%Y-%m-%d %H:%M:%S"
+
+# names of every logger created through setup_logger, so configure_logging can rewire them
+_registered = set()
+_state_lock = threading.RLock()
+_queue_state: Dict[str, Any] = {}
+
+
+def setup_logger(name: str = "ura", log_file: Optional[str] = None, level: str = "INFO",
+                 max_bytes: int = 0, backup_count: int = 3):
     """
     Configure and return a logger used throughout the application.
-    If log_file is provided, logs are also written to that file (rotating not configured for simplicity).
+    If log_file is provided, logs are also written to that file; max_bytes > 0 enables
+    size-based rotation keeping backup_count old files.
+    When queue mode is active (see configure_logging) the logger is attached to the shared queue.
     """
     numeric_level = getattr(logging, level.upper(), logging.INFO)
     logger = logging.getLogger(name)
     logger.setLevel(numeric_level)
 
+    with _state_lock:
+        _registered.add(name)
+        if _queue_state:
+            _attach_queue(logger)
+            return logger
+
     # avoid adding multiple handlers if called multiple times (e.g., during hot reload)
     if logger.handlers:
         return logger
 
-    formatter = logging.Formatter(
-        "%(asctime)s | %(levelname)s | %(name)s | %(message)s", "%Y-%m-%d %H:%M:%S"
-    )
+    formatter = TruncatingFormatter(_FORMAT, _DATEFMT)
 
     sh = logging.StreamHandler()
     sh.setFormatter(formatter)
     logger.addHandler(sh)
 
     if log_file:
-        os.makedirs(os.path.dirname(log_file) or ".", exist_ok=True)
-        fh = logging.FileHandler(log_file)
-        fh.setFormatter(formatter)
-        logger.addHandler(fh)
+        logger.addHandler(_file_handler(log_file, max_bytes, backup_count, formatter))
 
     return logger
+
+
+class TruncatingFormatter(logging.Formatter):
+    """
+    Formatter that elides the middle of very long messages (e.g. full upstream payloads).
+    """
+
+    def __init__(self, fmt=None, datefmt=None, max_message_chars: int = 0):
+        super().__init__(fmt, datefmt)
+        self.max_message_chars = int(max_message_chars or 0)
+
+    def formatMessage(self, record):
+        limit = self.max_message_chars
+        if limit and len(record.message) > limit:
+            head = limit // 2
+            elided = len(record.message) - limit
+            record.message = f"{record.message[:head]} ...[{elided} chars elided]... {record.message[-(limit - head):]}"
+        return super().formatMessage(record)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps 1 in every round(1/rate) records at INFO or below; warnings and errors always pass.
+    Counter-based rather than random so sampled output stays evenly spaced.
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.every = max(1, int(round(1.0 / rate))) if rate > 0 else 0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno > logging.INFO:
+            return True
+        if self.every == 0:
+            return False
+        with self._lock:
+            self._count += 1
+            return (self._count - 1) % self.every == 0
+
+
+class _LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that defers message formatting to the listener thread.
+    The stock handler formats in prepare(), i.e. on the request thread; here the record
+    (msg + args) is enqueued untouched, so log arguments must not be mutated after the call.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+def configure_logging(config: Dict[str, Any]):
+    """
+    Apply the settings "logging" section.
+      queue: true            -> all loggers created via setup_logger enqueue records; a background
+                                listener thread formats them and writes stderr + the log file
+      path, level            -> log file and level
+      max_bytes, backup_count-> size-based rotation of the log file (max_bytes 0 disables)
+      max_message_chars      -> longer messages are elided in the middle (0 disables)
+      sample_rates           -> {"logger_name": 0.1} keeps ~10% of that logger's INFO/DEBUG records
+    Without queue mode this keeps the classic behavior: the "ura" logger writes to the file.
+    """
+    config = dict(config or {})
+    level = str(config.get("level", "INFO"))
+    path = config.get("path")
+    max_bytes = int(config.get("max_bytes", 0) or 0)
+    backup_count = int(config.get("backup_count", 3))
+    if not config.get("queue"):
+        shutdown_logging()
+        return setup_logger("ura", path, level, max_bytes=max_bytes, backup_count=backup_count)
+
+    with _state_lock:
+        if _queue_state.get("config") == config:
+            return logging.getLogger("ura")
+        shutdown_logging()
+
+        formatter = TruncatingFormatter(_FORMAT, _DATEFMT, int(config.get("max_message_chars", 0) or 0))
+        handlers = [logging.StreamHandler()]
+        if path:
+            handlers.append(_file_handler(path, max_bytes, backup_count, formatter))
+        for handler in handlers:
+            handler.setFormatter(formatter)
+
+        record_queue = queue.SimpleQueue()
+        listener = logging.handlers.QueueListener(record_queue, *handlers, respect_handler_level=False)
+        listener.start()
+        _queue_state.update({
+            "config": config,
+            "listener": listener,
+            "handler": _LazyQueueHandler(record_queue),
+            "level": getattr(logging, level.upper(), logging.INFO),
+            "sample_rates": dict(config.get("sample_rates") or {}),
+            "saved": {},
+        })
+        _registered.add("ura")
+        for name in sorted(_registered):
+            _attach_queue(logging.getLogger(name))
+    return logging.getLogger("ura")
+
+
+def _attach_queue(logger: logging.Logger):
+    # caller holds _state_lock; remember the direct handlers so shutdown_logging can restore them
+    state = _queue_state
+    if logger.name not in state["saved"]:
+        state["saved"][logger.name] = (list(logger.handlers), list(logger.filters))
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    for f in list(logger.filters):
+        if isinstance(f, SamplingFilter):
+            logger.removeFilter(f)
+    logger.addHandler(state["handler"])
+    logger.setLevel(state["level"])
+    rate = state["sample_rates"].get(logger.name)
+    if rate is not None and float(rate) < 1.0:
+        logger.addFilter(SamplingFilter(float(rate)))
+
+
+def shutdown_logging():
+    """
+    Stop queue mode (if active): flush pending records and restore direct handlers.
+    """
+    with _state_lock:
+        if not _queue_state:
+            return
+        state = dict(_queue_state)
+        _queue_state.clear()
+    state["listener"].stop()
+    for name, (handlers, filters) in state["saved"].items():
+        logger = logging.getLogger(name)
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+        for f in list(logger.filters):
+            logger.removeFilter(f)
+        for handler in handlers:
+            logger.addHandler(handler)
+        for f in filters:
+            logger.addFilter(f)
+    for handler in state["listener"].handlers:
+        handler.close()
+
+
+def _file_handler(log_file: str, max_bytes: int, backup_count: int, formatter: logging.Formatter) -> logging.Handler:
+    os.makedirs(os.path.dirname(log_file) or ".", exist_ok=True)
+    if max_bytes > 0:
+        fh = logging.handlers.RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count)
+    else:
+        fh = logging.FileHandler(log_file)
+    fh.setFormatter(formatter)
+    return fh
+
+
+atexit.register(shutdown_logging)
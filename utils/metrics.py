@@ -0,0 +1,275 @@
+﻿# utils/metrics.py
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Tuple
+
+# upper bounds in seconds; covers cache hits (sub-ms) up to timeouts/backoff (10 s)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """
+    Fixed-bucket latency histogram (seconds). observe() is a bisect plus a few additions
+    under a per-histogram lock, cheap enough to stay on in production.
+    """
+
+    __slots__ = ("bounds", "counts", "sum", "count", "max", "_lock")
+
+    def __init__(self, bounds=DEFAULT_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+            if value > self.max:
+                self.max = value
+
+    def time(self) -> "_Timer":
+        return _Timer(self)
+
+    def reset(self):
+        with self._lock:
+            self.counts = [0] * (len(self.bounds) + 1)
+            self.sum = 0.0
+            self.count = 0
+            self.max = 0.0
+
+    def quantile(self, q: float, counts: Optional[List[int]] = None) -> Optional[float]:
+        # upper bound of the bucket holding the q-th observation (max for the overflow bucket)
+        counts = counts if counts is not None else list(self.counts)
+        total = sum(counts)
+        if total == 0:
+            return None
+        rank = q * total
+        seen = 0
+        for index, n in enumerate(counts):
+            seen += n
+            if seen >= rank and n:
+                return self.bounds[index] if index < len(self.bounds) else self.max
+        return self.max
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = list(self.counts)
+            total, count, peak = self.sum, self.count, self.max
+        return {
+            "count": count,
+            "sum_seconds": round(total, 6),
+            "mean_ms": round(total / count * 1000.0, 3) if count else None,
+            "max_ms": round(peak * 1000.0, 3),
+            "p50_ms": _ms(self.quantile(0.50, counts)),
+            "p95_ms": _ms(self.quantile(0.95, counts)),
+            "p99_ms": _ms(self.quantile(0.99, counts)),
+            "buckets": {("+Inf" if i == len(self.bounds) else str(b)): n
+                        for i, (b, n) in enumerate(zip(self.bounds + (None,), counts))},
+        }
+
+
+class Counter:
+    """
+    Monotonic counter; a bound handle from MetricsRegistry.counter() skips the label lookup.
+    """
+
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self.value += amount
+
+    def reset(self):
+        with self._lock:
+            self.value = 0
+
+
+class _Timer:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class MetricsRegistry:
+    """
+    In-process counters and latency histograms keyed by name + labels.
+      inc("http_attempts_total", endpoint="forecast")
+      with timer("tool_stage_seconds", stage="geocode"): ...
+    Hot paths with fixed labels should bind the metric once (counter()/histogram()) and call
+    inc()/time() on the handle. snapshot() returns plain dicts; render_prometheus() the
+    Prometheus text exposition format.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, _LabelKey], Counter] = {}
+        self._histograms: Dict[Tuple[str, _LabelKey], Histogram] = {}
+        self._help: Dict[str, str] = {}
+
+    def describe(self, name: str, text: str):
+        self._help[name] = text
+
+    def counter(self, name: str, **labels: Any) -> Counter:
+        key = (name, _label_key(labels))
+        counter = self._counters.get(key)
+        if counter is None:
+            with self._lock:
+                counter = self._counters.setdefault(key, Counter())
+        return counter
+
+    def histogram(self, name: str, **labels: Any) -> Histogram:
+        key = (name, _label_key(labels))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram(self.buckets))
+        return histogram
+
+    def inc(self, name: str, amount: float = 1, **labels: Any):
+        self.counter(name, **labels).inc(amount)
+
+    def observe(self, name: str, seconds: float, **labels: Any):
+        self.histogram(name, **labels).observe(seconds)
+
+    def timer(self, name: str, **labels: Any) -> _Timer:
+        return _Timer(self.histogram(name, **labels))
+
+    def reset(self):
+        # zero in place so bound handles stay registered
+        with self._lock:
+            metrics = list(self._counters.values()) + list(self._histograms.values())
+        for metric in metrics:
+            metric.reset()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = dict(self._histograms)
+        return {
+            "counters": [{"name": name, "labels": dict(labels), "value": counter.value}
+                         for (name, labels), counter in sorted(counters.items(), key=lambda kv: kv[0])],
+            "histograms": [{"name": name, "labels": dict(labels), **histogram.snapshot()}
+                           for (name, labels), histogram in sorted(histograms.items(), key=lambda kv: kv[0])],
+        }
+
+    def render_prometheus(self, prefix: str = "ura_", gauges: Optional[Dict[str, float]] = None) -> str:
+        """
+        Text exposition format (version 0.0.4). gauges are extra point-in-time values
+        (e.g. cache sizes and hit counters owned by other components).
+        """
+        with self._lock:
+            counters = sorted(self._counters.items(), key=lambda kv: kv[0])
+            histograms = sorted(self._histograms.items(), key=lambda kv: kv[0])
+        lines: List[str] = []
+        declared = set()
+
+        def header(name: str, kind: str):
+            if name in declared:
+                return
+            declared.add(name)
+            text = self._help.get(name)
+            if text:
+                lines.append(f"# HELP {prefix}{name} {text}")
+            lines.append(f"# TYPE {prefix}{name} {kind}")
+
+        for (name, labels), counter in counters:
+            header(name, "counter")
+            lines.append(f"{prefix}{name}{_render_labels(labels)} {_number(counter.value)}")
+        for (name, labels), histogram in histograms:
+            header(name, "histogram")
+            with histogram._lock:
+                counts = list(histogram.counts)
+                total, count = histogram.sum, histogram.count
+            cumulative = 0
+            for bound, n in zip(histogram.bounds + (None,), counts):
+                cumulative += n
+                le = "+Inf" if bound is None else repr(bound)
+                lines.append(f"{prefix}{name}_bucket{_render_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{prefix}{name}_sum{_render_labels(labels)} {_number(total)}")
+            lines.append(f"{prefix}{name}_count{_render_labels(labels)} {count}")
+        for name, value in sorted((gauges or {}).items()):
+            header(name, "gauge")
+            lines.append(f"{prefix}{name} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def flatten_numeric(stats: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    """
+    Flatten nested stats dicts into {"a_b_c": number}, dropping non-numeric values,
+    e.g. cache_stats() -> Prometheus gauges.
+    """
+    flat: Dict[str, float] = {}
+    for key, value in stats.items():
+        name = f"{prefix}_{key}" if prefix else str(key)
+        if isinstance(value, dict):
+            flat.update(flatten_numeric(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+        elif isinstance(value, bool):
+            flat[name] = int(value)
+    return flat
+
+
+def _label_key(labels: Dict[str, Any]) -> _LabelKey:
+    if not labels:
+        return ()
+    if len(labels) == 1:
+        for k, v in labels.items():
+            return ((k, v if isinstance(v, str) else str(v)),)
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _render_labels(labels: _LabelKey) -> str:
+    if not labels:
+        return ""
+    body = ",".join('{}="{}"'.format(k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+                    for k, v in labels)
+    return "{" + body + "}"
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000.0, 3) if seconds is not None else None
+
+
+# process-wide registry shared by the tool, agent and orchestrator
+metrics = MetricsRegistry()
+metrics.describe("tool_stage_seconds", "Time spent per weather lookup stage (geocode, forecast, normalize, report).")
+metrics.describe("http_request_seconds", "Upstream HTTP attempt latency, including connection and transfer.")
+metrics.describe("http_decode_seconds", "JSON decode time of upstream responses.")
+metrics.describe("http_response_bytes_total", "Upstream response body bytes received (compressed size when gzipped).")
+metrics.describe("http_backoff_seconds", "Time slept between retry attempts.")
+metrics.describe("http_attempts_total", "Upstream HTTP attempts.")
+metrics.describe("http_retries_total", "Upstream HTTP attempts that were retries of a failed attempt.")
+metrics.describe("http_responses_total", "Upstream HTTP responses by status code.")
+metrics.describe("http_errors_total", "Failed upstream attempts by exception type.")
+metrics.describe("http_failures_total", "Upstream calls that failed after all retries.")
+metrics.describe("http_rate_limit_wait_seconds", "Time waited for a token of the shared upstream rate limiter.")
+metrics.describe("http_rejected_total", "Upstream calls failed locally (circuit open or rate limit wait too long).")
+metrics.describe("degraded_responses_total", "fetch_weather answers served without the upstream, by fallback source.")
+metrics.describe("agent_fetch_seconds", "WeatherAgent.fetch latency (and call count) by mode and outcome.")
@@ -1,15 +1,129 @@
 ﻿# utils/network_utils.py
 import socket
-from typing import Tuple
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import urlparse
+from utils.logger import setup_logger
+
+logger = setup_logger("network_utils", None)
 
 def check_internet(host: str = "8.8.8.8", port: int = 53, timeout: float = 1.5) -> bool:
     """
     Quick TCP check to determine if the host has network connectivity.
     Not perfect, but good for deciding whether to attempt real API calls.
+    The timeout applies to this socket only and the socket is always closed.
     """
     try:
-        socket.setdefaulttimeout(timeout)
-        socket.socket(socket.AF_INET, socket.SOCK_STREAM).connect((host, port))
-        return True
-    except Exception:
+        with socket.create_connection((host, port), timeout=timeout):
+            return True
+    except OSError:
         return False
+
+def endpoint_address(url: str) -> Tuple[str, int]:
+    """
+    (host, port) of an HTTP(S) URL, with the scheme's default port.
+    """
+    parsed = urlparse(url)
+    if not parsed.hostname:
+        raise ValueError(f"URL without a host: {url}")
+    return parsed.hostname, parsed.port or (443 if parsed.scheme == "https" else 80)
+
+
+class ConnectivityMonitor:
+    """
+    Background TCP reachability probes of named targets with a cached status, so request
+    paths can ask "is the upstream reachable?" without touching the network.
+
+    A target turns down after failure_threshold consecutive failed probes and up again on
+    the first success; until its first probe completes it counts as up. check_now() wakes
+    the probe thread early (e.g. after a request failed with a connection error).
+    """
+
+    def __init__(self, targets: Dict[str, Tuple[str, int]], interval_seconds: float = 15.0,
+                 timeout_seconds: float = 2.0, failure_threshold: int = 2,
+                 probe: Callable[[str, int, float], bool] = check_internet):
+        self.targets = dict(targets)
+        self.interval = max(0.5, float(interval_seconds))
+        self.timeout = float(timeout_seconds)
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.probe = probe
+        self._lock = threading.Lock()
+        self._status: Dict[str, Dict[str, Any]] = {
+            name: {"up": True, "checked": False, "consecutive_failures": 0, "last_checked": None,
+                   "last_change": None, "latency_ms": None, "probes": 0, "failures": 0}
+            for name in self.targets
+        }
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="ura-connectivity", daemon=True)
+            self._thread.start()
+            logger.info("Connectivity monitor started for %s (every %.1fs)",
+                        ", ".join(f"{name}={host}:{port}" for name, (host, port) in self.targets.items()), self.interval)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.probe_all()
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def probe_all(self):
+        for name, (host, port) in self.targets.items():
+            if self._stop.is_set():
+                return
+            started = time.perf_counter()
+            ok = self.probe(host, port, self.timeout)
+            self._record(name, ok, (time.perf_counter() - started) * 1000.0)
+
+    def _record(self, name: str, ok: bool, latency_ms: float):
+        with self._lock:
+            status = self._status[name]
+            status["probes"] += 1
+            status["checked"] = True
+            status["last_checked"] = time.time()
+            status["latency_ms"] = round(latency_ms, 1) if ok else None
+            if ok:
+                status["consecutive_failures"] = 0
+                up = True
+            else:
+                status["failures"] += 1
+                status["consecutive_failures"] += 1
+                up = status["up"] and status["consecutive_failures"] < self.failure_threshold
+            changed = up != status["up"]
+            status["up"] = up
+            if changed:
+                status["last_change"] = status["last_checked"]
+        if changed:
+            host, port = self.targets[name]
+            if up:
+                logger.info("Upstream %s (%s:%d) reachable again", name, host, port)
+            else:
+                logger.warning("Upstream %s (%s:%d) unreachable; serving degraded results", name, host, port)
+
+    def is_up(self, name: Optional[str] = None) -> bool:
+        """
+        Cached status of one target, or of all targets when name is None.
+        """
+        with self._lock:
+            if name is not None:
+                status = self._status.get(name)
+                return True if status is None else status["up"]
+            return all(status["up"] for status in self._status.values())
+
+    def check_now(self):
+        self._wake.set()
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {name: dict(status) for name, status in self._status.items()}
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        self._wake.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
@@ -0,0 +1,201 @@
+﻿# utils/resilience.py
+"""
+Client-side protection for upstream calls, shared by every MCPWeatherTool in the process:
+  - TokenBucket: request rate limit (all tools, threads and retries draw from one bucket)
+  - CircuitBreaker: per-endpoint; after failure_threshold consecutive failures calls fail
+    fast for reset_seconds, then a single probe decides between closing and re-opening
+  - backoff_seconds: "full jitter" exponential backoff
+Shared instances come from rate_limiter() / circuit_breaker(); a tool built with new
+limits reconfigures them in place, so hot reload never resets their state.
+"""
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+_CLOSED, _OPEN, _HALF_OPEN = "closed", "open", "half_open"
+
+
+class TokenBucket:
+    """
+    rate tokens per second, up to burst banked. rate <= 0 disables limiting.
+    """
+
+    def __init__(self, rate: float, burst: float, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._stats = {"acquired": 0, "waited": 0, "rejected": 0, "wait_seconds": 0.0}
+        self.configure(rate, burst)
+        self._tokens = self.burst
+        self._updated = clock()
+
+    def configure(self, rate: float, burst: float):
+        with self._lock:
+            self.rate = max(0.0, float(rate))
+            self.burst = max(1.0, float(burst))
+
+    def matches(self, rate: float, burst: float) -> bool:
+        with self._lock:
+            return self.rate == max(0.0, float(rate)) and self.burst == max(1.0, float(burst))
+
+    def reserve(self, max_wait: float) -> Optional[float]:
+        """
+        Take a token; returns the seconds the caller must wait before using it (0 when one
+        is banked), or None without taking one if that wait would exceed max_wait.
+        """
+        with self._lock:
+            if self.rate <= 0:
+                return 0.0
+            now = self.clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = 0.0 if self._tokens >= 1.0 else (1.0 - self._tokens) / self.rate
+            if wait > max_wait:
+                self._stats["rejected"] += 1
+                return None
+            # tokens may go negative: later callers queue behind the reservations already made
+            self._tokens -= 1.0
+            self._stats["acquired"] += 1
+            if wait > 0:
+                self._stats["waited"] += 1
+                self._stats["wait_seconds"] += wait
+            return wait
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["rate_per_second"] = self.rate
+            stats["burst"] = self.burst
+        stats["wait_seconds"] = round(stats["wait_seconds"], 3)
+        return stats
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure breaker. failure_threshold <= 0 disables it (always closed).
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_seconds: float,
+                 clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._state = _CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._stats = {"opened": 0, "rejected": 0, "failures": 0, "successes": 0}
+        self.configure(failure_threshold, reset_seconds)
+
+    def configure(self, failure_threshold: int, reset_seconds: float):
+        with self._lock:
+            self.failure_threshold = int(failure_threshold)
+            self.reset_seconds = max(0.0, float(reset_seconds))
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == _OPEN and self.clock() - self._opened_at >= self.reset_seconds:
+            self._state = _HALF_OPEN
+            self._probing = False
+        return self._state
+
+    def allow(self) -> bool:
+        """
+        False while open (fail fast). Half-open lets exactly one probe call through.
+        """
+        with self._lock:
+            if self.failure_threshold <= 0:
+                return True
+            state = self._current_state()
+            if state == _CLOSED:
+                return True
+            if state == _HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            self._stats["rejected"] += 1
+            return False
+
+    def retry_in(self) -> float:
+        # seconds until an open breaker lets a probe through
+        with self._lock:
+            if self._current_state() != _OPEN:
+                return 0.0
+            return max(0.0, self.reset_seconds - (self.clock() - self._opened_at))
+
+    def release(self):
+        # a call admitted by allow() never reached upstream; free the half-open probe slot
+        with self._lock:
+            self._probing = False
+
+    def record_success(self):
+        with self._lock:
+            self._stats["successes"] += 1
+            self._failures = 0
+            self._probing = False
+            self._state = _CLOSED
+
+    def record_failure(self):
+        with self._lock:
+            self._stats["failures"] += 1
+            self._failures += 1
+            self._probing = False
+            if self.failure_threshold <= 0:
+                return
+            state = self._current_state()
+            if state == _HALF_OPEN or (state == _CLOSED and self._failures >= self.failure_threshold):
+                self._state = _OPEN
+                self._opened_at = self.clock()
+                self._stats["opened"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["state"] = self._current_state()
+            stats["open"] = stats["state"] != _CLOSED
+            stats["consecutive_failures"] = self._failures
+        return stats
+
+
+def backoff_seconds(attempt: int, base: float, cap: float) -> float:
+    """
+    Full-jitter exponential backoff before retry number `attempt` (1-based):
+    uniform(0, min(cap, base * 2 ** (attempt - 1))).
+    """
+    return random.uniform(0.0, min(cap, base * (2 ** max(0, attempt - 1))))
+
+
+_registry_lock = threading.Lock()
+_rate_limiter: Optional[TokenBucket] = None
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def rate_limiter(rate: float, burst: float) -> TokenBucket:
+    """
+    The process-wide upstream rate limiter, resized only if the given limits differ from
+    its current ones.
+    """
+    global _rate_limiter
+    with _registry_lock:
+        if _rate_limiter is None:
+            _rate_limiter = TokenBucket(rate, burst)
+            return _rate_limiter
+    if not _rate_limiter.matches(rate, burst):
+        _rate_limiter.configure(rate, burst)
+    return _rate_limiter
+
+
+def circuit_breaker(name: str, failure_threshold: int, reset_seconds: float) -> CircuitBreaker:
+    """
+    The process-wide breaker for an endpoint, (re)configured with the given limits.
+    """
+    with _registry_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name, failure_threshold, reset_seconds)
+            return breaker
+    breaker.configure(failure_threshold, reset_seconds)
+    return breaker
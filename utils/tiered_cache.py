@@ -0,0 +1,175 @@
+﻿# utils/tiered_cache.py
+"""
+Two-tier cache shared by the geocoding and plan caches:
+  - memory tier: bounded LRU (utils.cache_utils.LRUCache)
+  - disk tier: SQLite table that survives restarts (optional)
+Values must be JSON-serializable; None is a cacheable value (stored as NULL). Entries
+expire at an absolute wall-clock time, or never. With a tag (e.g. the fingerprint of the
+planner that produced a plan), only rows written under the same tag are served and rows
+with another tag are dropped when the table is opened.
+The SQLite file is opened on first use, so a process that never looks anything up never
+touches it. A broken disk tier never fails a lookup: it is logged and the cache runs
+memory-only.
+"""
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+from utils.cache_utils import LRUCache
+from utils.logger import setup_logger
+
+logger = setup_logger("tiered_cache", None)
+
+# memory-tier stand-in for a cached None (LRUCache.get returns None on a miss)
+_NONE = object()
+
+
+class TieredCache:
+    def __init__(self, name: str, table: str, max_entries: int = 1024, path: Optional[str] = None,
+                 value_column: str = "value", tag: Optional[str] = None, tag_column: str = "tag"):
+        self.name = name
+        self.table = table
+        self.path = path
+        self.value_column = value_column
+        self.tag = tag
+        self.tag_column = tag_column
+        self._memory = LRUCache(max_entries)
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._disk_pending = bool(path)
+        self._stats_lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "invalidated": 0}
+
+    def _disk(self) -> Optional[sqlite3.Connection]:
+        if self._disk_pending:
+            with self._db_lock:
+                if self._disk_pending:
+                    self._disk_pending = False
+                    self._open_disk(self.path)
+        return self._db
+
+    def _open_disk(self, path: str):
+        try:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            tag_column = f", {self.tag_column} TEXT" if self.tag is not None else ""
+            db.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                f" key TEXT PRIMARY KEY, {self.value_column} TEXT, expires_at REAL, stored_at REAL NOT NULL{tag_column})"
+            )
+            # expired rows, and rows written under another tag, are never served again
+            if self.tag is not None:
+                dropped = db.execute(f"DELETE FROM {self.table} WHERE {self.tag_column} != ? OR expires_at <= ?",
+                                     (self.tag, time.time())).rowcount
+            else:
+                dropped = db.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (time.time(),)).rowcount
+            self._count("invalidated", max(0, dropped))
+            self._db = db
+            logger.info("%s disk cache opened at %s (%d outdated entries dropped)", self.name, path, max(0, dropped))
+        except Exception as e:
+            logger.warning("%s disk cache unavailable at %s (%s); using memory tier only", self.name, path, e)
+            self._db = None
+
+    def _count(self, name: str, n: int = 1):
+        with self._stats_lock:
+            self._stats[name] += n
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """
+        Returns (hit, value); value may be a cached None.
+        """
+        value = self._memory.get(key, None)
+        if value is not None:
+            self._count("memory_hits")
+            return True, None if value is _NONE else value
+
+        row = self._disk_get(key)
+        if row is not None:
+            value, expires_at = row
+            self._memory.set(key, _NONE if value is None else value, expires_at=expires_at)
+            self._count("disk_hits")
+            return True, value
+        self._count("misses")
+        return False, None
+
+    def peek(self, key: str) -> Tuple[bool, Any]:
+        """
+        Like get() for the memory tier only, without counting a lookup.
+        """
+        value = self._memory.get(key, None)
+        if value is None:
+            return False, None
+        return True, None if value is _NONE else value
+
+    def set(self, key: str, value: Any, expires_at: Optional[float] = None):
+        self._memory.set(key, _NONE if value is None else value, expires_at=expires_at)
+        self._count("stores")
+        if self._disk() is None:
+            return
+        try:
+            payload = None if value is None else json.dumps(value, ensure_ascii=False)
+            columns, params = f"key, {self.value_column}, expires_at, stored_at", [key, payload, expires_at, time.time()]
+            if self.tag is not None:
+                columns += f", {self.tag_column}"
+                params.append(self.tag)
+            with self._db_lock:
+                self._db.execute(
+                    f"INSERT OR REPLACE INTO {self.table} ({columns}) VALUES ({', '.join('?' * len(params))})",
+                    params)
+        except Exception as e:
+            logger.warning("Failed to persist %s cache entry for %s: %s", self.name, key, e)
+
+    def _disk_get(self, key: str) -> Optional[Tuple[Any, Optional[float]]]:
+        if self._disk() is None:
+            return None
+        sql = f"SELECT {self.value_column}, expires_at FROM {self.table} WHERE key = ?"
+        params: Tuple = (key,)
+        if self.tag is not None:
+            sql += f" AND {self.tag_column} = ?"
+            params += (self.tag,)
+        try:
+            with self._db_lock:
+                row = self._db.execute(sql, params).fetchone()
+                if row is None:
+                    return None
+                payload, expires_at = row
+                if expires_at is not None and expires_at <= time.time():
+                    self._db.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                    return None
+        except Exception as e:
+            logger.warning("Failed to read %s cache entry for %s: %s", self.name, key, e)
+            return None
+        return (None if payload is None else json.loads(payload)), expires_at
+
+    def clear(self):
+        self._memory.clear()
+        if self._disk() is None:
+            return
+        try:
+            with self._db_lock:
+                self._db.execute(f"DELETE FROM {self.table}")
+        except Exception as e:
+            logger.warning("Failed to clear %s disk cache: %s", self.name, e)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        hits = stats["memory_hits"] + stats["disk_hits"]
+        lookups = hits + stats["misses"]
+        stats["hit_rate"] = round(hits / lookups, 4) if lookups else 0.0
+        stats["memory_entries"] = len(self._memory)
+        stats["memory_evictions"] = self._memory.evictions
+        stats["disk_enabled"] = self._db is not None or self._disk_pending
+        return stats
+
+    def close(self):
+        with self._db_lock:
+            self._disk_pending = False
+            if self._db is not None:
+                try:
+                    self._db.close()
+                finally:
+                    self._db = None